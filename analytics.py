@@ -6,13 +6,15 @@ Herramientas de análisis para datos de MercadoLibre
 import json
 import pandas as pd
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
 from datetime import datetime
 import statistics
 
+from config import Config
+
 console = Console()
 
 class MercadoLibreAnalytics:
@@ -70,8 +72,30 @@ class MercadoLibreAnalytics:
             'min_sales': min(sales)
         }
     
-    def analyze_sellers(self, products: List[Dict]) -> Dict[str, Any]:
-        """Analiza los vendedores"""
+    def load_seller_profiles(self, products: List[Dict]) -> Dict[str, Dict]:
+        """Perfiles ya guardados de los vendedores de los productos (sin consultar la API)"""
+        if not os.path.exists(Config.SELLER_DB):
+            return {}
+        
+        from seller_repository import SellerStore
+        seller_ids = list({str(p['vendedor_id']) for p in products
+                           if p.get('vendedor_id') and p.get('vendedor_id') != 'No especificado'})
+        store = SellerStore(Config.SELLER_DB)
+        try:
+            return store.get_many(seller_ids)
+        finally:
+            store.close()
+    
+    def analyze_sellers(self, products: List[Dict],
+                        profiles: Optional[Dict[str, Dict]] = None) -> Dict[str, Any]:
+        """
+        Analiza los vendedores
+        
+        Args:
+            products: Productos exportados
+            profiles: Perfiles de vendedores por ID (ver SellerRepository.resolve) para
+                agregar nickname y nivel de reputación (opcional)
+        """
         if not products:
             return {}
         
@@ -98,6 +122,11 @@ class MercadoLibreAnalytics:
             if seller_data['prices']:
                 seller_data['avg_price'] = statistics.mean(seller_data['prices'])
         
+        for seller_id, seller_data in sellers.items():
+            profile = (profiles or {}).get(str(seller_id), {})
+            seller_data['nickname'] = profile.get('nickname', '')
+            seller_data['reputation_level'] = profile.get('seller_reputation', {}).get('level_id')
+        
         return {
             'total_sellers': len(sellers),
             'sellers_data': sellers
@@ -170,7 +199,7 @@ class MercadoLibreAnalytics:
             self.console.print(table)
         
         # Análisis de vendedores
-        seller_analysis = self.analyze_sellers(products)
+        seller_analysis = self.analyze_sellers(products, self.load_seller_profiles(products))
         if seller_analysis and seller_analysis['total_sellers'] > 0:
             self.console.print(f"\n👥 [bold]Análisis de Vendedores:[/bold]")
             self.console.print(f"   Total de vendedores únicos: {seller_analysis['total_sellers']}")
@@ -190,7 +219,7 @@ class MercadoLibreAnalytics:
             
             for seller_id, data in top_sellers:
                 seller_table.add_row(
-                    seller_id,
+                    f"{data['nickname']} ({seller_id})" if data.get('nickname') else str(seller_id),
                     str(data['products']),
                     f"{data['total_sales']:,}",
                     f"${data['avg_price']:,.2f}" if data['avg_price'] > 0 else "N/A"
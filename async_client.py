@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Cliente asíncrono de MercadoLibre sobre httpx (HTTP/2)
+
+Pensado para muchas consultas concurrentes de items y vendedores: las
+peticiones se multiplexan sobre pocas conexiones HTTP/2 y se reparten el
+mismo RateLimiter que usan los clientes síncronos.
+
+Ejemplo:
+    async with AsyncMercadoLibreClient() as client:
+        items = await client.get_many_product_details(['MLM1', 'MLM2', 'MLM3'])
+"""
+
+import asyncio
+import inspect
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+
+from config import Config
+from fast_json import loads
+from metrics import MetricsRegistry, registry as default_metrics
+from search_query import canonical_search_params
+from throttling import RateLimiter
+from tracing import span
+from transport import AsyncHttpxTransport
+
+
+class AsyncMercadoLibreClient:
+    """Cliente asíncrono para las APIs públicas de MercadoLibre"""
+
+    BASE_URL = "https://api.mercadolibre.com"
+
+    def __init__(self, site_id: str = "MLM", base_url: Optional[str] = None,
+                 transport: Optional[AsyncHttpxTransport] = None,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 max_concurrency: Optional[int] = None,
+                 metrics: Optional[MetricsRegistry] = None):
+        """
+        Inicializa el cliente asíncrono
+
+        Args:
+            site_id: ID del sitio (MLM=México, MLA=Argentina, etc.)
+            base_url: URL base alternativa de la API (opcional)
+            transport: Transporte asíncrono (por defecto httpx con HTTP/2)
+            rate_limiter: Rate limiter compartido (por defecto uno con la configuración global)
+            max_concurrency: Máximo de peticiones en vuelo (por defecto Config.HTTP_MAX_CONNECTIONS)
+            metrics: Registro de métricas (por defecto el registro global del proceso)
+        """
+        self.site_id = site_id
+        self.BASE_URL = base_url or os.getenv('MELI_API_BASE_URL', self.BASE_URL)
+        self.rate_limit_backoff = float(os.getenv('RATE_LIMIT_BACKOFF', 60))
+        self.rate_limiter = rate_limiter or RateLimiter(
+            requests_per_minute=Config.REQUESTS_PER_MINUTE,
+            delay_between_requests=Config.DELAY_BETWEEN_REQUESTS
+        )
+        self.transport = transport or AsyncHttpxTransport(headers={
+            'User-Agent': 'MercadoLibre-API-Client/1.0',
+            'Accept': 'application/json'
+        })
+        self.max_concurrency = max_concurrency or Config.HTTP_MAX_CONNECTIONS
+        self.metrics = metrics or default_metrics
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        self.logger = logging.getLogger(__name__)
+
+    async def _make_request(self, endpoint: str, params: Optional[Dict] = None,
+                            decoder: Optional[Callable[[bytes], Any]] = None) -> Any:
+        """
+        Hace una petición a la API con rate limiting y reintento tras 429
+
+        Args:
+            endpoint: Endpoint de la API
+            params: Parámetros de la petición
+            decoder: Función (o corrutina) que decodifica el cuerpo crudo (opcional)
+
+        Returns:
+            Respuesta de la API como diccionario (o lo que regrese decoder)
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        url = f"{self.BASE_URL}{endpoint}"
+
+        while True:
+            async with self._semaphore:
+                await self.rate_limiter.acquire_async()
+
+                start = time.perf_counter()
+                try:
+                    response = await self.transport.get(url, params=params, timeout=30)
+                except requests.exceptions.RequestException as e:
+                    self.metrics.record_request(endpoint, 'error', time.perf_counter() - start)
+                    self.logger.error(f"Error en la petición: {e}")
+                    raise
+
+                self.metrics.record_request(endpoint, response.status_code, time.perf_counter() - start,
+                                            len(response.content or b''))
+
+            if response.status_code == 429:
+                # Esperar fuera del semáforo para no bloquear otras peticiones
+                retry_after = response.headers.get('Retry-After')
+                wait = float(retry_after) if retry_after and retry_after.isdigit() else self.rate_limit_backoff
+                self.logger.warning(f"Rate limit excedido, esperando {wait:.0f}s...")
+                self.metrics.record_retry(endpoint)
+                await asyncio.sleep(wait)
+                continue
+
+            response.raise_for_status()
+
+            with span('parse', endpoint=endpoint):
+                if decoder is None:
+                    return loads(response.content)
+                result = decoder(response.content)
+                # Decoders async, ej. ParsePool.decode_async
+                return await result if inspect.isawaitable(result) else result
+
+    async def search_products(self, query: str, limit: int = 50, offset: int = 0,
+                              category: Optional[str] = None, condition: Optional[str] = None,
+                              sort: str = 'relevance',
+                              decoder: Optional[Callable[[bytes], Any]] = None) -> Any:
+        """Busca productos (mismos argumentos que MercadoLibreClient.search_products)"""
+        params = canonical_search_params({'q': query, 'limit': limit, 'offset': offset, 'sort': sort,
+                                          'category': category, 'condition': condition})
+
+        return await self._make_request(f"/sites/{self.site_id}/search", params, decoder)
+
+    async def get_product_details(self, product_id: str) -> Dict:
+        """Obtiene los detalles de un producto"""
+        return await self._make_request(f"/items/{product_id}")
+
+    async def get_product_description(self, product_id: str) -> Dict:
+        """Obtiene la descripción de un producto"""
+        return await self._make_request(f"/items/{product_id}/description")
+
+    async def get_items(self, product_ids: List[str], attributes: Optional[List[str]] = None) -> List[Dict]:
+        """Obtiene hasta 20 productos en una sola petición (multi-get)"""
+        params = {'ids': ','.join(product_ids[:20])}
+        if attributes:
+            params['attributes'] = ','.join(attributes)
+
+        return await self._make_request("/items", params)
+
+    async def get_seller_info(self, seller_id: str) -> Dict:
+        """Obtiene la información de un vendedor"""
+        return await self._make_request(f"/users/{seller_id}")
+
+    async def get_many_product_details(self, product_ids: List[str]) -> Dict[str, Any]:
+        """
+        Obtiene los detalles de muchos productos de forma concurrente
+
+        Returns:
+            Diccionario ID -> detalles (o la excepción si esa petición falló)
+        """
+        results = await asyncio.gather(*(self.get_product_details(pid) for pid in product_ids),
+                                       return_exceptions=True)
+        return dict(zip(product_ids, results))
+
+    async def get_many_sellers(self, seller_ids: List[str]) -> Dict[str, Any]:
+        """
+        Obtiene la información de muchos vendedores de forma concurrente
+
+        Returns:
+            Diccionario ID -> información (o la excepción si esa petición falló)
+        """
+        unique_ids = list(dict.fromkeys(str(sid) for sid in seller_ids))
+        results = await asyncio.gather(*(self.get_seller_info(sid) for sid in unique_ids),
+                                       return_exceptions=True)
+        return dict(zip(unique_ids, results))
+
+    async def close(self):
+        """Cierra el transporte"""
+        await self.transport.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
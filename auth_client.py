@@ -7,13 +7,19 @@ Maneja OAuth 2.0 y obtiene datos reales
 import os
 import requests
 import json
+import threading
 import time
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, Iterable, List, Optional, Any
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 import logging
 from urllib.parse import urlencode
 import webbrowser
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import ResponseCache, cache_policy, make_cache_key
+from fast_json import decode_authenticated_item, decode_authenticated_search
+from transport import Transport, create_transport
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -47,7 +53,8 @@ class AuthenticatedProduct:
 class AuthenticatedMercadoLibreClient:
     """Cliente autenticado para MercadoLibre API"""
     
-    def __init__(self, client_id: str, client_secret: str, site_id: str = "MLM"):
+    def __init__(self, client_id: str, client_secret: str, site_id: str = "MLM",
+                 transport: Optional[Transport] = None, cache: Optional[ResponseCache] = None):
         self.client_id = client_id
         self.client_secret = client_secret
         self.site_id = site_id
@@ -58,6 +65,8 @@ class AuthenticatedMercadoLibreClient:
         self.access_token = None
         self.refresh_token = None
         self.token_expires_at = None
+        # Los refresh tokens son de un solo uso: solo un hilo a la vez puede refrescar
+        self._token_lock = threading.Lock()
         
         self.session = requests.Session()
         self.session.headers.update({
@@ -65,6 +74,17 @@ class AuthenticatedMercadoLibreClient:
             'Accept': 'application/json',
             'Content-Type': 'application/json'
         })
+        self.transport = transport or create_transport(self.session)
+        
+        # Cache opcional de respuestas (ej. cache.TieredCache); guarda los objetos ya decodificados
+        self.cache = cache
+        
+        # Nombres de categorías: árbol local (category_tree.py) y los consultados a la API
+        self._category_tree = None
+        self._category_names: Dict[str, str] = {}
+        
+        # Perfiles de vendedores con cache persistente (seller_repository.py)
+        self._seller_repository = None
         
         self.logger = logging.getLogger(__name__)
         
@@ -124,7 +144,7 @@ class AuthenticatedMercadoLibreClient:
             'redirect_uri': redirect_uri
         }
         
-        response = self.session.post(self.token_url, json=data)
+        response = self.transport.post(self.token_url, json=data)
         
         if response.status_code == 200:
             token_data = response.json()
@@ -154,11 +174,12 @@ class AuthenticatedMercadoLibreClient:
             'refresh_token': self.refresh_token
         }
         
-        response = self.session.post(self.token_url, json=data)
+        response = self.transport.post(self.token_url, json=data)
         
         if response.status_code == 200:
             token_data = response.json()
             self.access_token = token_data['access_token']
+            self.refresh_token = token_data.get('refresh_token', self.refresh_token)
             
             expires_in = token_data.get('expires_in', 3600)
             self.token_expires_at = datetime.now() + timedelta(seconds=expires_in)
@@ -176,29 +197,60 @@ class AuthenticatedMercadoLibreClient:
             raise Exception("No hay token de acceso. Ejecuta authenticate() primero.")
         
         # Verificar si el token está por expirar
-        if self.token_expires_at and datetime.now() >= self.token_expires_at - timedelta(minutes=5):
-            self.logger.info("Token por expirar, refrescando...")
-            if not self.refresh_access_token():
-                raise Exception("No se pudo refrescar el token")
+        if not self._token_expiring():
+            return
+        
+        with self._token_lock:
+            # Otro hilo pudo haberlo refrescado mientras se esperaba el lock
+            if self._token_expiring():
+                self.logger.info("Token por expirar, refrescando...")
+                if not self.refresh_access_token():
+                    raise Exception("No se pudo refrescar el token")
+    
+    def _token_expiring(self) -> bool:
+        """Indica si el token vence en los próximos 5 minutos"""
+        return bool(self.token_expires_at) and datetime.now() >= self.token_expires_at - timedelta(minutes=5)
+    
+    def _refresh_rejected_token(self, rejected_token: str) -> bool:
+        """Refresca tras un 401, salvo que otro hilo ya haya reemplazado el token rechazado"""
+        with self._token_lock:
+            if self.access_token != rejected_token:
+                return True
+            return self.refresh_access_token()
+    
+    def _make_authenticated_request(self, endpoint: str, params: Dict = None,
+                                    decoder: Optional[Callable[[bytes], Any]] = None) -> Any:
+        """Hace request autenticado (decoder decodifica el cuerpo crudo, ver fast_json)"""
+        if self.cache is None:
+            return self._fetch_authenticated(endpoint, params, decoder)
+        
+        key = make_cache_key(endpoint, params)
+        if decoder is not None:
+            key = f"{key}#{getattr(decoder, '__qualname__', repr(decoder))}"
+        
+        value, _ = self.cache.fetch(key, lambda: self._fetch_authenticated(endpoint, params, decoder),
+                                    cache_policy(endpoint, self.cache.ttl))
+        return value
     
-    def _make_authenticated_request(self, endpoint: str, params: Dict = None) -> Dict:
-        """Hace request autenticado"""
+    def _fetch_authenticated(self, endpoint: str, params: Dict = None,
+                             decoder: Optional[Callable[[bytes], Any]] = None) -> Any:
         self._ensure_valid_token()
         
-        headers = {'Authorization': f'Bearer {self.access_token}'}
+        access_token = self.access_token
+        headers = {'Authorization': f'Bearer {access_token}'}
         url = f"{self.base_url}{endpoint}"
         
-        response = self.session.get(url, params=params, headers=headers)
+        response = self.transport.get(url, params=params, headers=headers)
         
         if response.status_code == 200:
-            return response.json()
+            return decoder(response.content) if decoder else response.json()
         elif response.status_code == 401:
             # Token inválido, intentar refrescar
-            if self.refresh_access_token():
+            if self._refresh_rejected_token(access_token):
                 headers = {'Authorization': f'Bearer {self.access_token}'}
-                response = self.session.get(url, params=params, headers=headers)
+                response = self.transport.get(url, params=params, headers=headers)
                 if response.status_code == 200:
-                    return response.json()
+                    return decoder(response.content) if decoder else response.json()
             
             raise Exception("Token inválido y no se pudo refrescar")
         else:
@@ -221,35 +273,28 @@ class AuthenticatedMercadoLibreClient:
             params['sort'] = filters['sort']
         
         try:
-            data = self._make_authenticated_request(f"/sites/{self.site_id}/search", params)
+            results, _ = self._make_authenticated_request(f"/sites/{self.site_id}/search", params,
+                                                          decoder=decode_authenticated_search)
             products = []
             
-            for item in data.get('results', []):
+            # Resolver todos los vendedores de la página de una vez; si falla, los productos van sin vendedor
+            try:
+                sellers = self.get_sellers(fields['seller_id'] for fields in results)
+            except Exception as e:
+                self.logger.warning(f"Error obteniendo vendedores: {e}")
+                sellers = {}
+            
+            for fields in results:
                 try:
                     # Obtener información adicional del vendedor
-                    seller_info = self._get_seller_info(item.get('seller', {}).get('id'))
+                    seller_info = sellers.get(str(fields['seller_id']), {})
                     
+                    fields.pop('warranty', None)  # Solo se incluye en los detalles
                     product = AuthenticatedProduct(
-                        id=item.get('id', ''),
-                        title=item.get('title', ''),
-                        price=item.get('price', 0.0),
-                        currency=item.get('currency_id', 'MXN'),
-                        permalink=item.get('permalink', ''),
-                        thumbnail=item.get('thumbnail', ''),
-                        condition=item.get('condition', ''),
-                        sold_quantity=item.get('sold_quantity', 0),
-                        available_quantity=item.get('available_quantity', 0),
-                        seller_id=item.get('seller', {}).get('id', ''),
                         seller_nickname=seller_info.get('nickname', ''),
                         seller_reputation=seller_info.get('seller_reputation', {}),
-                        category_id=item.get('category_id', ''),
-                        category_name=self._get_category_name(item.get('category_id', '')),
-                        free_shipping=item.get('shipping', {}).get('free_shipping', False),
-                        listing_type=item.get('listing_type_id', ''),
-                        buying_mode=item.get('buying_mode', ''),
-                        location=item.get('seller_address', {}).get('city', {}).get('name', ''),
-                        attributes=item.get('attributes', []),
-                        pictures=[pic.get('url', '') for pic in item.get('pictures', [])]
+                        category_name=self._get_category_name(fields['category_id']),
+                        **fields
                     )
                     
                     products.append(product)
@@ -264,66 +309,77 @@ class AuthenticatedMercadoLibreClient:
             self.logger.error(f"Error en búsqueda autenticada: {e}")
             return []
     
+    def get_users(self, seller_ids: List[str]) -> List[Dict]:
+        """Obtiene hasta 20 vendedores en una sola petición (multi-get)"""
+        return self._make_authenticated_request("/users", {'ids': ','.join(str(sid) for sid in seller_ids[:20])})
+    
+    def get_sellers(self, seller_ids: Iterable[Any]) -> Dict[str, Dict]:
+        """Obtiene nickname y reputación de muchos vendedores (ver SellerRepository.resolve)"""
+        if self._seller_repository is None:
+            from seller_repository import SellerRepository
+            self._seller_repository = SellerRepository(self)
+        
+        return self._seller_repository.resolve(seller_ids)
+    
     def _get_seller_info(self, seller_id: str) -> Dict:
         """Obtiene información del vendedor"""
         if not seller_id:
             return {}
         
         try:
-            return self._make_authenticated_request(f"/users/{seller_id}")
-        except:
+            return self.get_sellers([seller_id]).get(str(seller_id), {})
+        except Exception as e:
+            self.logger.warning(f"Error obteniendo vendedor {seller_id}: {e}")
             return {}
     
     def _get_category_name(self, category_id: str) -> str:
-        """Obtiene nombre de categoría"""
+        """Obtiene nombre de categoría (del árbol local si existe; si no, de la API una sola vez)"""
         if not category_id:
             return ''
         
-        try:
-            data = self._make_authenticated_request(f"/categories/{category_id}")
-            return data.get('name', '')
-        except:
-            return ''
+        if self._category_tree is None:
+            from category_tree import load_category_tree
+            self._category_tree = load_category_tree(self.site_id) or False
+        
+        if self._category_tree and category_id in self._category_tree:
+            return self._category_tree.name(category_id)
+        
+        if category_id not in self._category_names:
+            try:
+                data = self._make_authenticated_request(f"/categories/{category_id}")
+                self._category_names[category_id] = data.get('name', '')
+            except:
+                return ''
+        
+        return self._category_names[category_id]
     
     def get_product_details(self, product_id: str) -> Optional[AuthenticatedProduct]:
-        """Obtiene detalles completos de un producto"""
+        """
+        Obtiene detalles completos de un producto
+        
+        La descripción se pide en paralelo con el item, y el vendedor y la
+        categoría (que dependen del item) en paralelo entre sí: dos viajes de
+        ida y vuelta en lugar de cuatro.
+        """
         try:
-            # Obtener datos básicos
-            product_data = self._make_authenticated_request(f"/items/{product_id}")
-            
-            # Obtener descripción
-            try:
-                desc_data = self._make_authenticated_request(f"/items/{product_id}/description")
-                description = desc_data.get('plain_text', '')
-            except:
-                description = None
-            
-            # Obtener info del vendedor
-            seller_info = self._get_seller_info(product_data.get('seller_id', ''))
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                description_future = executor.submit(self._get_description, product_id)
+                
+                # Obtener datos básicos
+                fields = self._make_authenticated_request(f"/items/{product_id}", decoder=decode_authenticated_item)
+                
+                # Vendedor y categoría solo dependen del item
+                seller_future = executor.submit(self._get_seller_info, fields['seller_id'])
+                category_name = self._get_category_name(fields['category_id'])
+                seller_info = seller_future.result()
+                description = description_future.result()
             
             product = AuthenticatedProduct(
-                id=product_data.get('id', ''),
-                title=product_data.get('title', ''),
-                price=product_data.get('price', 0.0),
-                currency=product_data.get('currency_id', 'MXN'),
-                permalink=product_data.get('permalink', ''),
-                thumbnail=product_data.get('thumbnail', ''),
-                condition=product_data.get('condition', ''),
-                sold_quantity=product_data.get('sold_quantity', 0),
-                available_quantity=product_data.get('available_quantity', 0),
-                seller_id=product_data.get('seller_id', ''),
                 seller_nickname=seller_info.get('nickname', ''),
                 seller_reputation=seller_info.get('seller_reputation', {}),
-                category_id=product_data.get('category_id', ''),
-                category_name=self._get_category_name(product_data.get('category_id', '')),
-                free_shipping=product_data.get('shipping', {}).get('free_shipping', False),
-                listing_type=product_data.get('listing_type_id', ''),
-                buying_mode=product_data.get('buying_mode', ''),
-                location=product_data.get('seller_address', {}).get('city', {}).get('name', ''),
-                attributes=product_data.get('attributes', []),
-                pictures=[pic.get('url', '') for pic in product_data.get('pictures', [])],
+                category_name=category_name,
                 description=description,
-                warranty=product_data.get('warranty', '')
+                **fields
             )
             
             return product
@@ -331,6 +387,14 @@ class AuthenticatedMercadoLibreClient:
         except Exception as e:
             self.logger.error(f"Error obteniendo detalles del producto: {e}")
             return None
+    
+    def _get_description(self, product_id: str) -> Optional[str]:
+        """Obtiene la descripción en texto plano (None si no se pudo obtener)"""
+        try:
+            desc_data = self._make_authenticated_request(f"/items/{product_id}/description")
+            return desc_data.get('plain_text', '')
+        except:
+            return None
 
 def create_authenticated_client() -> AuthenticatedMercadoLibreClient:
     """Factory para crear cliente autenticado"""
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Benchmarks offline del cliente de MercadoLibre contra la API simulada
+
+Mide peticiones por segundo, latencia p50/p99 y memoria pico de
+search_all_pages, de los exportadores y de MercadoLibreAnalytics.generate_report
+con distintos tamaños de datos.
+
+Uso:
+    python benchmark.py --sizes 100,500,1000 --latency 0.01 --jitter 0.005 --rate-429 0.01
+"""
+
+import io
+import json
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List
+
+import click
+from rich.console import Console
+from rich.table import Table
+
+from mercadolibre_client import MercadoLibreClient, Product
+from mock_server import MockMercadoLibreServer, generate_search_result
+
+console = Console()
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil (método del rango más cercano) de una lista de valores"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+@contextmanager
+def working_directory(path: str):
+    """Cambia temporalmente el directorio de trabajo (los exportadores escriben en exports/)"""
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def measure(func: Callable[[], Any]) -> Dict[str, float]:
+    """
+    Ejecuta una función midiendo tiempo total y memoria pico
+
+    tracemalloc hace mucho más lentas las asignaciones, así que el tiempo se
+    mide en una primera ejecución y la memoria en una segunda.
+    """
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'seconds': elapsed, 'peak_mb': peak / 1024 / 1024}
+
+
+def sample_products(size: int, query: str = 'benchmark') -> List[Product]:
+    """Genera productos realistas sin pasar por la red"""
+    return [Product.from_api_response(generate_search_result(f"MLM{i}", query)) for i in range(size)]
+
+
+def bench_search_all_pages(server: MockMercadoLibreServer, size: int) -> Dict[str, Any]:
+    """Benchmark de search_all_pages contra la API simulada"""
+    runs: List[List[float]] = []
+    server.state.total_results = size
+
+    with MercadoLibreClient(base_url=server.url) as client:
+        # Sin throttling: se mide el cliente, no la ventana de REQUESTS_PER_MINUTE del rate limiter
+        client.delay_between_requests = 0
+        client.requests_per_minute = 0
+        make_request = client._make_request
+
+        def timed_request(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return make_request(*args, **kwargs)
+            finally:
+                runs[-1].append(time.perf_counter() - start)
+
+        def run():
+            runs.append([])
+            client.search_all_pages('benchmark', max_results=size)
+
+        client._make_request = timed_request
+        result = measure(run)
+
+    # Solo se reportan las latencias de la ejecución cronometrada (la primera)
+    latencies = runs[0]
+    result.update({
+        'requests': len(latencies),
+        'requests_per_second': len(latencies) / result['seconds'] if result['seconds'] else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000
+    })
+    return result
+
+
+def bench_exporters(size: int, workdir: str) -> Dict[str, Dict[str, Any]]:
+    """Benchmark de los exportadores JSON, CSV y JSON Lines"""
+    from streaming_export import JsonLinesExporter
+
+    products = sample_products(size)
+    results = {}
+
+    # Importar pandas antes de medir para no contar el tiempo de importación
+    import pandas  # noqa: F401
+
+    with working_directory(workdir), MercadoLibreClient() as client:
+        results['export_to_json'] = measure(lambda: client.export_to_json(products, f"bench_{size}.json"))
+        results['export_to_csv'] = measure(lambda: client.export_to_csv(products, f"bench_{size}.csv"))
+
+        def export_jsonl():
+            with JsonLinesExporter(os.path.join('exports', f"bench_{size}.jsonl")) as exporter:
+                exporter.write(products)
+
+        results['json_lines'] = measure(export_jsonl)
+
+    for result in results.values():
+        result['items_per_second'] = size / result['seconds'] if result['seconds'] else 0.0
+    return results
+
+
+def bench_generate_report(size: int, workdir: str) -> Dict[str, Any]:
+    """Benchmark de MercadoLibreAnalytics.generate_report"""
+    from analytics import MercadoLibreAnalytics
+
+    json_file = os.path.join(workdir, f"report_{size}.json")
+    with open(json_file, 'w', encoding='utf-8') as f:
+        json.dump([p.to_export_dict() for p in sample_products(size)], f, ensure_ascii=False)
+
+    analyzer = MercadoLibreAnalytics()
+    analyzer.console = Console(file=io.StringIO(), width=120)
+
+    result = measure(lambda: analyzer.generate_report(json_file))
+    result['items_per_second'] = size / result['seconds'] if result['seconds'] else 0.0
+    return result
+
+
+def run_benchmarks(sizes: List[int], latency: float = 0.0, jitter: float = 0.0,
+                   rate_429: float = 0.0) -> List[Dict[str, Any]]:
+    """
+    Ejecuta todos los benchmarks
+
+    Args:
+        sizes: Tamaños de datos a medir
+        latency: Latencia simulada por petición en segundos
+        jitter: Variación de la latencia en segundos
+        rate_429: Proporción de peticiones con 429
+
+    Returns:
+        Lista de filas con los resultados
+    """
+    rows = []
+    server = MockMercadoLibreServer(latency=latency, jitter=jitter, rate_429=rate_429)
+
+    with server, tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            search = bench_search_all_pages(server, size)
+            rows.append(dict(benchmark='search_all_pages', size=size, **search))
+
+            for name, result in bench_exporters(size, workdir).items():
+                rows.append(dict(benchmark=name, size=size, **result))
+
+            rows.append(dict(benchmark='generate_report', size=size, **bench_generate_report(size, workdir)))
+
+    return rows
+
+
+def print_results(rows: List[Dict[str, Any]]):
+    """Muestra los resultados en una tabla"""
+    table = Table(title="Resultados de benchmarks")
+    table.add_column("Benchmark", style="cyan", no_wrap=True)
+    table.add_column("Tamaño", style="white", justify="right")
+    table.add_column("Tiempo", style="green", justify="right")
+    table.add_column("Req/s", style="magenta", justify="right")
+    table.add_column("p50", style="yellow", justify="right")
+    table.add_column("p99", style="yellow", justify="right")
+    table.add_column("Items/s", style="blue", justify="right")
+    table.add_column("Mem. (MB)", style="red", justify="right")
+
+    for row in rows:
+        table.add_row(
+            row['benchmark'],
+            f"{row['size']:,}",
+            f"{row['seconds']:.3f}s",
+            f"{row['requests_per_second']:,.1f}" if 'requests_per_second' in row else "-",
+            f"{row['p50_ms']:.1f}ms" if 'p50_ms' in row else "-",
+            f"{row['p99_ms']:.1f}ms" if 'p99_ms' in row else "-",
+            f"{row['items_per_second']:,.0f}" if 'items_per_second' in row else "-",
+            f"{row['peak_mb']:.1f}"
+        )
+
+    console.print(table)
+
+
+@click.command()
+@click.option('--sizes', default='100,500,1000', help='Tamaños de datos separados por comas')
+@click.option('--latency', default=0.0, help='Latencia simulada por petición en segundos')
+@click.option('--jitter', default=0.0, help='Variación de la latencia en segundos')
+@click.option('--rate-429', default=0.0, help='Proporción de peticiones con 429 (0-1)')
+@click.option('--output', '-o', type=click.Path(), help='Guardar los resultados en un archivo JSON')
+def main(sizes, latency, jitter, rate_429, output):
+    """Ejecuta los benchmarks offline contra la API simulada"""
+    size_list = [int(s) for s in sizes.split(',') if s.strip()]
+
+    # Los logs INFO del cliente por cada página ensucian la salida
+    logging.disable(logging.INFO)
+
+    console.print(f"\n⏱️  [bold blue]Benchmarks offline[/bold blue] (tamaños: {size_list}, "
+                  f"latencia: {latency * 1000:.0f}±{jitter * 1000:.0f}ms, 429: {rate_429:.0%})\n")
+
+    rows = run_benchmarks(size_list, latency=latency, jitter=jitter, rate_429=rate_429)
+    print_results(rows)
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=2)
+        console.print(f"\n💾 Resultados guardados en: {output}")
+
+
+if __name__ == '__main__':
+    main()
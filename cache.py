@@ -0,0 +1,568 @@
+#!/usr/bin/env python3
+"""
+Cache de respuestas de la API de MercadoLibre
+
+ResponseCache guarda todo en memoria; TieredCache agrega un segundo nivel en
+SQLite con los cuerpos comprimidos. Cada familia de endpoints tiene su propia política (Config.CACHE_POLICIES):
+cuánto tiempo una respuesta es fresca, cuánto tiempo más se puede servir
+vencida mientras se refresca en segundo plano (stale-while-revalidate) y
+cuánto se recuerda un 404 para no volver a pedir listados borrados.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import requests
+
+from config import Config
+from fast_json import loads
+from metrics import endpoint_family
+from search_query import canonical_search_params, is_search_endpoint
+
+# Estados de una búsqueda en el cache
+FRESH = 'fresh'
+STALE = 'stale'
+NEGATIVE = 'negative'
+MISS = 'miss'
+
+# Códigos que se guardan como respuesta negativa
+NEGATIVE_STATUSES = (404, 410)
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """Política de cache de una familia de endpoints (tiempos en segundos)"""
+    ttl: float
+    stale_ttl: float = 0.0
+    negative_ttl: float = 0.0
+
+
+def cache_policy(endpoint: str, default_ttl: Optional[float] = None) -> CachePolicy:
+    """
+    Política de cache de un endpoint según su familia (ver metrics.endpoint_family)
+
+    Args:
+        endpoint: Endpoint de la API
+        default_ttl: TTL de las familias sin política propia (por defecto Config.CACHE_TTL)
+    """
+    policies = Config.CACHE_POLICIES
+    family = endpoint_family(endpoint)
+    if family in policies:
+        return CachePolicy(**policies[family])
+
+    policy = dict(policies['default'])
+    if default_ttl is not None:
+        policy['ttl'] = default_ttl
+    return CachePolicy(**policy)
+
+
+class CachedHTTPError(requests.exceptions.HTTPError):
+    """Error HTTP servido desde el cache negativo, sin consultar a la API"""
+
+
+def _negative_error(key: str, status: int, message: str) -> CachedHTTPError:
+    response = requests.Response()
+    response.status_code = status
+    response.url = key
+    response._content = json.dumps({'message': message, 'status': status}).encode()
+    return CachedHTTPError(f"{status} (cache negativo): {message}", response=response)
+
+
+def make_cache_key(endpoint: str, params: Optional[Dict] = None) -> str:
+    """
+    Construye una llave de cache estable para un endpoint y sus parámetros
+
+    Las búsquedas se llevan a su forma canónica (ver search_query), así que
+    variantes de mayúsculas, acentos o espacios comparten llave.
+
+    Args:
+        endpoint: Endpoint de la API (ej. /items/MLM123)
+        params: Parámetros de la petición
+
+    Returns:
+        Llave de cache como texto
+    """
+    if is_search_endpoint(endpoint):
+        params = canonical_search_params(params or {})
+    if not params:
+        return endpoint
+
+    return f"{endpoint}?{json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)}"
+
+
+class ResponseCache:
+    """Cache en memoria con expiración (TTL), segura para uso entre hilos"""
+
+    def __init__(self, ttl: int = 3600, max_entries: int = 10000):
+        """
+        Inicializa el cache
+
+        Args:
+            ttl: Tiempo de vida por defecto de cada entrada en segundos
+            max_entries: Número máximo de entradas antes de descartar las más antiguas
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # llave -> (fresca hasta, servible hasta, valor, negativa)
+        self._entries: Dict[str, Tuple[float, float, Any, bool]] = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.negative_hits = 0
+        self.revalidations = 0
+        self.logger = logging.getLogger(__name__)
+
+    def lookup(self, key: str) -> Tuple[str, Any]:
+        """
+        Busca una llave
+
+        Returns:
+            Tupla (estado, valor): FRESH, STALE (vencida pero servible), NEGATIVE
+            (valor = (código, mensaje)) o MISS (valor = None)
+        """
+        now = time.time()
+        entry = self._get_entry(key, now)
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return MISS, None
+
+            fresh_until, _, value, negative = entry
+            self.hits += 1
+            if negative:
+                self.negative_hits += 1
+                return NEGATIVE, value
+            if fresh_until < now:
+                self.stale_hits += 1
+                return STALE, value
+            return FRESH, value
+
+    def _get_entry(self, key: str, now: float) -> Optional[Tuple[float, float, Any, bool]]:
+        """Entrada servible de una llave (descarta la que ya pasó su stale_ttl)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] < now:
+                del self._entries[key]
+                return None
+            return entry
+
+    def contains(self, key: str) -> bool:
+        """Indica si hay una respuesta servible (fresca o vencida dentro de stale_ttl), sin contarla como acierto"""
+        entry = self._get_entry(key, time.time())
+        return entry is not None and not entry[3]
+
+    def get(self, key: str) -> Optional[Any]:
+        """Obtiene un valor del cache si existe y sigue fresco"""
+        state, value = self.lookup(key)
+        return value if state == FRESH else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, stale_ttl: float = 0.0):
+        """
+        Guarda un valor en el cache
+
+        Args:
+            key: Llave
+            value: Valor
+            ttl: Segundos que el valor es fresco (por defecto self.ttl)
+            stale_ttl: Segundos adicionales en que se puede servir vencido mientras se refresca
+        """
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0 and stale_ttl <= 0:
+            return
+        now = time.time()
+        self._store(key, (now + ttl, now + ttl + stale_ttl, value, False))
+
+    def set_negative(self, key: str, status: int, message: str, ttl: float):
+        """Recuerda que una llave respondió con un error (ej. 404) durante ttl segundos"""
+        if ttl <= 0:
+            return
+        expires_at = time.time() + ttl
+        self._store(key, (expires_at, expires_at, (status, message), True))
+
+    def negative_status(self, key: str) -> Optional[int]:
+        """Código de error guardado para una llave (None si no hay respuesta negativa vigente)"""
+        entry = self._get_entry(key, time.time())
+        if entry is None or not entry[3]:
+            return None
+
+        with self._lock:
+            self.hits += 1
+            self.negative_hits += 1
+        return entry[2][0]
+
+    def _store(self, key: str, entry: Tuple[float, float, Any, bool]):
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                self._evict()
+            self._entries[key] = entry
+
+    def fetch(self, key: str, loader: Callable[[], Any],
+              policy: Optional[CachePolicy] = None) -> Tuple[Any, str]:
+        """
+        Obtiene un valor del cache o lo carga con loader
+
+        Un valor vencido pero dentro de stale_ttl se regresa de inmediato y se
+        refresca en segundo plano (una sola vez por llave). Un 404/410 de
+        loader se guarda negative_ttl segundos; mientras tanto se responde con
+        CachedHTTPError sin llamar a loader.
+
+        Args:
+            key: Llave de cache
+            loader: Función que obtiene el valor de la API
+            policy: Política de la familia del endpoint (por defecto solo ttl=self.ttl)
+
+        Returns:
+            Tupla (valor, estado en el cache: FRESH, STALE o MISS)
+        """
+        policy = policy or CachePolicy(self.ttl)
+        state, value = self.lookup(key)
+
+        if state == NEGATIVE:
+            raise _negative_error(key, *value)
+        if state == STALE:
+            self._revalidate(key, loader, policy)
+        if state != MISS:
+            return value, state
+
+        return self._load(key, loader, policy), MISS
+
+    def _load(self, key: str, loader: Callable[[], Any], policy: CachePolicy) -> Any:
+        try:
+            value = loader()
+        except requests.exceptions.HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            if status in NEGATIVE_STATUSES:
+                self.set_negative(key, status, str(e), policy.negative_ttl)
+            raise
+
+        self.set(key, value, policy.ttl, policy.stale_ttl)
+        return value
+
+    def _revalidate(self, key: str, loader: Callable[[], Any], policy: CachePolicy):
+        """Refresca una llave en un hilo de fondo (si no se está refrescando ya)"""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            self.revalidations += 1
+
+        def run():
+            try:
+                self._load(key, loader, policy)
+            except Exception as e:
+                # La entrada vencida se sigue sirviendo hasta el fin de stale_ttl
+                self.logger.warning(f"No se pudo refrescar {key}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, name='cache-revalidate', daemon=True).start()
+
+    def _evict(self):
+        """Descarta entradas expiradas o, si no hay, la más antigua insertada"""
+        now = time.time()
+        expired = [key for key, entry in self._entries.items() if entry[1] < now]
+
+        for key in expired:
+            del self._entries[key]
+
+        if not expired and self._entries:
+            del self._entries[next(iter(self._entries))]
+
+    def clear(self):
+        """Vacía el cache"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def close(self):
+        """Libera recursos (el cache en memoria no tiene ninguno)"""
+
+    def stats(self) -> Dict[str, Any]:
+        """Obtiene estadísticas del cache"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale_hits': self.stale_hits,
+                'negative_hits': self.negative_hits,
+                'revalidations': self.revalidations,
+                'hit_ratio': self.hits / total if total else 0.0,
+                'ttl': self.ttl
+            }
+
+
+TIERED_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    fresh_until REAL NOT NULL,
+    stale_until REAL NOT NULL,
+    negative INTEGER NOT NULL DEFAULT 0,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_access ON responses (last_access);
+"""
+
+# Peso en memoria de un valor que no se puede serializar a JSON (ej. SearchPage)
+UNSERIALIZABLE_WEIGHT = 4096
+
+
+class TieredCache(ResponseCache):
+    """
+    Cache de dos niveles con las mismas políticas que ResponseCache
+
+    El primer nivel es un LRU en memoria de objetos ya decodificados, acotado
+    por bytes y por número de entradas. El segundo es un SQLite con los
+    cuerpos en JSON comprimido con zlib, acotado por bytes en disco; sus
+    aciertos se promueven a memoria. Los valores que no son JSON (ej. páginas
+    decodificadas a SearchPage) solo viven en memoria.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl: int = 3600,
+                 max_memory_bytes: int = 64 * 1024 * 1024, max_memory_entries: int = 10000,
+                 max_disk_bytes: int = 512 * 1024 * 1024, compress_level: int = 6):
+        """
+        Inicializa el cache
+
+        Args:
+            path: Archivo SQLite del segundo nivel (por defecto Config.CACHE_DB)
+            ttl: Tiempo de vida por defecto en segundos
+            max_memory_bytes: Tamaño máximo del nivel en memoria (bytes del JSON de cada valor)
+            max_memory_entries: Entradas máximas del nivel en memoria
+            max_disk_bytes: Tamaño máximo de los cuerpos comprimidos en disco
+            compress_level: Nivel de compresión zlib (1-9)
+        """
+        super().__init__(ttl=ttl, max_entries=max_memory_entries)
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.compress_level = compress_level
+
+        # llave -> (entrada, peso, guardada en disco)
+        self._memory: 'OrderedDict[str, Tuple[Tuple[float, float, Any, bool], int, bool]]' = OrderedDict()
+        self.memory_bytes = 0
+        self.memory_hits = 0
+        self.memory_misses = 0
+        self.memory_evictions = 0
+        self.disk_hits = 0
+        self.disk_misses = 0
+        self.disk_evictions = 0
+
+        self.path = path or Config.CACHE_DB
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(TIERED_SCHEMA)
+        self._disk_lock = threading.Lock()
+        self.disk_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _get_entry(self, key: str, now: float) -> Optional[Tuple[float, float, Any, bool]]:
+        with self._lock:
+            item = self._memory.get(key)
+            if item is not None:
+                if item[0][1] >= now:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return item[0]
+                self._drop_memory(key)
+            self.memory_misses += 1
+
+        found = self._disk_get(key, now)
+
+        with self._lock:
+            if found is None:
+                self.disk_misses += 1
+                return None
+            self.disk_hits += 1
+            entry, weight = found
+            self._memory_put(key, entry, weight, on_disk=True)
+            return entry
+
+    def _disk_get(self, key: str, now: float) -> Optional[Tuple[Tuple[float, float, Any, bool], int]]:
+        with self._disk_lock, self._conn:
+            row = self._conn.execute(
+                "SELECT body, fresh_until, stale_until, negative, size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            body, fresh_until, stale_until, negative, size = row
+            if stale_until < now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.disk_bytes -= size
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+
+        raw = zlib.decompress(body)
+        value = loads(raw)
+        if negative:
+            value = tuple(value)
+        return (fresh_until, stale_until, value, bool(negative)), len(raw)
+
+    def _store(self, key: str, entry: Tuple[float, float, Any, bool]):
+        fresh_until, stale_until, value, negative = entry
+        try:
+            raw = json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        except (TypeError, ValueError):
+            raw = None
+
+        with self._lock:
+            self._memory_put(key, entry, len(raw) if raw is not None else UNSERIALIZABLE_WEIGHT,
+                             on_disk=raw is not None)
+
+        if raw is None:
+            return
+
+        body = zlib.compress(raw, self.compress_level)
+        with self._disk_lock, self._conn:
+            previous = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, body, fresh_until, stale_until, int(negative), len(body), time.time())
+            )
+            self.disk_bytes += len(body) - (previous[0] if previous else 0)
+            if self.disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def _memory_put(self, key: str, entry: Tuple[float, float, Any, bool], weight: int, on_disk: bool):
+        """Agrega al LRU en memoria y descarta las entradas menos usadas (con self._lock tomado)"""
+        self._drop_memory(key)
+        self._memory[key] = (entry, weight, on_disk)
+        self.memory_bytes += weight
+
+        while self._memory and (self.memory_bytes > self.max_memory_bytes or len(self._memory) > self.max_entries):
+            _, (_, evicted_weight, _) = self._memory.popitem(last=False)
+            self.memory_bytes -= evicted_weight
+            self.memory_evictions += 1
+
+    def _drop_memory(self, key: str):
+        item = self._memory.pop(key, None)
+        if item is not None:
+            self.memory_bytes -= item[1]
+
+    def _evict_disk(self):
+        """Libera espacio en disco: primero lo vencido, luego lo menos usado (con _disk_lock tomado)"""
+        now = time.time()
+        target = self.max_disk_bytes * 0.9
+
+        expired = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses WHERE stale_until < ?", (now,)
+        ).fetchone()
+        self._conn.execute("DELETE FROM responses WHERE stale_until < ?", (now,))
+        self.disk_bytes -= expired[1]
+        self.disk_evictions += expired[0]
+
+        while self.disk_bytes > target:
+            rows = self._conn.execute("SELECT key, size FROM responses ORDER BY last_access LIMIT 500").fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                if self.disk_bytes <= target:
+                    break
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.disk_bytes -= size
+                self.disk_evictions += 1
+
+    def clear(self):
+        """Vacía ambos niveles"""
+        with self._lock:
+            self._memory.clear()
+            self.memory_bytes = 0
+        with self._disk_lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+            self.disk_bytes = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            memory_only = sum(1 for _, _, on_disk in self._memory.values() if not on_disk)
+        with self._disk_lock:
+            return memory_only + self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """Obtiene estadísticas del cache, con contadores por nivel"""
+        stats = super().stats()
+        stats['entries'] = len(self)
+        with self._lock:
+            stats['memory'] = {
+                'entries': len(self._memory),
+                'bytes': self.memory_bytes,
+                'max_bytes': self.max_memory_bytes,
+                'hits': self.memory_hits,
+                'misses': self.memory_misses,
+                'evictions': self.memory_evictions
+            }
+        with self._disk_lock:
+            stats['disk'] = {
+                'entries': self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0],
+                'bytes': self.disk_bytes,
+                'max_bytes': self.max_disk_bytes,
+                'hits': self.disk_hits,
+                'misses': self.disk_misses,
+                'evictions': self.disk_evictions,
+                'path': self.path
+            }
+        return stats
+
+    def close(self):
+        """Cierra el archivo del segundo nivel"""
+        with self._disk_lock:
+            self._conn.close()
+
+
+def create_cache(ttl: Optional[int] = None) -> ResponseCache:
+    """
+    Cache según la configuración: TieredCache con CACHE_ENABLED, si no solo memoria
+
+    Args:
+        ttl: TTL por defecto en segundos (por defecto Config.CACHE_TTL)
+    """
+    ttl = ttl if ttl is not None else Config.CACHE_TTL
+    if not Config.CACHE_ENABLED:
+        return ResponseCache(ttl=ttl)
+
+    return TieredCache(
+        ttl=ttl,
+        max_memory_bytes=Config.CACHE_MEMORY_MB * 1024 * 1024,
+        max_disk_bytes=Config.CACHE_DISK_MB * 1024 * 1024
+    )
+
+
+_shared_cache: Optional[ResponseCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def shared_cache() -> Optional[ResponseCache]:
+    """
+    Cache persistente del proceso, el mismo que llena `meli cache warm` (None sin CACHE_ENABLED)
+
+    Se crea la primera vez que se pide y lo comparten create_client y los workers
+    de la cola, así que hay una sola conexión a Config.CACHE_DB por proceso.
+    """
+    global _shared_cache
+    if not Config.CACHE_ENABLED:
+        return None
+
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = create_cache()
+        return _shared_cache
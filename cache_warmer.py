@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Precarga del cache de respuestas (meli cache warm)
+
+Las primeras corridas del día fallan todas las búsquedas en el cache. CacheWarmer
+recorre una especificación antes de que arranquen los trabajos:
+
+- el árbol de categorías de cada sitio (get_categories y get_category_details),
+- los vendedores que aparecen en las exportaciones recientes,
+- los productos de una lista de seguimiento (un ID por línea).
+
+Vendedores y productos se piden con el multi-get de 20 IDs y cada respuesta se
+guarda bajo la llave de su endpoint individual (/users/{id}, /items/{id}), que
+es la que consultan get_seller_info y get_product_details. Todas las peticiones
+comparten un RateLimiter, así que la precarga respeta el presupuesto de la API.
+"""
+
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional
+
+from cache import NEGATIVE_STATUSES, ResponseCache, cache_policy, make_cache_key
+from config import Config
+from mercadolibre_client import MercadoLibreClient
+from streaming_export import read_json_lines
+from throttling import RateLimiter
+
+# Máximo de IDs por petición a los multi-get de /items y /users
+BATCH_SIZE = 20
+
+# (tipo, completados, total)
+ProgressCallback = Callable[[str, int, int], None]
+
+
+@dataclass
+class WarmSpec:
+    """Qué precargar"""
+    sites: List[str] = field(default_factory=list)
+    exports_dir: Optional[str] = None
+    exports_max_age: float = 7 * 24 * 3600
+    watchlist: Optional[str] = None
+
+    @classmethod
+    def load(cls, path: str) -> 'WarmSpec':
+        """
+        Lee una especificación JSON, ej.:
+
+            {"sites": ["MLM", "MLA"], "exports_dir": "exports", "exports_max_age": 86400,
+             "watchlist": "watchlist.txt"}
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(**data)
+
+
+@dataclass
+class WarmStats:
+    """Resultado de la precarga de un tipo de recurso"""
+    targets: int = 0
+    cached_before: int = 0
+    fetched: int = 0
+    failed: int = 0
+    cached_after: int = 0
+
+    @property
+    def coverage(self) -> float:
+        """Fracción de los objetivos que quedó en el cache"""
+        return self.cached_after / self.targets if self.targets else 1.0
+
+
+def read_watchlist(path: str) -> List[str]:
+    """IDs de productos de un archivo (uno por línea, # para comentarios)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+def seller_ids_from_exports(directory: str, max_age: Optional[float] = None) -> List[str]:
+    """
+    IDs de vendedores en las exportaciones JSON y JSON Lines de un directorio
+
+    Args:
+        directory: Directorio de exportaciones
+        max_age: Solo archivos modificados en los últimos max_age segundos (None = todos)
+
+    Returns:
+        IDs sin repetir, en orden de aparición
+    """
+    if not os.path.isdir(directory):
+        return []
+
+    min_mtime = time.time() - max_age if max_age is not None else 0
+    files = [os.path.join(directory, f) for f in os.listdir(directory) if f.endswith(('.json', '.jsonl'))]
+    files = sorted((f for f in files if os.path.getmtime(f) >= min_mtime), key=os.path.getmtime)
+
+    seller_ids: Dict[str, None] = {}
+    for path in files:
+        try:
+            if path.endswith('.jsonl'):
+                rows = read_json_lines(path)
+            else:
+                with open(path, 'r', encoding='utf-8') as f:
+                    rows = json.load(f)
+            for row in rows:
+                seller_id = row.get('vendedor_id') if isinstance(row, dict) else None
+                if seller_id:
+                    seller_ids[str(seller_id)] = None
+        except (ValueError, OSError) as e:
+            logging.getLogger(__name__).warning(f"No se pudo leer {path}: {e}")
+
+    return list(seller_ids)
+
+
+class CacheWarmer:
+    """Precarga un ResponseCache (o TieredCache) a partir de una WarmSpec"""
+
+    def __init__(self, cache: ResponseCache, rate_limiter: Optional[RateLimiter] = None,
+                 concurrency: int = 4, client_factory: Optional[Callable[[str], MercadoLibreClient]] = None,
+                 on_progress: Optional[ProgressCallback] = None):
+        """
+        Inicializa el precargador
+
+        Args:
+            cache: Cache a llenar (el mismo que usarán los clientes después)
+            rate_limiter: Presupuesto compartido por todas las peticiones (por defecto uno con
+                Config.REQUESTS_PER_MINUTE y Config.DELAY_BETWEEN_REQUESTS)
+            concurrency: Peticiones simultáneas como máximo
+            client_factory: Función site_id -> cliente (por defecto MercadoLibreClient con este cache)
+            on_progress: Función llamada con (tipo, completados, total) tras cada petición
+        """
+        self.cache = cache
+        self.rate_limiter = rate_limiter or RateLimiter(Config.REQUESTS_PER_MINUTE, Config.DELAY_BETWEEN_REQUESTS)
+        self.concurrency = concurrency
+        self.client_factory = client_factory or self._create_client
+        self.on_progress = on_progress
+        self._clients: Dict[str, MercadoLibreClient] = {}
+        self.logger = logging.getLogger(__name__)
+
+    def _create_client(self, site_id: str) -> MercadoLibreClient:
+        return MercadoLibreClient(site_id=site_id, rate_limiter=self.rate_limiter, cache=self.cache)
+
+    def _client(self, site_id: str) -> MercadoLibreClient:
+        if site_id not in self._clients:
+            self._clients[site_id] = self.client_factory(site_id)
+        return self._clients[site_id]
+
+    def _progress(self, kind: str, done: int, total: int):
+        if self.on_progress is not None:
+            self.on_progress(kind, done, total)
+
+    def warm(self, spec: WarmSpec) -> Dict[str, WarmStats]:
+        """
+        Precarga todo lo que indica la especificación
+
+        Returns:
+            Diccionario tipo ('categories:MLM', 'sellers', 'items') -> WarmStats
+        """
+        report = {}
+        for site_id in spec.sites:
+            report[f'categories:{site_id}'] = self.warm_categories(site_id)
+
+        if spec.exports_dir:
+            seller_ids = seller_ids_from_exports(spec.exports_dir, spec.exports_max_age)
+            report['sellers'] = self.warm_sellers(seller_ids)
+
+        if spec.watchlist:
+            report['items'] = self.warm_items(read_watchlist(spec.watchlist))
+
+        return report
+
+    def warm_categories(self, site_id: str) -> WarmStats:
+        """Recorre el árbol de categorías de un sitio por niveles; lo que ya está en cache no sale a la red"""
+        client = self._client(site_id)
+        kind = f'categories:{site_id}'
+        stats = WarmStats()
+        keys = []
+
+        try:
+            level = [root['id'] for root in client.get_categories()]
+        except Exception as e:
+            self.logger.warning(f"No se pudieron obtener las categorías de {site_id}: {e}")
+            stats.failed += 1
+            return stats
+
+        seen = set()
+        done = 0
+        while level:
+            level = [category_id for category_id in level if category_id not in seen]
+            seen.update(level)
+            stats.targets += len(level)
+            next_level = []
+
+            for category_id in level:
+                key = make_cache_key(f"/categories/{category_id}")
+                keys.append(key)
+                if self.cache.contains(key):
+                    stats.cached_before += 1
+
+            for result in client.map('get_category_details', level, concurrency=self.concurrency, ordered=False):
+                if result.ok:
+                    next_level.extend(child['id'] for child in result.value.get('children_categories', []))
+                else:
+                    stats.failed += 1
+                done += 1
+                self._progress(kind, done, stats.targets)
+
+            level = next_level
+
+        stats.fetched = stats.targets - stats.cached_before - stats.failed
+        stats.cached_after = sum(1 for key in keys if self.cache.contains(key))
+        return stats
+
+    def warm_sellers(self, seller_ids: Iterable[str]) -> WarmStats:
+        """Precarga /users/{id} con el multi-get de /users"""
+        return self._warm_multi_get('sellers', '/users', 'get_users', seller_ids)
+
+    def warm_items(self, item_ids: Iterable[str]) -> WarmStats:
+        """Precarga /items/{id} con el multi-get de /items"""
+        return self._warm_multi_get('items', '/items', 'get_items', item_ids)
+
+    def _warm_multi_get(self, kind: str, prefix: str, method: str, ids: Iterable[str]) -> WarmStats:
+        ids = list(dict.fromkeys(str(i) for i in ids if i))
+        keys = {i: make_cache_key(f"{prefix}/{i}") for i in ids}
+        stats = WarmStats(targets=len(ids))
+        if not ids:
+            return stats
+
+        missing = [i for i in ids if not self.cache.contains(keys[i])]
+        stats.cached_before = len(ids) - len(missing)
+        batches = [missing[start:start + BATCH_SIZE] for start in range(0, len(missing), BATCH_SIZE)]
+
+        # Las llaves individuales usan la política de su familia (/items/:id, /users/:id)
+        policy = cache_policy(f"{prefix}/0", self.cache.ttl)
+        client = self._client(Config.DEFAULT_SITE)
+        done = 0
+
+        for result in client.map(method, batches, concurrency=self.concurrency, ordered=False):
+            batch = result.arg
+            if not result.ok:
+                self.logger.warning(f"No se pudieron precargar {len(batch)} {kind}: {result.error}")
+                stats.failed += len(batch)
+            else:
+                for response in result.value:
+                    body = response.get('body')
+                    entity_id = str(body.get('id', '')) if isinstance(body, dict) else ''
+                    if entity_id not in keys:
+                        continue
+                    if response.get('code') == 200:
+                        self.cache.set(keys[entity_id], body, policy.ttl, policy.stale_ttl)
+                        stats.fetched += 1
+                    elif response.get('code') in NEGATIVE_STATUSES:
+                        self.cache.set_negative(keys[entity_id], response['code'], 'multi-get', policy.negative_ttl)
+                        stats.failed += 1
+                    else:
+                        stats.failed += 1
+            done += len(batch)
+            self._progress(kind, stats.cached_before + done, stats.targets)
+
+        stats.cached_after = sum(1 for key in keys.values() if self.cache.contains(key))
+        return stats
+
+    def close(self):
+        """Cierra los clientes creados"""
+        for client in self._clients.values():
+            client.close()
+        self._clients = {}
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Árbol de categorías materializado localmente por sitio
+
+El árbol se construye con un recorrido BFS concurrente sobre /categories/{id},
+se guarda como JSON comprimido (una fila compacta por categoría) y se carga en
+un índice en memoria con búsqueda O(1) de nombre, padre, hijos y ancestros.
+Las actualizaciones son incrementales: solo se vuelven a pedir las categorías
+más viejas que max_age y las ramas nuevas.
+"""
+
+import gzip
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import Config
+
+
+@dataclass
+class CategoryNode:
+    """Una categoría del árbol"""
+    id: str
+    name: str
+    parent_id: Optional[str] = None
+    total_items: Optional[int] = None
+    fetched_at: float = 0.0
+    children: List[str] = field(default_factory=list)
+
+
+class CategoryTree:
+    """Índice en memoria del árbol de categorías de un sitio"""
+
+    def __init__(self, site_id: str, nodes: Iterable[CategoryNode] = (), built_at: float = 0.0):
+        """
+        Crea el índice
+
+        Args:
+            site_id: ID del sitio
+            nodes: Categorías del árbol (los hijos se derivan de parent_id)
+            built_at: Momento de la última construcción o actualización
+        """
+        self.site_id = site_id
+        self.built_at = built_at
+        self._nodes: Dict[str, CategoryNode] = {}
+        self._ancestors: Dict[str, Tuple[str, ...]] = {}
+        self.roots: List[str] = []
+
+        for node in nodes:
+            self._nodes[node.id] = node
+        self._link()
+
+    def _link(self):
+        """Reconstruye hijos, raíces y ancestros a partir de parent_id"""
+        self.roots = []
+        for node in self._nodes.values():
+            node.children = []
+
+        for node in self._nodes.values():
+            parent = self._nodes.get(node.parent_id) if node.parent_id else None
+            if parent is None:
+                self.roots.append(node.id)
+            else:
+                parent.children.append(node.id)
+
+        # Ancestros precalculados en orden BFS (el padre siempre se procesa antes)
+        self._ancestors = {}
+        queue = list(self.roots)
+        for root in self.roots:
+            self._ancestors[root] = ()
+        for category_id in queue:
+            node = self._nodes[category_id]
+            for child_id in node.children:
+                self._ancestors[child_id] = self._ancestors[category_id] + (category_id,)
+                queue.append(child_id)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, category_id: str) -> bool:
+        return category_id in self._nodes
+
+    def get(self, category_id: str) -> Optional[CategoryNode]:
+        """Obtiene una categoría"""
+        return self._nodes.get(category_id)
+
+    def name(self, category_id: str, default: str = '') -> str:
+        """Nombre de una categoría"""
+        node = self._nodes.get(category_id)
+        return node.name if node is not None else default
+
+    def parent(self, category_id: str) -> Optional[str]:
+        """ID de la categoría padre"""
+        node = self._nodes.get(category_id)
+        return node.parent_id if node is not None else None
+
+    def children(self, category_id: str) -> List[CategoryNode]:
+        """Subcategorías directas"""
+        node = self._nodes.get(category_id)
+        return [self._nodes[c] for c in node.children] if node is not None else []
+
+    def ancestors(self, category_id: str) -> Tuple[str, ...]:
+        """IDs de los ancestros, desde la raíz hasta el padre"""
+        return self._ancestors.get(category_id, ())
+
+    def path_from_root(self, category_id: str) -> List[Dict[str, str]]:
+        """Ruta desde la raíz con la misma forma que path_from_root de la API"""
+        if category_id not in self._nodes:
+            return []
+        return [{'id': c, 'name': self._nodes[c].name} for c in self.ancestors(category_id) + (category_id,)]
+
+    def search(self, text: str, limit: int = 20) -> List[CategoryNode]:
+        """Busca categorías cuyo nombre contenga un texto"""
+        text = text.lower()
+        return [node for node in self._nodes.values() if text in node.name.lower()][:limit]
+
+    def nodes(self) -> List[CategoryNode]:
+        """Todas las categorías"""
+        return list(self._nodes.values())
+
+    def save(self, path: str):
+        """Guarda el árbol como JSON comprimido (escritura atómica)"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        data = {
+            'site_id': self.site_id,
+            'built_at': self.built_at,
+            'nodes': [[n.id, n.name, n.parent_id, n.total_items, round(n.fetched_at, 1)]
+                      for n in self._nodes.values()]
+        }
+
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'CategoryTree':
+        """Carga un árbol guardado con save()"""
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+
+        nodes = (CategoryNode(id=row[0], name=row[1], parent_id=row[2], total_items=row[3], fetched_at=row[4])
+                 for row in data['nodes'])
+        return cls(data['site_id'], nodes, built_at=data.get('built_at', 0.0))
+
+
+def category_tree_path(site_id: str) -> str:
+    """Ruta del archivo del árbol de un sitio"""
+    return os.path.join(Config.CATEGORY_DIR, f"{site_id}.json.gz")
+
+
+def load_category_tree(site_id: str, path: Optional[str] = None) -> Optional[CategoryTree]:
+    """Carga el árbol local de un sitio (None si todavía no se ha construido)"""
+    path = path or category_tree_path(site_id)
+    if not os.path.exists(path):
+        return None
+    return CategoryTree.load(path)
+
+
+class CategoryTreeBuilder:
+    """Construye o actualiza un CategoryTree con un BFS concurrente"""
+
+    def __init__(self, client, max_workers: int = 8):
+        """
+        Inicializa el constructor
+
+        Args:
+            client: MercadoLibreClient (o compatible) del sitio a recorrer
+            max_workers: Peticiones concurrentes por nivel del árbol
+        """
+        self.client = client
+        self.max_workers = max_workers
+        self.fetched = 0
+        self.logger = logging.getLogger(__name__)
+
+    def build(self, previous: Optional[CategoryTree] = None, max_age: Optional[float] = None) -> CategoryTree:
+        """
+        Recorre el árbol nivel por nivel
+
+        Args:
+            previous: Árbol anterior; sus categorías más nuevas que max_age se reutilizan sin pedirlas
+            max_age: Antigüedad máxima en segundos de una categoría reutilizable (None = reutilizar todas)
+
+        Returns:
+            Árbol nuevo
+        """
+        now = time.time()
+        nodes: Dict[str, CategoryNode] = {}
+        self.fetched = 0
+
+        roots = self.client.get_categories()
+        level = [(root['id'], root.get('name', ''), None) for root in roots]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while level:
+                reused, to_fetch = [], []
+                for category_id, name, parent_id in level:
+                    old = previous.get(category_id) if previous is not None else None
+                    if old is not None and (max_age is None or now - old.fetched_at <= max_age):
+                        reused.append((old, parent_id))
+                    else:
+                        to_fetch.append((category_id, name, parent_id))
+
+                next_level = []
+
+                details = executor.map(self._fetch, [category_id for category_id, _, _ in to_fetch])
+                for (category_id, name, parent_id), data in zip(to_fetch, details):
+                    if data is None:
+                        # Si falla la actualización se conserva la versión anterior
+                        old = previous.get(category_id) if previous is not None else None
+                        if old is not None:
+                            reused.append((old, parent_id))
+                        continue
+                    self.fetched += 1
+                    nodes[category_id] = CategoryNode(
+                        id=category_id,
+                        name=data.get('name', name),
+                        parent_id=parent_id,
+                        total_items=data.get('total_items_in_this_category'),
+                        fetched_at=time.time()
+                    )
+                    next_level.extend(
+                        (child['id'], child.get('name', ''), category_id)
+                        for child in data.get('children_categories', [])
+                    )
+
+                for old, parent_id in reused:
+                    nodes[old.id] = CategoryNode(old.id, old.name, parent_id, old.total_items, old.fetched_at)
+                    next_level.extend((child.id, child.name, old.id) for child in previous.children(old.id))
+
+                level = [entry for entry in next_level if entry[0] not in nodes]
+
+        site_id = previous.site_id if previous is not None else self.client.site_id
+        self.logger.info(f"Árbol de categorías de {site_id}: {len(nodes)} categorías ({self.fetched} consultadas)")
+        return CategoryTree(site_id, nodes.values(), built_at=now)
+
+    def _fetch(self, category_id: str) -> Optional[Dict]:
+        try:
+            return self.client.get_category_details(category_id)
+        except Exception as e:
+            self.logger.warning(f"No se pudo obtener la categoría {category_id}: {e}")
+            return None
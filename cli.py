@@ -10,9 +10,13 @@ from rich.progress import Progress, SpinnerColumn, TextColumn
 from rich.panel import Panel
 from rich.text import Text
 from datetime import datetime
+import atexit
 import json
 import os
-from mercadolibre_client import MercadoLibreClient, Product
+from concurrent.futures import ThreadPoolExecutor
+from mercadolibre_client import MercadoLibreClient, Product, create_client
+from config import Config
+from tracing import SpanProfiler, span, tracer
 
 console = Console()
 
@@ -28,7 +32,44 @@ def cli():
       meli product MLM123456789
       meli categories
     """
-    pass
+    if Config.METRICS_ENABLED:
+        atexit.register(_save_metrics)
+    
+    if Config.OTEL_ENABLED:
+        from tracing import OpenTelemetryHook
+        try:
+            tracer.add_hook(OpenTelemetryHook())
+        except ImportError as e:
+            console.print(f"⚠️  [yellow]{e}[/yellow]")
+
+def _save_metrics():
+    """Acumula las métricas de este proceso en el snapshot de meli stats"""
+    from metrics import registry, save_snapshot
+    
+    if registry.families():
+        try:
+            save_snapshot(registry, Config.METRICS_FILE)
+        except OSError:
+            pass
+
+def print_profile(profiler: SpanProfiler):
+    """Muestra el tiempo propio de cada etapa del pipeline"""
+    table = Table(title="Perfil por etapa")
+    table.add_column("Etapa", style="cyan", no_wrap=True)
+    table.add_column("Spans", style="white", justify="right")
+    table.add_column("Tiempo", style="green", justify="right")
+    table.add_column("%", style="magenta", justify="right")
+    
+    for row in profiler.breakdown():
+        table.add_row(
+            row['stage'],
+            f"{row['count']:,}" if row['count'] else "-",
+            f"{row['seconds']:.3f}s",
+            f"{row['percent']:.1f}%"
+        )
+    
+    console.print()
+    console.print(table)
 
 @cli.command()
 @click.argument('query')
@@ -39,9 +80,38 @@ def cli():
 @click.option('--sort', default='relevance', help='Ordenamiento: relevance, price_asc, price_desc')
 @click.option('--export', '-e', help='Exportar a archivo (json/csv)')
 @click.option('--site', default='MLM', help='Sitio de MercadoLibre (MLM=México)')
-def search(query, limit, pages, category, condition, sort, export, site):
+@click.option('--sites', help='Buscar en varios sitios a la vez (ej. MLM,MLA,MLB o "all")')
+@click.option('--currency', help='Normalizar precios a una moneda (ej. USD) en búsquedas multi-sitio')
+@click.option('--history', is_flag=True, help='Guardar un snapshot de los resultados en el historial de precios')
+@click.option('--checkpoint', type=click.Path(), help='Archivo de checkpoint para reanudar búsquedas de varias páginas')
+@click.option('--profile', is_flag=True, help='Mostrar el tiempo por etapa (red, parseo, modelos, exportación, render)')
+@click.option('--parse-workers', default=Config.PARSE_WORKERS, help='Procesos para decodificar las páginas (0 = en el hilo que descarga)')
+@click.option('--free-shipping', is_flag=True, help='Solo productos con envío gratis')
+@click.option('--min-price', type=float, help='Precio mínimo (con --sites y --currency, en esa moneda)')
+@click.option('--max-price', type=float, help='Precio máximo (con --sites y --currency, en esa moneda)')
+@click.option('--max-age', default=Config.RESULT_SET_MAX_AGE, help='Antigüedad máxima (segundos) de resultados guardados para responder sin la API (0 = siempre consultar)')
+@click.option('--full-set', is_flag=True, help=f'Descargar todos los resultados (hasta {Config.RESULT_SET_MAX_ITEMS}) para responder orden y filtros localmente')
+def search(query, limit, pages, category, condition, sort, export, site, sites, currency, history, checkpoint, profile,
+           parse_workers, free_shipping, min_price, max_price, max_age, full_set):
     """Busca productos en MercadoLibre"""
     
+    if profile:
+        profiler = SpanProfiler()
+        tracer.add_hook(profiler)
+        click.get_current_context().call_on_close(lambda: print_profile(profiler))
+    
+    parse_pool = None
+    if parse_workers > 0 and pages > 1:
+        from parallel_parse import ParsePool
+        parse_pool = ParsePool(max_workers=parse_workers)
+        click.get_current_context().call_on_close(parse_pool.close)
+    
+    if sites:
+        site_ids = list(Config.AVAILABLE_SITES) if sites.lower() == 'all' else [s.strip().upper() for s in sites.split(',') if s.strip()]
+        search_multi_site(query, site_ids, limit, pages, category, condition, sort, export, currency, parse_pool,
+                          free_shipping, min_price, max_price)
+        return
+    
     console.print(f"\n🔍 [bold blue]Buscando productos: '{query}'[/bold blue]")
     console.print(f"📍 Sitio: {site} | 📄 Páginas: {pages} | 📊 Límite: {limit}")
     
@@ -52,8 +122,14 @@ def search(query, limit, pages, category, condition, sort, export, site):
     
     console.print()
     
+    # Variantes (orden, condición, envío, precio) desde el conjunto de resultados guardado;
+    # --history y --checkpoint necesitan datos recién pedidos a la API
+    local = None
+    use_local = max_age > 0 and not history and not checkpoint
+    
     try:
-        with MercadoLibreClient(site_id=site) as client:
+        with create_client(site) as client:
+            client.parse_pool = parse_pool
             
             # Calcular total de resultados a obtener
             max_results = limit * pages
@@ -66,7 +142,23 @@ def search(query, limit, pages, category, condition, sort, export, site):
                 
                 task = progress.add_task("Obteniendo productos...", total=None)
                 
-                if pages == 1:
+                if use_local:
+                    from result_set import LocalSearch
+                    
+                    searcher = LocalSearch(client, max_age=max_age)
+                    try:
+                        local = searcher.search(query, max_results=max_results, category=category,
+                                                condition=condition, sort=sort,
+                                                free_shipping=True if free_shipping else None,
+                                                min_price=min_price, max_price=max_price, build=full_set)
+                    finally:
+                        searcher.store.close()
+                
+                if local is not None:
+                    products = local.products
+                    total_found = local.total
+                    
+                elif pages == 1:
                     # Búsqueda simple de una página
                     response = client.search_products(
                         query=query,
@@ -77,18 +169,64 @@ def search(query, limit, pages, category, condition, sort, export, site):
                     )
                     
                     results = response.get('results', [])
-                    products = [Product.from_api_response(item) for item in results]
+                    with span('model-build', items=len(results)):
+                        products = [Product.from_api_response(item) for item in results]
                     total_found = response.get('paging', {}).get('total', 0)
                     
+                elif checkpoint:
+                    # Búsqueda reanudable: el progreso y los productos se guardan página a página
+                    from crawl_checkpoint import CrawlCheckpoint
+                    
+                    crawl = CrawlCheckpoint.open(checkpoint, query, category, condition, max_results, sort)
+                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                    query_clean = "".join(c for c in query if c.isalnum() or c in (' ', '-', '_')).strip().replace(' ', '_')
+                    
+                    with crawl.attach_exporter(f"{Config.EXPORTS_DIR}/{query_clean}_{timestamp}.jsonl") as exporter:
+                        products = client.search_all_pages(
+                            query=query,
+                            max_results=max_results,
+                            category=category,
+                            condition=condition,
+                            sort=sort,
+                            checkpoint=crawl,
+                            on_page=exporter.write
+                        )
+                    total_found = crawl.items_collected
+                    
                 else:
                     # Búsqueda de múltiples páginas
+                    paging = {}
                     products = client.search_all_pages(
                         query=query,
                         max_results=max_results,
                         category=category,
-                        condition=condition
+                        condition=condition,
+                        sort=sort,
+                        on_paging=paging.update
                     )
-                    total_found = len(products)
+                    total_found = paging.get('total', len(products))
+            
+            if local is not None:
+                source = "API" if local.from_network else f"resultados guardados hace {local.age:.0f}s"
+                console.print(f"⚡ Respondido desde {source} ({local.matched:,} coinciden con el orden y los filtros)")
+            elif free_shipping or min_price is not None or max_price is not None:
+                products = [
+                    p for p in products
+                    if (not free_shipping or p.free_shipping)
+                    and (min_price is None or p.price >= min_price)
+                    and (max_price is None or p.price <= max_price)
+                ]
+            
+            if checkpoint and pages > 1:
+                status = "completa" if crawl.completed else "incompleta (vuelve a ejecutar para reanudar)"
+                console.print(f"📍 Checkpoint {checkpoint}: {crawl.pages_done} páginas, {crawl.items_collected} productos, búsqueda {status}")
+                console.print(f"💾 Productos guardados en: {crawl.export_path}")
+            
+            if history and products:
+                from history_store import PriceHistoryStore
+                with PriceHistoryStore() as store, span('history', items=len(products)):
+                    counts = store.record_products(products)
+                console.print(f"🗄️  Historial: {counts['new']} nuevos, {counts['changed']} con cambios, {counts['unchanged']} sin cambios")
             
             # Mostrar resultados
             if products:
@@ -117,7 +255,8 @@ def search(query, limit, pages, category, condition, sort, export, site):
                         shipping
                     )
                 
-                console.print(table)
+                with span('render', rows=min(len(products), 20)):
+                    console.print(table)
                 
                 if len(products) > 20:
                     console.print(f"\n[dim]... y {len(products) - 20} productos más[/dim]")
@@ -143,6 +282,82 @@ def search(query, limit, pages, category, condition, sort, export, site):
     except Exception as e:
         console.print(f"\n❌ [bold red]Error: {str(e)}[/bold red]")
 
+def search_multi_site(query, site_ids, limit, pages, category, condition, sort, export, currency, parse_pool=None,
+                      free_shipping=False, min_price=None, max_price=None):
+    """
+    Busca en varios sitios en paralelo y muestra los resultados etiquetados por sitio
+
+    Con --currency, --min-price y --max-price se comparan con el precio normalizado;
+    si no, con el precio en la moneda de cada sitio.
+    """
+    from multi_site import MultiSiteSearch, export_to_json as export_multi_site_json
+    
+    console.print(f"\n🌎 [bold blue]Buscando '{query}' en {len(site_ids)} sitios[/bold blue]")
+    console.print(f"📍 Sitios: {', '.join(site_ids)} | 📄 Páginas: {pages} | 📊 Límite: {limit}\n")
+    
+    try:
+        with MultiSiteSearch(site_ids, parse_pool=parse_pool) as multi_search:
+            with Progress(
+                SpinnerColumn(),
+                TextColumn("[progress.description]{task.description}"),
+                console=console
+            ) as progress:
+                
+                task = progress.add_task("Obteniendo productos...", total=None)
+                results = multi_search.search(
+                    query=query,
+                    limit=limit,
+                    pages=pages,
+                    category=category,
+                    condition=condition,
+                    sort=sort,
+                    currency=currency
+                )
+        
+        if free_shipping or min_price is not None or max_price is not None:
+            for result in results:
+                prices = {p.id: result.normalized_price(p) if currency else p.price for p in result.products}
+                result.products = [
+                    p for p in result.products
+                    if (not free_shipping or p.free_shipping)
+                    and (min_price is None or (prices[p.id] is not None and prices[p.id] >= min_price))
+                    and (max_price is None or (prices[p.id] is not None and prices[p.id] <= max_price))
+                ]
+        
+        summary = Table(title=f"Resumen por sitio para '{query}'")
+        summary.add_column("Sitio", style="cyan")
+        summary.add_column("País", style="white")
+        summary.add_column("Productos", style="green", justify="right")
+        summary.add_column("Total disponible", style="magenta", justify="right")
+        if currency:
+            summary.add_column(f"Precio mín. ({currency})", style="yellow", justify="right")
+        summary.add_column("Tiempo", style="blue", justify="right")
+        
+        for result in results:
+            row = [
+                result.site_id,
+                Config.get_site_name(result.site_id),
+                str(len(result.products)) if not result.error else "❌ Error",
+                f"{result.total:,}"
+            ]
+            if currency:
+                prices = [p for p in (result.normalized_price(prod) for prod in result.products) if p]
+                row.append(f"${min(prices):,.2f}" if prices else "N/A")
+            row.append(f"{result.elapsed:.2f}s")
+            summary.add_row(*row)
+        
+        console.print(summary)
+        
+        if export:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            query_clean = "".join(c for c in query if c.isalnum() or c in (' ', '-', '_')).strip().replace(' ', '_')
+            filename = f"{query_clean}_multisitio_{timestamp}.json"
+            export_multi_site_json(results, filename, currency)
+            console.print(f"\n💾 [bold green]Exportado a: exports/{filename}[/bold green]")
+    
+    except Exception as e:
+        console.print(f"\n❌ [bold red]Error: {str(e)}[/bold red]")
+
 @cli.command()
 @click.argument('product_id')
 @click.option('--details', '-d', is_flag=True, help='Mostrar detalles completos')
@@ -153,7 +368,7 @@ def product(product_id, details, description):
     console.print(f"\n🔍 [bold blue]Obteniendo información del producto: {product_id}[/bold blue]\n")
     
     try:
-        with MercadoLibreClient() as client:
+        with create_client() as client:
             
             with Progress(
                 SpinnerColumn(),
@@ -163,16 +378,20 @@ def product(product_id, details, description):
                 
                 task = progress.add_task("Obteniendo detalles...", total=None)
                 
-                # Obtener detalles del producto
-                product_data = client.get_product_details(product_id)
-                
-                # Obtener descripción si se solicita
+                # Detalles y descripción (si se solicita) en paralelo: con el rate limiter del cliente
+                # (DELAY_BETWEEN_REQUESTS) la segunda petición sigue esperando su turno, así que solo
+                # ahorra tiempo con el gateway, con aciertos de cache o con DELAY_BETWEEN_REQUESTS=0
                 desc_data = None
                 if description:
-                    try:
-                        desc_data = client.get_product_description(product_id)
-                    except:
-                        console.print("[yellow]⚠️  No se pudo obtener la descripción[/yellow]")
+                    with ThreadPoolExecutor(max_workers=1) as executor:
+                        desc_future = executor.submit(client.get_product_description, product_id)
+                        product_data = client.get_product_details(product_id)
+                        try:
+                            desc_data = desc_future.result()
+                        except:
+                            console.print("[yellow]⚠️  No se pudo obtener la descripción[/yellow]")
+                else:
+                    product_data = client.get_product_details(product_id)
             
             # Mostrar información básica
             console.print(Panel.fit(
@@ -224,40 +443,64 @@ def product(product_id, details, description):
 
 @cli.command()
 @click.option('--site', default='MLM', help='Sitio de MercadoLibre')
-def categories(site):
+@click.option('--sync', is_flag=True, help='Construir o actualizar el árbol local de categorías')
+@click.option('--max-age', default=Config.CATEGORY_MAX_AGE, help='Antigüedad máxima (segundos) de las categorías locales al actualizar')
+@click.option('--workers', default=8, help='Peticiones concurrentes al recorrer el árbol')
+def categories(site, sync, max_age, workers):
     """Lista todas las categorías disponibles"""
+    from category_tree import CategoryTreeBuilder, category_tree_path, load_category_tree
     
     console.print(f"\n📂 [bold blue]Categorías de {site}[/bold blue]\n")
     
     try:
-        with MercadoLibreClient(site_id=site) as client:
-            
-            with Progress(
+        tree = load_category_tree(site)
+        
+        if sync:
+            with create_client(site) as client, Progress(
                 SpinnerColumn(),
                 TextColumn("[progress.description]{task.description}"),
                 console=console
             ) as progress:
-                
-                task = progress.add_task("Obteniendo categorías...", total=None)
-                categories_data = client.get_categories()
+                progress.add_task("Recorriendo el árbol de categorías...", total=None)
+                builder = CategoryTreeBuilder(client, max_workers=workers)
+                tree = builder.build(previous=tree, max_age=max_age)
             
-            if categories_data:
-                table = Table(title="Categorías Principales")
-                table.add_column("ID", style="cyan", no_wrap=True)
-                table.add_column("Nombre", style="white")
-                
-                for category in categories_data:
-                    table.add_row(
-                        category.get('id', 'N/A'),
-                        category.get('name', 'N/A')
-                    )
-                
-                console.print(table)
-                console.print(f"\n📊 [bold green]Total: {len(categories_data)} categorías[/bold green]")
-                
-            else:
-                console.print("❌ [bold red]No se pudieron obtener las categorías[/bold red]")
+            tree.save(category_tree_path(site))
+            console.print(f"🌳 Árbol local: {len(tree):,} categorías ({builder.fetched:,} consultadas a la API)")
+            console.print(f"💾 Guardado en: {category_tree_path(site)}\n")
+        
+        if tree is not None:
+            # Categorías raíz desde el árbol local, sin consultar la API
+            categories_data = [{'id': c, 'name': tree.name(c)} for c in tree.roots]
+        else:
+            with create_client(site) as client:
                 
+                with Progress(
+                    SpinnerColumn(),
+                    TextColumn("[progress.description]{task.description}"),
+                    console=console
+                ) as progress:
+                    
+                    task = progress.add_task("Obteniendo categorías...", total=None)
+                    categories_data = client.get_categories()
+        
+        if categories_data:
+            table = Table(title="Categorías Principales")
+            table.add_column("ID", style="cyan", no_wrap=True)
+            table.add_column("Nombre", style="white")
+            
+            for category in categories_data:
+                table.add_row(
+                    category.get('id', 'N/A'),
+                    category.get('name', 'N/A')
+                )
+            
+            console.print(table)
+            console.print(f"\n📊 [bold green]Total: {len(categories_data)} categorías[/bold green]")
+            
+        else:
+            console.print("❌ [bold red]No se pudieron obtener las categorías[/bold red]")
+            
     except Exception as e:
         console.print(f"\n❌ [bold red]Error: {str(e)}[/bold red]")
 
@@ -269,42 +512,63 @@ def category(category_id):
     console.print(f"\n📂 [bold blue]Información de la categoría: {category_id}[/bold blue]\n")
     
     try:
-        with MercadoLibreClient() as client:
-            
-            with Progress(
-                SpinnerColumn(),
-                TextColumn("[progress.description]{task.description}"),
-                console=console
-            ) as progress:
+        from category_tree import load_category_tree
+        
+        # Los IDs de categoría empiezan con el ID del sitio (ej. MLM1055)
+        tree = load_category_tree(category_id[:3])
+        
+        if tree is not None and category_id in tree:
+            node = tree.get(category_id)
+            category_data = {
+                'id': node.id,
+                'name': node.name,
+                'total_items_in_this_category': node.total_items or 0,
+                'path_from_root': tree.path_from_root(category_id),
+                'children_categories': [
+                    {'id': child.id, 'name': child.name, 'total_items_in_this_category': child.total_items or 0}
+                    for child in tree.children(category_id)
+                ]
+            }
+        else:
+            with create_client() as client:
                 
-                task = progress.add_task("Obteniendo información...", total=None)
-                category_data = client.get_category_details(category_id)
+                with Progress(
+                    SpinnerColumn(),
+                    TextColumn("[progress.description]{task.description}"),
+                    console=console
+                ) as progress:
+                    
+                    task = progress.add_task("Obteniendo información...", total=None)
+                    category_data = client.get_category_details(category_id)
+        
+        path = " › ".join(p.get('name', '') for p in category_data.get('path_from_root', []))
+        
+        console.print(Panel.fit(
+            f"[bold]{category_data.get('name', 'Sin nombre')}[/bold]\n\n"
+            f"🆔 ID: {category_data.get('id', 'N/A')}\n"
+            + (f"🗂️  Ruta: {path}\n" if path else "") +
+            f"📊 Total de productos: {category_data.get('total_items_in_this_category', 'N/A'):,}",
+            title="📂 Información de la Categoría"
+        ))
+        
+        # Subcategorías
+        children = category_data.get('children_categories', [])
+        if children:
+            console.print("\n📁 [bold]Subcategorías:[/bold]")
+            sub_table = Table()
+            sub_table.add_column("ID", style="cyan")
+            sub_table.add_column("Nombre", style="white")
+            sub_table.add_column("Productos", style="green", justify="right")
             
-            console.print(Panel.fit(
-                f"[bold]{category_data.get('name', 'Sin nombre')}[/bold]\n\n"
-                f"🆔 ID: {category_data.get('id', 'N/A')}\n"
-                f"📊 Total de productos: {category_data.get('total_items_in_this_category', 'N/A'):,}",
-                title="📂 Información de la Categoría"
-            ))
+            for child in children[:15]:  # Mostrar solo las primeras 15
+                sub_table.add_row(
+                    child.get('id', 'N/A'),
+                    child.get('name', 'N/A'),
+                    f"{child.get('total_items_in_this_category', 0):,}"
+                )
+            
+            console.print(sub_table)
             
-            # Subcategorías
-            children = category_data.get('children_categories', [])
-            if children:
-                console.print("\n📁 [bold]Subcategorías:[/bold]")
-                sub_table = Table()
-                sub_table.add_column("ID", style="cyan")
-                sub_table.add_column("Nombre", style="white")
-                sub_table.add_column("Productos", style="green", justify="right")
-                
-                for child in children[:15]:  # Mostrar solo las primeras 15
-                    sub_table.add_row(
-                        child.get('id', 'N/A'),
-                        child.get('name', 'N/A'),
-                        f"{child.get('total_items_in_this_category', 0):,}"
-                    )
-                
-                console.print(sub_table)
-                
     except Exception as e:
         console.print(f"\n❌ [bold red]Error: {str(e)}[/bold red]")
 
@@ -342,11 +606,662 @@ def setup():
     console.print("\n🧪 Probando conexión con la API...")
     
     try:
-        with MercadoLibreClient() as client:
+        with create_client() as client:
             categories = client.get_categories()
             console.print(f"✅ [bold green]Conexión exitosa! Encontradas {len(categories)} categorías[/bold green]")
     except Exception as e:
         console.print(f"❌ [bold red]Error de conexión: {str(e)}[/bold red]")
 
+@cli.group()
+def history():
+    """Consulta el historial local de precios y ventas"""
+    pass
+
+@history.command('item')
+@click.argument('item_id')
+def history_item(item_id):
+    """Muestra el historial de cambios de un producto"""
+    from history_store import PriceHistoryStore
+    
+    with PriceHistoryStore() as store:
+        changes = store.price_history(item_id)
+    
+    if not changes:
+        console.print(f"\n❌ [bold red]No hay historial para {item_id}[/bold red]")
+        return
+    
+    table = Table(title=f"Historial de {item_id}")
+    table.add_column("Fecha", style="cyan")
+    table.add_column("Precio", style="green", justify="right")
+    table.add_column("Cambio", style="yellow", justify="right")
+    table.add_column("Disponible", style="white", justify="right")
+    table.add_column("Vendidos", style="magenta", justify="right")
+    
+    for change in changes:
+        price_change = change['price_change']
+        table.add_row(
+            change['captured_at'],
+            f"${change['price']:,.2f}" if change['price'] is not None else "N/A",
+            f"{price_change:+,.2f}" if price_change else "-",
+            str(change['available_quantity'] if change['available_quantity'] is not None else "N/A"),
+            str(change['sold_quantity'] if change['sold_quantity'] is not None else "N/A")
+        )
+    
+    console.print(table)
+
+@history.command('drops')
+@click.option('--days', default=0, help='Días hacia atrás (0 = solo hoy)')
+@click.option('--limit', '-l', default=10, help='Número de productos a mostrar')
+def history_drops(days, limit):
+    """Muestra las mayores bajadas de precio"""
+    from history_store import PriceHistoryStore
+    from datetime import timedelta
+    
+    since = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days)
+    
+    with PriceHistoryStore() as store:
+        drops = store.biggest_drops(since=since, limit=limit)
+    
+    if not drops:
+        console.print("\n📉 No hay bajadas de precio en el periodo")
+        return
+    
+    table = Table(title=f"Mayores bajadas desde {since:%Y-%m-%d}")
+    table.add_column("ID", style="cyan", no_wrap=True)
+    table.add_column("Título", style="white", max_width=40)
+    table.add_column("Precio actual", style="green", justify="right")
+    table.add_column("Bajada", style="red", justify="right")
+    table.add_column("%", style="yellow", justify="right")
+    
+    for drop in drops:
+        percent = drop['percent_change']
+        table.add_row(
+            drop['item_id'],
+            drop['title'] or '',
+            f"${drop['price']:,.2f} {drop['currency_id']}",
+            f"{drop['price_change']:,.2f}",
+            f"{percent:.1f}%" if percent is not None else "N/A"
+        )
+    
+    console.print(table)
+
+@history.command('import')
+@click.option('--directory', default=Config.EXPORTS_DIR, help='Directorio con exportaciones JSON')
+def history_import(directory):
+    """Importa las exportaciones JSON existentes al historial"""
+    from history_store import PriceHistoryStore
+    
+    with PriceHistoryStore() as store:
+        totals = store.import_exports(directory)
+    
+    console.print(f"\n✅ [bold green]Importación completa:[/bold green] {totals['new']} nuevos, "
+                  f"{totals['changed']} con cambios, {totals['unchanged']} sin cambios")
+
+@cli.command()
+@click.argument('queries', nargs=-1)
+@click.option('--items-file', type=click.Path(exists=True), help='Archivo con IDs de productos (uno por línea)')
+@click.option('--max-results', default=200, help='Resultados a revisar por búsqueda')
+@click.option('--description', is_flag=True, help='Mantener también las descripciones actualizadas')
+@click.option('--site', default='MLM', help='Sitio de MercadoLibre')
+def sync(queries, items_file, max_results, description, site):
+    """Sincroniza búsquedas y productos pidiendo solo lo que cambió"""
+    from incremental_sync import IncrementalSync, SyncState
+    
+    if not queries and not items_file:
+        console.print("❌ [bold red]Indica al menos una búsqueda o --items-file[/bold red]")
+        return
+    
+    table = Table(title="Sincronización incremental")
+    table.add_column("Origen", style="cyan")
+    table.add_column("Vistos", style="white", justify="right")
+    table.add_column("Nuevos", style="green", justify="right")
+    table.add_column("Con cambios", style="yellow", justify="right")
+    table.add_column("Sin cambios", style="dim", justify="right")
+    table.add_column("Detalles pedidos", style="magenta", justify="right")
+    table.add_column("Errores", style="red", justify="right")
+    
+    def add_row(source, report):
+        table.add_row(source, str(report.seen), str(report.new), str(report.changed),
+                      str(report.unchanged), str(report.details_fetched), str(len(report.errors)))
+    
+    state = SyncState()
+    try:
+        with create_client(site) as client:
+            syncer = IncrementalSync(client, state=state)
+            
+            for query in queries:
+                console.print(f"🔄 Sincronizando búsqueda: [bold]{query}[/bold]")
+                add_row(query, syncer.sync_query(query, max_results=max_results,
+                                                 include_description=description))
+            
+            if items_file:
+                with open(items_file, 'r', encoding='utf-8') as f:
+                    item_ids = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+                console.print(f"🔄 Sincronizando {len(item_ids)} productos de {items_file}")
+                add_row(os.path.basename(items_file), syncer.sync_items(item_ids, include_description=description))
+        
+        console.print(table)
+    
+    except Exception as e:
+        console.print(f"\n❌ [bold red]Error: {str(e)}[/bold red]")
+    finally:
+        state.close()
+
+@cli.command()
+@click.option('--host', default=Config.GATEWAY_HOST, help='Host donde escuchar')
+@click.option('--port', default=Config.GATEWAY_PORT, help='Puerto donde escuchar')
+@click.option('--socket', 'socket_path', help='Escuchar en un socket Unix en lugar de TCP')
+@click.option('--ttl', default=Config.CACHE_TTL, help='TTL del cache compartido en segundos')
+def serve(host, port, socket_path, ttl):
+    """Inicia el gateway local con cache y rate limiting compartidos"""
+    from gateway import Gateway, create_server
+    from cache import create_cache
+    
+    gateway = Gateway(cache=create_cache(ttl=ttl))
+    server = create_server(gateway, host=host, port=port, socket_path=socket_path)
+    
+    address = f"unix://{socket_path}" if socket_path else f"http://{host}:{port}"
+    console.print(f"\n🚀 [bold blue]Gateway escuchando en {address}[/bold blue]")
+    console.print(f"📈 Rate limit: {Config.REQUESTS_PER_MINUTE}/min | 💾 TTL: {ttl}s")
+    console.print(f"[dim]Exporta MELI_GATEWAY_URL={address} para que la CLI lo use[/dim]\n")
+    
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        console.print("\n👋 Deteniendo gateway...")
+    finally:
+        server.server_close()
+        gateway.close()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+@cli.command()
+@click.option('--format', 'output_format', type=click.Choice(['table', 'json', 'prometheus']),
+              default='table', help='Formato de salida')
+@click.option('--reset', is_flag=True, help='Borrar el snapshot de métricas acumulado')
+def stats(output_format, reset):
+    """Muestra métricas de las peticiones por familia de endpoint"""
+    from metrics import MetricsRegistry, load_snapshot
+    
+    if reset:
+        if os.path.exists(Config.METRICS_FILE):
+            os.remove(Config.METRICS_FILE)
+        console.print("🗑️  Métricas borradas")
+        return
+    
+    if Config.GATEWAY_URL:
+        from gateway import GatewayClient
+        
+        client = GatewayClient(Config.GATEWAY_URL)
+        try:
+            snapshot = client.gateway_stats().get('metrics')
+            source = Config.GATEWAY_URL
+        except Exception as e:
+            console.print(f"\n❌ [bold red]Error: {str(e)}[/bold red]")
+            return
+        finally:
+            client.close()
+    else:
+        snapshot = load_snapshot(Config.METRICS_FILE)
+        source = Config.METRICS_FILE
+    
+    if not snapshot:
+        console.print("❌ [red]No hay métricas registradas todavía[/red]")
+        return
+    
+    metrics = MetricsRegistry()
+    metrics.merge_snapshot(snapshot)
+    
+    if output_format == 'json':
+        click.echo(json.dumps(metrics.snapshot(), indent=2))
+        return
+    if output_format == 'prometheus':
+        click.echo(metrics.to_prometheus(), nl=False)
+        return
+    
+    families = metrics.families()
+    total_time = sum(m.latency.total for m in families.values()) or 1.0
+    
+    table = Table(title=f"Métricas por endpoint ({source})")
+    table.add_column("Endpoint", style="cyan", no_wrap=True)
+    table.add_column("Peticiones", style="white", justify="right")
+    table.add_column("Errores", style="red", justify="right")
+    table.add_column("Reintentos", style="yellow", justify="right")
+    table.add_column("Cache", style="blue", justify="right")
+    table.add_column("p50", style="green", justify="right")
+    table.add_column("p99", style="green", justify="right")
+    table.add_column("Tiempo", style="magenta", justify="right")
+    table.add_column("KB", style="white", justify="right")
+    
+    # Las familias que más tiempo acumulan primero
+    for name, m in sorted(families.items(), key=lambda item: item[1].latency.total, reverse=True):
+        lookups = m.cache_hits + m.cache_misses
+        table.add_row(
+            name,
+            f"{m.total_requests:,}",
+            f"{m.errors:,}",
+            f"{m.retries:,}",
+            f"{m.cache_hits / lookups:.0%}" if lookups else "-",
+            f"{m.latency.percentile(50) * 1000:.1f}ms",
+            f"{m.latency.percentile(99) * 1000:.1f}ms",
+            f"{m.latency.total:.2f}s ({m.latency.total / total_time:.0%})",
+            f"{m.bytes_received / 1024:,.0f}"
+        )
+    
+    console.print(table)
+
+@cli.group()
+def cache():
+    """Administra el cache persistente de respuestas (Config.CACHE_DB)"""
+    pass
+
+@cache.command('warm')
+@click.option('--spec', 'spec_file', type=click.Path(exists=True), help='Especificación JSON (sites, exports_dir, exports_max_age, watchlist)')
+@click.option('--sites', help='Sitios cuyo árbol de categorías precargar (ej. MLM,MLA o "all")')
+@click.option('--exports', 'exports_dir', type=click.Path(), help='Directorio de exportaciones de donde tomar vendedores')
+@click.option('--exports-days', default=7.0, help='Solo exportaciones de los últimos N días')
+@click.option('--watchlist', type=click.Path(exists=True), help='Archivo con IDs de productos (uno por línea)')
+@click.option('--concurrency', default=4, type=click.IntRange(min=1), help='Peticiones simultáneas (todas comparten el rate limit)')
+def cache_warm(spec_file, sites, exports_dir, exports_days, watchlist, concurrency):
+    """Precarga categorías, vendedores y productos antes de los trabajos del día"""
+    from rich.progress import BarColumn, MofNCompleteColumn
+    from cache import create_cache
+    from cache_warmer import CacheWarmer, WarmSpec
+    
+    if not Config.CACHE_ENABLED:
+        console.print("❌ [bold red]El cache está desactivado (CACHE_ENABLED=false)[/bold red]")
+        return
+    
+    spec = WarmSpec.load(spec_file) if spec_file else WarmSpec()
+    if sites:
+        spec.sites = list(Config.AVAILABLE_SITES) if sites == 'all' else [s.strip().upper() for s in sites.split(',')]
+    if exports_dir:
+        spec.exports_dir = exports_dir
+        spec.exports_max_age = exports_days * 24 * 3600
+    if watchlist:
+        spec.watchlist = watchlist
+    
+    if not (spec.sites or spec.exports_dir or spec.watchlist):
+        console.print("❌ [bold red]Indica --spec, --sites, --exports o --watchlist[/bold red]")
+        return
+    
+    response_cache = create_cache()
+    with Progress(
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        MofNCompleteColumn(),
+        console=console
+    ) as progress:
+        tasks = {}
+        
+        def on_progress(kind, done, total):
+            if kind not in tasks:
+                tasks[kind] = progress.add_task(kind, total=total)
+            progress.update(tasks[kind], completed=done, total=total)
+        
+        warmer = CacheWarmer(response_cache, concurrency=concurrency, on_progress=on_progress)
+        try:
+            report = warmer.warm(spec)
+        finally:
+            warmer.close()
+    
+    table = Table(title="Precarga del cache")
+    table.add_column("Recurso", style="cyan")
+    table.add_column("Objetivos", style="white", justify="right")
+    table.add_column("Ya en cache", style="dim", justify="right")
+    table.add_column("Pedidos", style="green", justify="right")
+    table.add_column("Errores", style="red", justify="right")
+    table.add_column("Cobertura", style="magenta", justify="right")
+    
+    for kind, warm_stats in report.items():
+        table.add_row(kind, f"{warm_stats.targets:,}", f"{warm_stats.cached_before:,}", f"{warm_stats.fetched:,}",
+                      f"{warm_stats.failed:,}", f"{warm_stats.coverage:.0%}")
+    
+    console.print(table)
+    cache_stats = response_cache.stats()
+    if 'disk' in cache_stats:
+        console.print(f"💾 {cache_stats['disk']['entries']:,} respuestas en {cache_stats['disk']['path']} "
+                      f"({cache_stats['disk']['bytes'] / 1024 / 1024:.1f} MB)")
+    response_cache.close()
+
+@cli.group()
+def watch():
+    """Vigila precio y stock de productos con revisiones adaptativas"""
+    pass
+
+def _read_item_ids(item_ids, items_file):
+    ids = list(item_ids)
+    if items_file:
+        with open(items_file, 'r', encoding='utf-8') as f:
+            ids.extend(line.strip() for line in f if line.strip() and not line.startswith('#'))
+    return ids
+
+@watch.command('add')
+@click.argument('item_ids', nargs=-1)
+@click.option('--items-file', type=click.Path(exists=True), help='Archivo con IDs de productos (uno por línea)')
+def watch_add(item_ids, items_file):
+    """Agrega productos a la vigilancia"""
+    from watch import WatchStore
+    
+    ids = _read_item_ids(item_ids, items_file)
+    store = WatchStore()
+    try:
+        added = store.add(dict.fromkeys(ids), Config.WATCH_MIN_INTERVAL)
+        console.print(f"👀 {added:,} productos nuevos ({len(store):,} vigilados)")
+    finally:
+        store.close()
+
+@watch.command('remove')
+@click.argument('item_ids', nargs=-1)
+@click.option('--items-file', type=click.Path(exists=True), help='Archivo con IDs de productos (uno por línea)')
+def watch_remove(item_ids, items_file):
+    """Deja de vigilar productos"""
+    from watch import WatchStore
+    
+    store = WatchStore()
+    try:
+        removed = store.remove(_read_item_ids(item_ids, items_file))
+        console.print(f"🗑️  {removed:,} productos quitados ({len(store):,} vigilados)")
+    finally:
+        store.close()
+
+@watch.command('status')
+def watch_status():
+    """Muestra la agenda de revisiones"""
+    from watch import WatchStore
+    
+    store = WatchStore()
+    try:
+        summary = store.summary()
+    finally:
+        store.close()
+    
+    table = Table(title="Vigilancia de productos")
+    table.add_column("Métrica", style="cyan")
+    table.add_column("Valor", style="white", justify="right")
+    table.add_row("Productos", f"{summary['items']:,}")
+    table.add_row("Vencidos", f"{summary['due']:,}")
+    table.add_row("Publicaciones borradas", f"{summary['removed']:,}")
+    table.add_row("Cambios detectados", f"{summary['changes']:,}")
+    table.add_row("Intervalo promedio", f"{summary['avg_interval'] / 60:,.1f} min")
+    table.add_row("Intervalo mín / máx", f"{summary['min_interval'] / 60:,.1f} / {summary['max_interval'] / 60:,.1f} min")
+    table.add_row("Peticiones por minuto de la agenda", f"{summary['requests_per_minute']:,.1f}")
+    console.print(table)
+
+@watch.command('run')
+@click.option('--rpm', default=Config.REQUESTS_PER_MINUTE, help='Presupuesto global de peticiones por minuto')
+@click.option('--concurrency', default=4, type=click.IntRange(min=1), help='Lotes de 20 productos en vuelo a la vez')
+@click.option('--min-interval', default=Config.WATCH_MIN_INTERVAL, help='Intervalo mínimo entre revisiones (segundos)')
+@click.option('--max-interval', default=Config.WATCH_MAX_INTERVAL, help='Intervalo máximo entre revisiones (segundos)')
+@click.option('--events', 'events_file', type=click.Path(), help='Agregar los eventos a un archivo JSON Lines')
+@click.option('--once', is_flag=True, help='Hacer una sola pasada sobre los productos vencidos')
+def watch_run(rpm, concurrency, min_interval, max_interval, events_file, once):
+    """Revisa los productos vigilados y muestra los cambios conforme ocurren"""
+    import signal
+    import threading
+    from throttling import RateLimiter
+    from watch import WatchEngine, WatchStore
+    
+    events_out = open(events_file, 'a', encoding='utf-8') if events_file else None
+    
+    def on_event(event):
+        when = datetime.fromtimestamp(event.at).strftime('%H:%M:%S')
+        console.print(f"[dim]{when}[/dim] [cyan]{event.item_id}[/cyan] {event.field}: {event.old} → [bold]{event.new}[/bold]")
+        if events_out is not None:
+            events_out.write(json.dumps(event.to_dict(), ensure_ascii=False) + '\n')
+            events_out.flush()
+    
+    store = WatchStore()
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    
+    try:
+        with create_client() as client:
+            client.rate_limiter = RateLimiter(requests_per_minute=rpm,
+                                              delay_between_requests=60.0 / rpm if rpm > 0 else 0)
+            engine = WatchEngine(client, store=store, min_interval=min_interval, max_interval=max_interval,
+                                 concurrency=concurrency, on_event=on_event)
+            
+            console.print(f"👀 Vigilando {len(store):,} productos | 📈 Presupuesto: {rpm}/min")
+            if once:
+                engine.poll_once(max_items=len(store))
+            else:
+                engine.run(stop)
+            console.print(f"\n✅ {engine.polled:,} revisiones en {engine.requests:,} peticiones")
+    finally:
+        store.close()
+        if events_out is not None:
+            events_out.close()
+
+@cli.group()
+def jobs():
+    """Cola de trabajos de crawl con prioridades, fechas límite y reintentos"""
+    pass
+
+@jobs.command('add')
+@click.argument('kind', type=click.Choice(['search', 'category', 'refresh']))
+@click.argument('target', required=False, default='')
+@click.option('--site', default=Config.DEFAULT_SITE, help='Sitio de MercadoLibre')
+@click.option('--max-results', default=1000, help='Máximo de resultados (search/category)')
+@click.option('--items-file', type=click.Path(exists=True), help='Archivo con IDs de productos (refresh)')
+@click.option('--priority', default=0, help='Mayor prioridad se atiende primero')
+@click.option('--deadline', type=float, help='Descartar si no empezó en estos segundos (con --every, en cada periodo)')
+@click.option('--every', type=float, help='Repetir cada estos segundos')
+@click.option('--share', default=1.0, help='Fracción del presupuesto de peticiones (0-1)')
+@click.option('--max-attempts', default=3, help='Intentos antes de marcarlo como fallido')
+@click.option('--name', help='Nombre único (volver a agregarlo actualiza el trabajo)')
+def jobs_add(kind, target, site, max_results, items_file, priority, deadline, every, share, max_attempts, name):
+    """Encola un trabajo: search <búsqueda>, category <ID de categoría> o refresh <IDs separados por coma>"""
+    import time
+    from job_queue import JobQueue
+    
+    if kind == 'search':
+        payload = {'query': target, 'max_results': max_results}
+    elif kind == 'category':
+        payload = {'category': target, 'max_results': max_results}
+    else:
+        ids = [item_id.strip() for item_id in target.split(',') if item_id.strip()]
+        payload = {'item_ids': _read_item_ids(ids, items_file)}
+    payload['site'] = site
+    
+    queue = JobQueue()
+    try:
+        job_id = queue.submit(kind, payload, priority=priority,
+                              deadline=time.time() + deadline if deadline else None,
+                              max_attempts=max_attempts, budget_share=share, every=every, name=name)
+    finally:
+        queue.close()
+    console.print(f"📥 Trabajo {job_id} encolado ({kind}, prioridad {priority})")
+
+@jobs.command('list')
+@click.option('--state', type=click.Choice(['queued', 'running', 'done', 'failed', 'expired']), help='Solo un estado')
+@click.option('--limit', default=50, help='Máximo de trabajos a mostrar')
+def jobs_list(state, limit):
+    """Muestra los trabajos de la cola"""
+    from job_queue import JobQueue
+    
+    queue = JobQueue()
+    try:
+        counts = queue.counts()
+        rows = queue.jobs(state=state, limit=limit)
+    finally:
+        queue.close()
+    
+    table = Table(title="Trabajos")
+    table.add_column("ID", style="cyan", justify="right")
+    table.add_column("Tipo", style="white")
+    table.add_column("Objetivo", style="white")
+    table.add_column("Prioridad", justify="right")
+    table.add_column("Estado", style="yellow")
+    table.add_column("Intentos", justify="right")
+    table.add_column("Siguiente", style="dim")
+    table.add_column("Error", style="red")
+    for job in rows:
+        target = job.payload.get('query') or job.payload.get('category') or f"{len(job.payload.get('item_ids', []))} productos"
+        table.add_row(str(job.id), job.kind, f"{job.payload.get('site', '')} {target}", str(job.priority), job.state,
+                      f"{job.attempts}/{job.max_attempts}",
+                      datetime.fromtimestamp(job.run_at).strftime('%Y-%m-%d %H:%M') if job.state == 'queued' else '',
+                      (job.error or '')[:40])
+    console.print(table)
+    console.print(" | ".join(f"{name}: {count:,}" for name, count in sorted(counts.items())) or "Cola vacía")
+
+@jobs.command('work')
+@click.option('--workers', default=1, help='Trabajos en paralelo')
+@click.option('--rpm', default=Config.REQUESTS_PER_MINUTE, help='Presupuesto global de peticiones por minuto')
+@click.option('--once', is_flag=True, help='Terminar cuando no queden trabajos listos')
+def jobs_work(workers, rpm, once):
+    """Ejecuta los trabajos de la cola con un presupuesto de peticiones compartido"""
+    import signal
+    import threading
+    from job_queue import JobQueue, JobWorker
+    from throttling import RateLimiter
+    
+    queue = JobQueue()
+    limiter = RateLimiter(requests_per_minute=rpm, delay_between_requests=60.0 / rpm if rpm > 0 else 0)
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    
+    pool = [JobWorker(queue, rate_limiter=limiter) for _ in range(workers)]
+    
+    def drain(worker):
+        while not stop.is_set() and worker.run_once() is not None:
+            pass
+    
+    console.print(f"⚙️  {workers} workers | 📈 Presupuesto: {rpm}/min")
+    try:
+        target = drain if once else (lambda worker: worker.run(stop))
+        threads = [threading.Thread(target=target, args=(worker,), daemon=True) for worker in pool]
+        for thread in threads:
+            thread.start()
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=0.5)
+    finally:
+        queue.close()
+    
+    console.print(f"✅ {sum(w.completed for w in pool):,} trabajos terminados, {sum(w.failed for w in pool):,} fallidos")
+
+@cli.group()
+def crawl():
+    """Crawls repartidos entre varios nodos con una base compartida (CRAWL_DB)"""
+    pass
+
+@crawl.command('plan')
+@click.argument('queries', nargs=-1)
+@click.option('--queries-file', type=click.Path(exists=True), help='Archivo con búsquedas (una por línea)')
+@click.option('--sites', default=Config.DEFAULT_SITE, help='Sitios (ej. MLM,MLA o "all")')
+@click.option('--categories', help='Categorías a barrer completas (ej. MLM1055,MLA1051)')
+@click.option('--max-results', default=1000, help='Resultados máximos por búsqueda o categoría')
+@click.option('--unit-size', default=Config.CRAWL_UNIT_SIZE, help='Offsets por unidad de trabajo')
+@click.option('--id', 'crawl_id', help='Identificador del crawl (por defecto crawl-AAAAMMDD-HHMMSS)')
+@click.option('--priority', default=0, help='Prioridad de las unidades en la cola')
+@click.option('--share', default=1.0, help='Fracción del presupuesto de cada worker por unidad (0-1)')
+def crawl_plan(queries, queries_file, sites, categories, max_results, unit_size, crawl_id, priority, share):
+    """Divide un crawl en unidades de trabajo y las encola (coordinador)"""
+    from crawl_coordinator import Coordinator, plan_units
+    
+    site_ids = list(Config.AVAILABLE_SITES) if sites.lower() == 'all' else [s.strip().upper() for s in sites.split(',') if s.strip()]
+    category_ids = [c.strip() for c in categories.split(',') if c.strip()] if categories else []
+    units = plan_units(_read_item_ids(queries, queries_file), site_ids, max_results=max_results,
+                       unit_size=unit_size, categories=category_ids)
+    if not units:
+        console.print("❌ [bold red]Indica búsquedas, --queries-file o --categories[/bold red]")
+        return
+    
+    coordinator = Coordinator()
+    try:
+        crawl_id = coordinator.submit(units, crawl_id=crawl_id, priority=priority, budget_share=share)
+    except ValueError as e:
+        console.print(f"❌ [bold red]{e}[/bold red]")
+        return
+    finally:
+        coordinator.close()
+    console.print(f"📋 Crawl [cyan]{crawl_id}[/cyan]: {len(units):,} unidades en {Config.CRAWL_DB}")
+    console.print(f"   En cada nodo: python cli.py crawl work | Al terminar: python cli.py crawl export {crawl_id}")
+
+@crawl.command('work')
+@click.option('--workers', default=1, help='Unidades en paralelo en este nodo')
+@click.option('--rpm', default=Config.REQUESTS_PER_MINUTE, help='Presupuesto de peticiones por minuto de este nodo')
+def crawl_work(workers, rpm):
+    """Toma unidades de la base compartida hasta que no quede ninguna (worker)"""
+    import signal
+    import threading
+    from crawl_coordinator import Coordinator, CrawlWorker
+    from throttling import RateLimiter
+    
+    coordinator = Coordinator()
+    limiter = RateLimiter(requests_per_minute=rpm, delay_between_requests=60.0 / rpm if rpm > 0 else 0)
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    
+    pool = [CrawlWorker(coordinator, rate_limiter=limiter) for _ in range(workers)]
+    console.print(f"⚙️  {workers} workers | 📈 Presupuesto del nodo: {rpm}/min | {coordinator.pending():,} unidades pendientes")
+    try:
+        threads = [threading.Thread(target=worker.drain, args=(stop,), daemon=True) for worker in pool]
+        for thread in threads:
+            thread.start()
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=0.5)
+    finally:
+        coordinator.close()
+    
+    console.print(f"✅ {sum(w.completed for w in pool):,} unidades terminadas, {sum(w.failed for w in pool):,} fallidas")
+
+@crawl.command('status')
+@click.argument('crawl_id', required=False)
+def crawl_status(crawl_id):
+    """Muestra el avance de un crawl (o la lista de crawls)"""
+    from crawl_coordinator import Coordinator
+    
+    coordinator = Coordinator()
+    try:
+        if not crawl_id:
+            table = Table(title="Crawls")
+            table.add_column("ID", style="cyan")
+            table.add_column("Creado", style="white")
+            table.add_column("Unidades", justify="right")
+            for info in coordinator.crawls():
+                table.add_row(info['crawl_id'], datetime.fromtimestamp(info['created_at']).strftime('%Y-%m-%d %H:%M'),
+                              f"{info['units']:,}")
+            console.print(table)
+            return
+        
+        try:
+            progress = coordinator.progress(crawl_id)
+        except ValueError as e:
+            console.print(f"❌ [bold red]{e}[/bold red]")
+            return
+    finally:
+        coordinator.close()
+    
+    states = " | ".join(f"{name}: {count:,}" for name, count in sorted(progress['states'].items()))
+    console.print(f"📋 {crawl_id}: {progress['units']:,} unidades ({states})")
+    console.print(f"📦 {progress['items']:,} productos únicos | {'✅ terminado' if progress['finished'] else '⏳ en curso'}")
+
+@crawl.command('export')
+@click.argument('crawl_id')
+@click.option('--output', help='Archivo .jsonl (por defecto exports/<crawl>.jsonl)')
+def crawl_export(crawl_id, output):
+    """Escribe los productos del crawl, sin duplicados, a un solo archivo JSON Lines"""
+    from crawl_coordinator import Coordinator
+    
+    output = output or os.path.join(Config.EXPORTS_DIR, f"{crawl_id}.jsonl")
+    coordinator = Coordinator()
+    try:
+        progress = coordinator.progress(crawl_id)
+        if not progress['finished']:
+            console.print(f"⚠️  El crawl sigue en curso; se exportan los {progress['items']:,} productos obtenidos hasta ahora")
+        count = coordinator.export(crawl_id, output)
+    except ValueError as e:
+        console.print(f"❌ [bold red]{e}[/bold red]")
+        return
+    finally:
+        coordinator.close()
+    console.print(f"💾 {count:,} productos exportados a {output}")
+
 if __name__ == '__main__':
     cli()
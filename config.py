@@ -3,6 +3,7 @@
 Configuración centralizada para el cliente de MercadoLibre API
 """
 
+import json
 import os
 from typing import Dict, Any
 from dotenv import load_dotenv
@@ -26,6 +27,48 @@ class Config:
     # Cache
     CACHE_ENABLED = os.getenv('CACHE_ENABLED', 'true').lower() == 'true'
     CACHE_TTL = int(os.getenv('CACHE_TTL', 3600))
+    CACHE_NEGATIVE_TTL = int(os.getenv('CACHE_NEGATIVE_TTL', 600))
+    # Resultados de búsqueda: 0 = no se guardan salvo que la llamada lo pida (search_products(cache_ttl=...))
+    SEARCH_CACHE_TTL = int(os.getenv('SEARCH_CACHE_TTL', 0))
+    
+    # Política por familia de endpoints (ver metrics.endpoint_family): segundos que una
+    # respuesta es fresca (ttl), que se sirve vencida mientras se refresca en segundo
+    # plano (stale_ttl) y que se recuerda un 404/410 (negative_ttl).
+    # CACHE_POLICIES en el entorno (JSON) reemplaza o agrega familias.
+    CACHE_POLICIES = {
+        'default': {'ttl': CACHE_TTL, 'stale_ttl': 0, 'negative_ttl': CACHE_NEGATIVE_TTL},
+        '/sites/:site/search': {'ttl': SEARCH_CACHE_TTL, 'negative_ttl': 0},
+        '/sites/:site/categories': {'ttl': 24 * 3600, 'stale_ttl': 7 * 24 * 3600},
+        '/categories/:id': {'ttl': 24 * 3600, 'stale_ttl': 7 * 24 * 3600, 'negative_ttl': CACHE_NEGATIVE_TTL},
+        '/users/:id': {'ttl': 3600, 'stale_ttl': 24 * 3600, 'negative_ttl': CACHE_NEGATIVE_TTL},
+        '/users': {'ttl': 3600, 'stale_ttl': 24 * 3600},
+        '/currency_conversions/search': {'ttl': 3600, 'stale_ttl': 6 * 3600},
+        # El multi-get de items detecta cambios (incremental_sync); solo se recuerdan sus 404 por ID
+        '/items': {'ttl': 0}
+    }
+    CACHE_POLICIES.update(json.loads(os.getenv('CACHE_POLICIES', '{}')))
+    
+    # Gateway local (meli serve)
+    GATEWAY_URL = os.getenv('MELI_GATEWAY_URL')
+    GATEWAY_HOST = os.getenv('MELI_GATEWAY_HOST', '127.0.0.1')
+    GATEWAY_PORT = int(os.getenv('MELI_GATEWAY_PORT', 8765))
+    
+    # Transporte HTTP: 'requests' (por defecto) o 'httpx' (HTTP/2 multiplexado)
+    HTTP_TRANSPORT = os.getenv('MELI_HTTP_TRANSPORT', 'requests')
+    HTTP2 = os.getenv('MELI_HTTP2', 'true').lower() == 'true'
+    HTTP_MAX_CONNECTIONS = int(os.getenv('MELI_HTTP_MAX_CONNECTIONS', 10))
+    HTTP_MAX_KEEPALIVE = int(os.getenv('MELI_HTTP_MAX_KEEPALIVE', 10))
+    HTTP_KEEPALIVE_EXPIRY = float(os.getenv('MELI_HTTP_KEEPALIVE_EXPIRY', 30))
+    
+    # Pool de conexiones compartido por todos los clientes del proceso (ver SessionRegistry)
+    HTTP_SHARED_SESSION = os.getenv('MELI_HTTP_SHARED_SESSION', 'true').lower() == 'true'
+    HTTP_POOL_CONNECTIONS = int(os.getenv('MELI_HTTP_POOL_CONNECTIONS', 10))
+    HTTP_POOL_MAXSIZE = int(os.getenv('MELI_HTTP_POOL_MAXSIZE', 20))
+    DNS_CACHE_TTL = float(os.getenv('MELI_DNS_CACHE_TTL', 300))
+    
+    # Cassettes de grabación/reproducción (ver transport.py)
+    CASSETTE_PATH = os.getenv('MELI_CASSETTE')
+    CASSETTE_MODE = os.getenv('MELI_CASSETTE_MODE', 'replay')
     
     # URLs base
     API_BASE_URL = "https://api.mercadolibre.com"
@@ -35,6 +78,55 @@ class Config:
     EXPORTS_DIR = "exports"
     CACHE_DIR = "cache"
     LOGS_DIR = "logs"
+    DATA_DIR = "data"
+    
+    # Historial de precios
+    HISTORY_DB = os.getenv('HISTORY_DB', os.path.join(DATA_DIR, 'price_history.db'))
+    
+    # Estado de sincronización incremental
+    SYNC_DB = os.getenv('SYNC_DB', os.path.join(DATA_DIR, 'sync_state.db'))
+    
+    # Árbol de categorías local por sitio (meli categories --sync)
+    CATEGORY_DIR = os.getenv('CATEGORY_DIR', os.path.join(DATA_DIR, 'categories'))
+    CATEGORY_MAX_AGE = int(os.getenv('CATEGORY_MAX_AGE', 7 * 24 * 3600))
+    
+    # Perfiles de vendedores (nickname y reputación); vigencia en segundos
+    SELLER_DB = os.getenv('SELLER_DB', os.path.join(DATA_DIR, 'sellers.db'))
+    SELLER_TTL = int(os.getenv('SELLER_TTL', 24 * 3600))
+    
+    # Cache de dos niveles (cache.TieredCache): LRU en memoria y SQLite comprimido en disco
+    CACHE_DB = os.getenv('CACHE_DB', os.path.join(CACHE_DIR, 'responses.db'))
+    CACHE_MEMORY_MB = int(os.getenv('CACHE_MEMORY_MB', 64))
+    CACHE_DISK_MB = int(os.getenv('CACHE_DISK_MB', 512))
+    
+    # Conjuntos de resultados para responder variantes de una búsqueda sin la API (result_set.py):
+    # antigüedad máxima en segundos y tamaño máximo de un conjunto que se descarga completo
+    RESULT_SET_DB = os.getenv('RESULT_SET_DB', os.path.join(DATA_DIR, 'result_sets.db'))
+    RESULT_SET_MAX_AGE = int(os.getenv('RESULT_SET_MAX_AGE', 900))
+    RESULT_SET_MAX_ITEMS = int(os.getenv('RESULT_SET_MAX_ITEMS', 1000))
+    
+    # Monitoreo adaptativo de productos (meli watch): intervalo entre revisiones en segundos
+    WATCH_DB = os.getenv('WATCH_DB', os.path.join(DATA_DIR, 'watch.db'))
+    WATCH_MIN_INTERVAL = int(os.getenv('WATCH_MIN_INTERVAL', 300))
+    WATCH_MAX_INTERVAL = int(os.getenv('WATCH_MAX_INTERVAL', 6 * 3600))
+    
+    # Cola de trabajos de crawl (meli jobs): lease en segundos antes de reencolar un trabajo sin latido
+    JOB_DB = os.getenv('JOB_DB', os.path.join(DATA_DIR, 'jobs.db'))
+    JOB_LEASE = int(os.getenv('JOB_LEASE', 300))
+    
+    # Crawls repartidos entre nodos (meli crawl): base en almacenamiento compartido y offsets por unidad de trabajo
+    CRAWL_DB = os.getenv('CRAWL_DB', os.path.join(DATA_DIR, 'crawl.db'))
+    CRAWL_UNIT_SIZE = int(os.getenv('CRAWL_UNIT_SIZE', 200))
+    
+    # Procesos para decodificar páginas de búsqueda fuera del GIL (0 = en el hilo que descarga)
+    PARSE_WORKERS = int(os.getenv('PARSE_WORKERS', 0))
+    
+    # Snapshot de métricas acumulado por la CLI (meli stats)
+    METRICS_FILE = os.getenv('METRICS_FILE', os.path.join(LOGS_DIR, 'metrics.json'))
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    
+    # Reenviar los spans del pipeline a OpenTelemetry (requiere opentelemetry-api)
+    OTEL_ENABLED = os.getenv('MELI_OTEL', 'false').lower() == 'true'
     
     # Configuración de logging
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
@@ -53,6 +145,19 @@ class Config:
         'MLV': 'Venezuela'
     }
     
+    # Moneda local de cada sitio
+    SITE_CURRENCIES = {
+        'MLA': 'ARS',
+        'MLB': 'BRL',
+        'MLC': 'CLP',
+        'MCO': 'COP',
+        'MCR': 'CRC',
+        'MEC': 'USD',
+        'MLM': 'MXN',
+        'MLU': 'UYU',
+        'MLV': 'VES'
+    }
+    
     # Condiciones de productos
     PRODUCT_CONDITIONS = {
         'new': 'Nuevo',
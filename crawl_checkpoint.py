@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Checkpoints para reanudar búsquedas largas de search_all_pages
+"""
+
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from streaming_export import JsonLinesExporter
+
+
+@dataclass
+class CrawlCheckpoint:
+    """Progreso persistente de una búsqueda paginada"""
+    path: str
+    query: str
+    category: Optional[str] = None
+    condition: Optional[str] = None
+    sort: str = 'relevance'
+    max_results: int = 1000
+    next_offset: int = 0
+    pages_done: int = 0
+    total: Optional[int] = None
+    item_ids: List[str] = field(default_factory=list)
+    export_path: Optional[str] = None
+    completed: bool = False
+    updated_at: Optional[str] = None
+
+    @classmethod
+    def load(cls, path: str) -> Optional['CrawlCheckpoint']:
+        """Carga un checkpoint desde disco (None si no existe)"""
+        if not os.path.exists(path):
+            return None
+
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        data['path'] = path
+        return cls(**data)
+
+    @classmethod
+    def open(cls, path: str, query: str, category: Optional[str] = None,
+             condition: Optional[str] = None, max_results: int = 1000,
+             sort: str = 'relevance') -> 'CrawlCheckpoint':
+        """
+        Carga el checkpoint de una búsqueda o crea uno nuevo
+
+        Si el archivo existe pero corresponde a otra búsqueda (u otro orden), se
+        empieza de cero. Una búsqueda terminada se reabre si ahora se piden más
+        resultados de los obtenidos y la API tiene más.
+
+        Args:
+            path: Ruta del archivo de checkpoint
+            query: Término de búsqueda
+            category: ID de categoría
+            condition: Condición del producto
+            max_results: Número máximo de resultados
+            sort: Ordenamiento (relevance, price_asc, price_desc)
+
+        Returns:
+            Checkpoint listo para usar con search_all_pages
+        """
+        checkpoint = cls.load(path)
+
+        if checkpoint is not None and checkpoint.matches(query, category, condition, sort):
+            checkpoint.max_results = max_results
+            if (checkpoint.completed and max_results > checkpoint.items_collected
+                    and checkpoint.total is not None and checkpoint.next_offset < checkpoint.total):
+                checkpoint.completed = False
+            return checkpoint
+
+        return cls(path=path, query=query, category=category, condition=condition, sort=sort,
+                   max_results=max_results)
+
+    def matches(self, query: str, category: Optional[str], condition: Optional[str],
+                sort: str = 'relevance') -> bool:
+        """Indica si el checkpoint corresponde a la búsqueda indicada (en el mismo orden)"""
+        return (self.query, self.category, self.condition, self.sort) == (query, category, condition, sort)
+
+    @property
+    def items_collected(self) -> int:
+        """Número de productos obtenidos hasta ahora"""
+        return len(self.item_ids)
+
+    def record_page(self, next_offset: int, item_ids: List[str], total: Optional[int] = None):
+        """Registra una página completada y guarda el checkpoint"""
+        self.next_offset = next_offset
+        self.pages_done += 1
+        self.item_ids.extend(item_ids)
+        if total is not None:
+            self.total = total
+        self.save()
+
+    def attach_exporter(self, default_path: str) -> JsonLinesExporter:
+        """
+        Abre el exportador JSON Lines asociado a la búsqueda
+
+        Al reanudar se reutiliza el mismo archivo y se descartan las líneas
+        escritas después del último checkpoint, de modo que cada producto
+        quede exportado una sola vez.
+
+        Args:
+            default_path: Archivo a usar si el checkpoint aún no tiene uno
+
+        Returns:
+            Exportador listo para pasar como on_page a search_all_pages
+        """
+        resuming = self.export_path is not None and os.path.exists(self.export_path)
+        if not resuming:
+            self.export_path = default_path
+
+        exporter = JsonLinesExporter(self.export_path, append=resuming)
+        if resuming:
+            exporter.truncate_to(self.items_collected)
+
+        self.save()
+        return exporter
+
+    def mark_completed(self):
+        """Marca la búsqueda como terminada"""
+        self.completed = True
+        self.save()
+
+    def save(self):
+        """Guarda el checkpoint de forma atómica"""
+        self.updated_at = datetime.now().isoformat(timespec='seconds')
+        data: Dict[str, Any] = asdict(self)
+        del data['path']
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
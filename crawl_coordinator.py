@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Crawls repartidos entre varios nodos (coordinador y workers)
+
+Un barrido de búsquedas × sitios (o de particiones por categoría) se divide en
+unidades de trabajo: una búsqueda en un sitio y un rango de offsets. El
+coordinador las encola en una JobQueue sobre un SQLite compartido (ej. un
+volumen NFS montado en todos los nodos) y los CrawlWorker de cada nodo las
+toman con lease: si un nodo cae, sus unidades vuelven a la cola cuando vence el
+lease y otro nodo las repite.
+
+Los productos de cada unidad se guardan en la misma base con llave (crawl,
+item_id), así que lo repetido por reintentos o por resultados que se mueven
+entre páginas se descarta al insertar. Al terminar, export() escribe un solo
+JSON Lines con todos los productos sin duplicados.
+
+La base usa el journal clásico (DELETE) en lugar de WAL: WAL necesita memoria
+compartida y no funciona entre máquinas distintas.
+"""
+
+import dataclasses
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from config import Config
+from job_queue import JobQueue, JobWorker
+from mercadolibre_client import MercadoLibreClient, Product, SearchPage
+from search_query import MAX_LIMIT, normalize_query
+from streaming_export import JsonLinesExporter
+from throttling import RateLimiter
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS crawls (
+    crawl_id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    units INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS crawl_results (
+    crawl_id TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    site_id TEXT NOT NULL,
+    unit INTEGER NOT NULL,
+    product TEXT NOT NULL,
+    PRIMARY KEY (crawl_id, item_id)
+);
+"""
+
+# Tipo de trabajo de las unidades en la JobQueue
+UNIT_KIND = 'crawl_unit'
+
+
+@dataclass
+class WorkUnit:
+    """Una búsqueda en un sitio, restringida a los offsets [offset, end)"""
+    site: str
+    query: str
+    category: Optional[str]
+    offset: int
+    end: int
+
+
+def plan_units(queries: Iterable[str], sites: Iterable[str], max_results: int = 1000,
+               unit_size: Optional[int] = None, categories: Iterable[str] = ()) -> List[WorkUnit]:
+    """
+    Divide un crawl en unidades de trabajo
+
+    Args:
+        queries: Búsquedas (las que normalizan igual se piden una sola vez)
+        sites: Sitios en los que se hace cada búsqueda
+        max_results: Resultados máximos por búsqueda o categoría
+        unit_size: Offsets por unidad, múltiplo de 50 (por defecto Config.CRAWL_UNIT_SIZE)
+        categories: Categorías a barrer completas (el sitio sale del prefijo, ej. MLM1055)
+
+    Returns:
+        Unidades en orden: cada búsqueda por sitio y luego cada categoría
+    """
+    unit_size = unit_size or Config.CRAWL_UNIT_SIZE
+    unit_size = max(MAX_LIMIT, unit_size - unit_size % MAX_LIMIT)
+
+    targets = []
+    seen = set()
+    for site in sites:
+        for query in queries:
+            key = (site.upper(), normalize_query(query))
+            if key[1] and key not in seen:
+                seen.add(key)
+                targets.append((site.upper(), query.strip(), None))
+    for category in categories:
+        targets.append((category[:3].upper(), '', category.upper()))
+
+    return [WorkUnit(site, query, category, offset, min(offset + unit_size, max_results))
+            for site, query, category in targets
+            for offset in range(0, max_results, unit_size)]
+
+
+class Coordinator:
+    """Crea crawls, sigue su avance y combina sus resultados"""
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Abre (o crea) la base compartida del crawl
+
+        Args:
+            path: Ruta del archivo SQLite, visible para todos los nodos (por defecto Config.CRAWL_DB)
+        """
+        self.path = path or Config.CRAWL_DB
+        self.queue = JobQueue(self.path, journal_mode='DELETE')
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def submit(self, units: List[WorkUnit], crawl_id: Optional[str] = None, priority: int = 0,
+               budget_share: float = 1.0, max_attempts: int = 3) -> str:
+        """
+        Encola las unidades de un crawl nuevo
+
+        Args:
+            units: Unidades de trabajo (ver plan_units)
+            crawl_id: Identificador del crawl (por defecto crawl-AAAAMMDD-HHMMSS)
+            priority: Prioridad de las unidades en la cola
+            budget_share: Fracción del presupuesto de peticiones de cada worker que usa una unidad
+            max_attempts: Intentos por unidad antes de marcarla como fallida
+
+        Returns:
+            Identificador del crawl
+        """
+        crawl_id = crawl_id or time.strftime('crawl-%Y%m%d-%H%M%S')
+        with self._lock:
+            try:
+                with self._conn:
+                    self._conn.execute("INSERT INTO crawls VALUES (?, ?, ?)", (crawl_id, time.time(), len(units)))
+            except sqlite3.IntegrityError:
+                raise ValueError(f"El crawl {crawl_id} ya existe")
+
+        for index, unit in enumerate(units):
+            payload = dict(dataclasses.asdict(unit), crawl=crawl_id, unit=index)
+            self.queue.submit(UNIT_KIND, payload, priority=priority, max_attempts=max_attempts,
+                              budget_share=budget_share, name=f"{crawl_id}/{index:06d}")
+        return crawl_id
+
+    def store(self, crawl_id: str, unit: int, site_id: str, products: Iterable[Product]) -> int:
+        """Guarda los productos de una unidad y regresa cuántos no estaban ya en el crawl"""
+        rows = [(crawl_id, product.id, site_id, unit, json.dumps(dataclasses.astuple(product), ensure_ascii=False))
+                for product in products]
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany("INSERT OR IGNORE INTO crawl_results VALUES (?, ?, ?, ?, ?)", rows)
+            return self._conn.total_changes - before
+
+    def progress(self, crawl_id: str) -> Dict[str, Any]:
+        """Unidades por estado y productos únicos de un crawl"""
+        with self._lock:
+            row = self._conn.execute("SELECT units FROM crawls WHERE crawl_id = ?", (crawl_id,)).fetchone()
+            items = self._conn.execute("SELECT COUNT(*) FROM crawl_results WHERE crawl_id = ?",
+                                       (crawl_id,)).fetchone()[0]
+        if row is None:
+            raise ValueError(f"No existe el crawl {crawl_id}")
+
+        counts = self.queue.counts(kind=UNIT_KIND, name_prefix=f"{crawl_id}/")
+        return {'units': row[0], 'states': counts, 'items': items,
+                'finished': not counts.get('queued') and not counts.get('running')}
+
+    def pending(self) -> int:
+        """Unidades de cualquier crawl que siguen en cola o en curso"""
+        counts = self.queue.counts(kind=UNIT_KIND)
+        return counts.get('queued', 0) + counts.get('running', 0)
+
+    def crawls(self) -> List[Dict[str, Any]]:
+        """Crawls registrados, del más reciente al más antiguo"""
+        with self._lock:
+            rows = self._conn.execute("SELECT crawl_id, created_at, units FROM crawls ORDER BY created_at DESC").fetchall()
+        return [{'crawl_id': crawl_id, 'created_at': created_at, 'units': units} for crawl_id, created_at, units in rows]
+
+    def export(self, crawl_id: str, filepath: str, batch_size: int = 1000) -> int:
+        """
+        Escribe los productos del crawl, sin duplicados, a un archivo JSON Lines
+
+        Los productos quedan agrupados por sitio y en el orden de sus unidades.
+
+        Returns:
+            Número de productos exportados
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT product FROM crawl_results WHERE crawl_id = ? ORDER BY site_id, unit, rowid", (crawl_id,)
+            ).fetchall()
+
+        with JsonLinesExporter(filepath) as exporter:
+            for start in range(0, len(rows), batch_size):
+                exporter.write(Product(*json.loads(product)) for (product,) in rows[start:start + batch_size])
+            return exporter.count
+
+    def close(self):
+        """Cierra las conexiones"""
+        self.queue.close()
+        self._conn.close()
+
+
+class CrawlWorker(JobWorker):
+    """Worker de un nodo: toma unidades de la base compartida y guarda sus productos"""
+
+    def __init__(self, coordinator: Coordinator, rate_limiter: Optional[RateLimiter] = None,
+                 client_factory: Optional[Callable[[str, RateLimiter], MercadoLibreClient]] = None,
+                 worker_id: Optional[str] = None, lease: Optional[float] = None):
+        """
+        Inicializa el worker
+
+        Args:
+            coordinator: Coordinator abierto sobre la base compartida
+            rate_limiter: Presupuesto de peticiones de este nodo
+            client_factory: Función (site_id, rate_limiter) -> cliente
+            worker_id: Identificador del worker (por defecto host:pid:aleatorio)
+            lease: Segundos de cada lease (por defecto Config.JOB_LEASE)
+        """
+        super().__init__(coordinator.queue, rate_limiter=rate_limiter, handlers={UNIT_KIND: self.run_unit},
+                         client_factory=client_factory, worker_id=worker_id, lease=lease)
+        self.coordinator = coordinator
+
+    def run_unit(self, client: MercadoLibreClient, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Pide las páginas de una unidad y guarda sus productos"""
+        products: List[Product] = []
+        offset = payload['offset']
+        while offset < payload['end']:
+            page = client.search_products(query=payload['query'], limit=min(MAX_LIMIT, payload['end'] - offset),
+                                          offset=offset, category=payload.get('category'),
+                                          decoder=SearchPage.decode)
+            products.extend(page.products)
+            offset += MAX_LIMIT
+            if not page.products or offset >= page.paging.get('total', 0):
+                break
+
+        new = self.coordinator.store(payload['crawl'], payload['unit'], payload['site'], products)
+        return {'items': len(products), 'new': new}
+
+    def drain(self, stop: Optional[threading.Event] = None, idle: float = 5.0):
+        """
+        Ejecuta unidades hasta que no quede ninguna en cola ni en curso
+
+        Mientras otro nodo tenga unidades en curso se espera: si ese nodo cae, sus
+        unidades vuelven a la cola al vencer el lease y este worker las toma.
+        """
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            if self.run_once() is None:
+                if not self.coordinator.pending():
+                    return
+                stop.wait(idle)
@@ -150,17 +150,25 @@ def example_seller_analysis():
         # Mostrar top vendedores
         top_sellers = sorted(sellers.items(), key=lambda x: x[1]['products'], reverse=True)[:5]
         
+        # Nickname y reputación de todos los vendedores en una sola llamada
+        profiles = client.get_sellers(sellers)
+        
         console.print(f"\n👥 [bold]Top 5 vendedores por número de productos:[/bold]")
         
         table = Table()
         table.add_column("Vendedor ID", style="cyan")
+        table.add_column("Nickname", style="blue")
+        table.add_column("Reputación", style="white")
         table.add_column("Productos", style="green", justify="right")
         table.add_column("Ventas Totales", style="yellow", justify="right")
         table.add_column("Precio Promedio", style="magenta", justify="right")
         
         for seller_id, data in top_sellers:
+            profile = profiles.get(str(seller_id), {})
             table.add_row(
-                seller_id,
+                str(seller_id),
+                profile.get('nickname', ''),
+                profile.get('seller_reputation', {}).get('level_id') or 'N/A',
                 str(data['products']),
                 str(data['total_sales']),
                 f"${data['avg_price']:,.2f}"
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Decodificación rápida de respuestas JSON de la API
+
+Con msgspec instalado, las respuestas de búsqueda y de items se decodifican
+directamente a structs tipados que solo declaran los campos que usamos; el
+resto del payload (atributos, variaciones, filtros, etc.) se salta sin crear
+diccionarios. Sin msgspec se usa orjson para parsear y, si tampoco está, el
+módulo json de la biblioteca estándar. El resultado es el mismo en los tres casos.
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - depende del entorno
+    msgspec = None
+
+if msgspec is not None:
+    BACKEND = 'msgspec'
+elif orjson is not None:
+    BACKEND = 'orjson'
+else:
+    BACKEND = 'json'
+
+
+def loads(body: Union[bytes, str]) -> Any:
+    """Parsea JSON con orjson si está disponible"""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def product_fields(item: Dict) -> Dict[str, Any]:
+    """Campos de Product a partir de un resultado de búsqueda (diccionario)"""
+    shipping = item.get('shipping', {})
+    seller = item.get('seller', {})
+
+    return {
+        'id': item.get('id', ''),
+        'title': item.get('title', ''),
+        'price': item.get('price', 0.0),
+        'currency_id': item.get('currency_id', 'MXN'),
+        'permalink': item.get('permalink', ''),
+        'thumbnail': item.get('thumbnail', ''),
+        'condition': item.get('condition', ''),
+        'listing_type_id': item.get('listing_type_id', ''),
+        'seller_id': seller.get('id'),
+        'category_id': item.get('category_id'),
+        'available_quantity': item.get('available_quantity'),
+        'sold_quantity': item.get('sold_quantity'),
+        'free_shipping': shipping.get('free_shipping', False),
+        'official_store_id': item.get('official_store_id'),
+        'seller_reputation': seller.get('seller_reputation')
+    }
+
+
+def authenticated_fields(item: Dict) -> Dict[str, Any]:
+    """
+    Campos de AuthenticatedProduct que vienen en el propio item (diccionario)
+
+    Los resultados de búsqueda traen el vendedor en seller.id y los items en seller_id.
+    """
+    seller_id = item.get('seller_id', item.get('seller', {}).get('id', ''))
+
+    return {
+        'id': item.get('id', ''),
+        'title': item.get('title', ''),
+        'price': item.get('price', 0.0),
+        'currency': item.get('currency_id', 'MXN'),
+        'permalink': item.get('permalink', ''),
+        'thumbnail': item.get('thumbnail', ''),
+        'condition': item.get('condition', ''),
+        'sold_quantity': item.get('sold_quantity', 0),
+        'available_quantity': item.get('available_quantity', 0),
+        'seller_id': seller_id,
+        'category_id': item.get('category_id', ''),
+        'free_shipping': item.get('shipping', {}).get('free_shipping', False),
+        'listing_type': item.get('listing_type_id', ''),
+        'buying_mode': item.get('buying_mode', ''),
+        'location': item.get('seller_address', {}).get('city', {}).get('name', ''),
+        'attributes': item.get('attributes', []),
+        'pictures': [pic.get('url', '') for pic in item.get('pictures', [])],
+        'warranty': item.get('warranty', '')
+    }
+
+
+if msgspec is not None:
+    # Structs con solo los campos que usamos; un valor por defecto cubre la
+    # clave ausente y Optional conserva el null, igual que dict.get()
+
+    class _Shipping(msgspec.Struct):
+        free_shipping: Optional[bool] = False
+
+    class _Seller(msgspec.Struct):
+        id: Optional[Union[int, str]] = None
+        seller_reputation: Optional[Dict[str, Any]] = None
+
+    class _City(msgspec.Struct):
+        name: Optional[str] = ''
+
+    class _Address(msgspec.Struct):
+        city: _City = msgspec.field(default_factory=_City)
+
+    class _Picture(msgspec.Struct):
+        url: Optional[str] = ''
+
+    class _Item(msgspec.Struct):
+        id: Optional[str] = ''
+        title: Optional[str] = ''
+        price: Optional[float] = 0.0
+        currency_id: Optional[str] = 'MXN'
+        permalink: Optional[str] = ''
+        thumbnail: Optional[str] = ''
+        condition: Optional[str] = ''
+        listing_type_id: Optional[str] = ''
+        buying_mode: Optional[str] = ''
+        category_id: Optional[str] = None
+        available_quantity: Optional[int] = None
+        sold_quantity: Optional[int] = None
+        official_store_id: Optional[Union[int, str]] = None
+        warranty: Optional[str] = ''
+        seller_id: Optional[Union[int, str]] = None
+        seller: _Seller = msgspec.field(default_factory=_Seller)
+        shipping: _Shipping = msgspec.field(default_factory=_Shipping)
+        seller_address: _Address = msgspec.field(default_factory=_Address)
+        attributes: List[Dict[str, Any]] = msgspec.field(default_factory=list)
+        pictures: List[_Picture] = msgspec.field(default_factory=list)
+
+    class _SearchResponse(msgspec.Struct):
+        results: List[_Item] = msgspec.field(default_factory=list)
+        paging: Dict[str, Any] = msgspec.field(default_factory=dict)
+
+    _search_decoder = msgspec.json.Decoder(_SearchResponse)
+    _item_decoder = msgspec.json.Decoder(_Item)
+
+    def _struct_product_fields(item: '_Item') -> Dict[str, Any]:
+        return {
+            'id': item.id,
+            'title': item.title,
+            'price': item.price,
+            'currency_id': item.currency_id,
+            'permalink': item.permalink,
+            'thumbnail': item.thumbnail,
+            'condition': item.condition,
+            'listing_type_id': item.listing_type_id,
+            'seller_id': item.seller.id,
+            'category_id': item.category_id,
+            'available_quantity': item.available_quantity,
+            'sold_quantity': item.sold_quantity,
+            'free_shipping': item.shipping.free_shipping,
+            'official_store_id': item.official_store_id,
+            'seller_reputation': item.seller.seller_reputation
+        }
+
+    def _struct_authenticated_fields(item: '_Item') -> Dict[str, Any]:
+        return {
+            'id': item.id,
+            'title': item.title,
+            'price': item.price,
+            'currency': item.currency_id,
+            'permalink': item.permalink,
+            'thumbnail': item.thumbnail,
+            'condition': item.condition,
+            'sold_quantity': item.sold_quantity if item.sold_quantity is not None else 0,
+            'available_quantity': item.available_quantity if item.available_quantity is not None else 0,
+            'seller_id': item.seller_id if item.seller_id is not None else (item.seller.id or ''),
+            'category_id': item.category_id or '',
+            'free_shipping': item.shipping.free_shipping,
+            'listing_type': item.listing_type_id,
+            'buying_mode': item.buying_mode,
+            'location': item.seller_address.city.name,
+            'attributes': item.attributes,
+            'pictures': [pic.url for pic in item.pictures],
+            'warranty': item.warranty
+        }
+
+
+def decode_search(body: bytes) -> Tuple[List[Dict[str, Any]], Dict]:
+    """
+    Decodifica una respuesta de /sites/{site}/search
+
+    Args:
+        body: Cuerpo crudo de la respuesta
+
+    Returns:
+        Tupla (campos de Product por resultado, paging)
+    """
+    if msgspec is not None:
+        try:
+            response = _search_decoder.decode(body)
+            return [_struct_product_fields(item) for item in response.results], response.paging
+        except msgspec.ValidationError:
+            pass  # Payload con tipos inesperados: usar el camino genérico
+
+    data = loads(body)
+    return [product_fields(item) for item in data.get('results', [])], data.get('paging', {})
+
+
+def decode_authenticated_search(body: bytes) -> Tuple[List[Dict[str, Any]], Dict]:
+    """Decodifica una búsqueda en campos de AuthenticatedProduct"""
+    if msgspec is not None:
+        try:
+            response = _search_decoder.decode(body)
+            return [_struct_authenticated_fields(item) for item in response.results], response.paging
+        except msgspec.ValidationError:
+            pass
+
+    data = loads(body)
+    return [authenticated_fields(item) for item in data.get('results', [])], data.get('paging', {})
+
+
+def decode_authenticated_item(body: bytes) -> Dict[str, Any]:
+    """Decodifica un /items/{id} en campos de AuthenticatedProduct"""
+    if msgspec is not None:
+        try:
+            return _struct_authenticated_fields(_item_decoder.decode(body))
+        except msgspec.ValidationError:
+            pass
+
+    return authenticated_fields(loads(body))
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Gateway local (daemon) para la API de MercadoLibre
+
+Un solo proceso (`meli serve`) es dueño del cache, del pool de conexiones y del
+presupuesto de rate limiting. Los comandos de la CLI y otros procesos del mismo
+equipo se conectan a él por HTTP o por un socket Unix usando GatewayClient.
+"""
+
+import http.client
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+
+from cache import MISS, CachedHTTPError, CachePolicy, ResponseCache, cache_policy, make_cache_key
+from config import Config
+from fast_json import loads
+from mercadolibre_client import MercadoLibreClient
+from metrics import MetricsRegistry, registry as default_metrics
+from throttling import RateLimiter, SingleFlight
+
+API_PREFIX = '/v1/api'
+
+
+class Gateway:
+    """Núcleo del gateway: cache compartido, single-flight y rate limiting"""
+
+    def __init__(self, client: Optional[MercadoLibreClient] = None,
+                 cache: Optional[ResponseCache] = None,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 metrics: Optional[MetricsRegistry] = None):
+        """
+        Inicializa el gateway
+
+        Args:
+            client: Cliente usado para hablar con la API (se crea uno si no se indica)
+            cache: Cache de respuestas compartido
+            rate_limiter: Rate limiter que controla el presupuesto de peticiones
+            metrics: Registro de métricas (por defecto el registro global, compartido con el cliente)
+        """
+        self.rate_limiter = rate_limiter or RateLimiter(
+            requests_per_minute=Config.REQUESTS_PER_MINUTE,
+            delay_between_requests=Config.DELAY_BETWEEN_REQUESTS
+        )
+        self.client = client or MercadoLibreClient(rate_limiter=self.rate_limiter)
+        self.cache = cache if cache is not None else ResponseCache(ttl=Config.CACHE_TTL)
+        self.single_flight = SingleFlight()
+        self.metrics = metrics or default_metrics
+
+        self.started_at = time.time()
+        self.requests = 0
+        self.upstream_requests = 0
+        self.upstream_errors = 0
+        self._lock = threading.Lock()
+
+        self.logger = logging.getLogger(__name__)
+
+    def fetch(self, endpoint: str, params: Optional[Dict] = None) -> Tuple[int, Any]:
+        """
+        Obtiene una respuesta desde el cache o desde la API
+
+        Args:
+            endpoint: Endpoint de la API
+            params: Parámetros de la petición
+
+        Returns:
+            Tupla (código HTTP, cuerpo JSON)
+        """
+        with self._lock:
+            self.requests += 1
+
+        key = make_cache_key(endpoint, params)
+        def load():
+            return self.single_flight.do(key, lambda: self._fetch_upstream(endpoint, params))
+
+        try:
+            data, state = self.cache.fetch(key, load, cache_policy(endpoint, self.cache.ttl))
+            self.metrics.record_cache(endpoint, state != MISS)
+            return 200, data
+
+        except requests.exceptions.HTTPError as e:
+            self.metrics.record_cache(endpoint, isinstance(e, CachedHTTPError))
+            status = e.response.status_code if e.response is not None else 502
+            return status, {'error': str(e), 'status': status}
+
+        except requests.exceptions.RequestException as e:
+            self.metrics.record_cache(endpoint, False)
+            return 502, {'error': str(e), 'status': 502}
+
+    def _fetch_upstream(self, endpoint: str, params: Optional[Dict]) -> Any:
+        """Hace la petición real a la API (el cache guarda el resultado)"""
+        with self._lock:
+            self.upstream_requests += 1
+
+        try:
+            data = self.client._make_request(endpoint, params)
+        except Exception:
+            with self._lock:
+                self.upstream_errors += 1
+            raise
+
+        return data
+
+    def stats(self) -> Dict[str, Any]:
+        """Obtiene estadísticas del gateway"""
+        with self._lock:
+            return {
+                'uptime': round(time.time() - self.started_at, 1),
+                'requests': self.requests,
+                'upstream_requests': self.upstream_requests,
+                'upstream_errors': self.upstream_errors,
+                'single_flight_shared': self.single_flight.shared,
+                'cache': self.cache.stats(),
+                'metrics': self.metrics.snapshot()
+            }
+
+    def close(self):
+        """Cierra el cliente subyacente"""
+        self.client.close()
+
+
+class GatewayRequestHandler(BaseHTTPRequestHandler):
+    """Atiende peticiones HTTP dirigidas al gateway"""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    server_version = 'MercadoLibre-Gateway/1.0'
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        gateway: Gateway = self.server.gateway
+
+        if parts.path == '/v1/health':
+            self._send_json(200, {'status': 'ok'})
+        elif parts.path == '/v1/stats':
+            self._send_json(200, gateway.stats())
+        elif parts.path == '/v1/metrics':
+            self._send_text(200, gateway.metrics.to_prometheus())
+        elif parts.path.startswith(API_PREFIX + '/'):
+            endpoint = parts.path[len(API_PREFIX):]
+            params = dict(parse_qsl(parts.query, keep_blank_values=True)) or None
+            status, payload = gateway.fetch(endpoint, params)
+            self._send_json(status, payload)
+        else:
+            self._send_json(404, {'error': f'Ruta no encontrada: {parts.path}', 'status': 404})
+
+    def _send_json(self, status: int, payload: Any):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_text(self, status: int, text: str):
+        body = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.getLogger(__name__).debug("gateway: " + format, *args)
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Servidor HTTP multihilo sobre un socket Unix"""
+
+    daemon_threads = True
+
+
+def create_server(gateway: Gateway, host: str = '127.0.0.1', port: int = 8765,
+                  socket_path: Optional[str] = None):
+    """
+    Crea el servidor del gateway (TCP o socket Unix)
+
+    Args:
+        gateway: Instancia del gateway a exponer
+        host: Host donde escuchar (modo TCP)
+        port: Puerto donde escuchar (modo TCP)
+        socket_path: Ruta del socket Unix (si se indica, se usa en lugar de TCP)
+
+    Returns:
+        Servidor listo para serve_forever()
+    """
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = ThreadingUnixHTTPServer(socket_path, GatewayRequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), GatewayRequestHandler)
+        server.daemon_threads = True
+
+    server.gateway = gateway
+    return server
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """Conexión HTTP sobre un socket Unix"""
+
+    def __init__(self, socket_path: str, timeout: float):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+class GatewayClient(MercadoLibreClient):
+    """Cliente que envía sus peticiones al gateway local en lugar de a la API"""
+
+    def __init__(self, gateway_url: str, site_id: str = "MLM", timeout: float = 120):
+        """
+        Inicializa el cliente del gateway
+
+        Args:
+            gateway_url: URL del gateway (http://host:puerto o unix:///ruta/al/socket)
+            site_id: ID del sitio
+            timeout: Timeout de cada petición al gateway en segundos
+        """
+        super().__init__(site_id=site_id)
+        self.gateway_url = gateway_url
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        parts = urlsplit(self.gateway_url)
+
+        if parts.scheme == 'unix':
+            return _UnixHTTPConnection(parts.path, self.timeout)
+
+        return http.client.HTTPConnection(parts.hostname or '127.0.0.1', parts.port or 8765,
+                                          timeout=self.timeout)
+
+    def _connection(self) -> http.client.HTTPConnection:
+        # Una conexión persistente por hilo
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._new_connection()
+            self._local.conn = conn
+        return conn
+
+    def _get(self, path: str) -> Tuple[int, bytes]:
+        conn = self._connection()
+
+        try:
+            conn.request('GET', path, headers={'Accept': 'application/json'})
+            response = conn.getresponse()
+            return response.status, response.read()
+
+        except (OSError, http.client.HTTPException) as e:
+            conn.close()
+            self._local.conn = None
+            raise requests.exceptions.ConnectionError(
+                f"No se pudo conectar al gateway {self.gateway_url}: {e}"
+            )
+
+    def _make_request(self, endpoint: str, params: Optional[Dict] = None,
+                      decoder: Optional[Callable[[bytes], Any]] = None,
+                      policy: Optional[CachePolicy] = None) -> Any:
+        """
+        Hace una petición a la API a través del gateway
+
+        Args:
+            endpoint: Endpoint de la API
+            params: Parámetros de la petición
+            decoder: Función que decodifica el cuerpo crudo (opcional)
+            policy: Se ignora; el gateway aplica la política de su propio cache
+
+        Returns:
+            Respuesta de la API como diccionario (o lo que regrese decoder)
+        """
+        path = f"{API_PREFIX}{endpoint}"
+        if params:
+            path = f"{path}?{urlencode(params)}"
+
+        self.logger.debug(f"Petición vía gateway: {path}")
+        status, body = self._get(path)
+
+        if status != 200:
+            response = requests.Response()
+            response.status_code = status
+            response._content = body
+            raise requests.exceptions.HTTPError(
+                f"Error HTTP {status} desde el gateway para {endpoint}", response=response
+            )
+
+        if decoder is not None:
+            return decoder(body)
+        return loads(body)
+
+    def gateway_stats(self) -> Dict:
+        """Obtiene las estadísticas del gateway"""
+        status, body = self._get('/v1/stats')
+        return json.loads(body)
+
+    def close(self):
+        """Cierra la conexión con el gateway"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+        super().close()
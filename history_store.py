@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Historial local de precios y ventas (SQLite)
+
+Cada snapshot solo guarda una fila por producto cuando cambia su precio,
+cantidad disponible o cantidad vendida; los productos sin cambios solo
+actualizan su fecha de última vez visto.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from config import Config
+from mercadolibre_client import Product
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    item_id TEXT PRIMARY KEY,
+    title TEXT,
+    seller_id TEXT,
+    category_id TEXT,
+    currency_id TEXT,
+    price REAL,
+    available_quantity INTEGER,
+    sold_quantity INTEGER,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_items_seller ON items (seller_id);
+CREATE INDEX IF NOT EXISTS idx_items_category ON items (category_id);
+
+CREATE TABLE IF NOT EXISTS changes (
+    item_id TEXT NOT NULL,
+    captured_at TEXT NOT NULL,
+    price REAL,
+    price_change REAL,
+    available_quantity INTEGER,
+    sold_quantity INTEGER,
+    sold_change INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_changes_item ON changes (item_id, captured_at);
+CREATE INDEX IF NOT EXISTS idx_changes_time ON changes (captured_at);
+"""
+
+# Campos que definen si un producto cambió
+TRACKED_FIELDS = ('price', 'available_quantity', 'sold_quantity')
+
+
+class PriceHistoryStore:
+    """Almacén SQLite de snapshots incrementales de productos"""
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Abre (o crea) el almacén de historial
+
+        Args:
+            path: Ruta del archivo SQLite (por defecto Config.HISTORY_DB)
+        """
+        self.path = path or Config.HISTORY_DB
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+        self.logger = logging.getLogger(__name__)
+
+    def _current_state(self, item_ids: List[str]) -> Dict[str, sqlite3.Row]:
+        """Obtiene el último estado conocido de varios productos"""
+        state = {}
+        for start in range(0, len(item_ids), 500):
+            chunk = item_ids[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self._conn.execute(
+                f"SELECT * FROM items WHERE item_id IN ({placeholders})", chunk
+            ).fetchall()
+            state.update({row['item_id']: row for row in rows})
+        return state
+
+    def record_products(self, products: Iterable[Product],
+                        captured_at: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Guarda un snapshot de productos, almacenando solo los cambios
+
+        Args:
+            products: Productos observados
+            captured_at: Momento del snapshot (por defecto ahora)
+
+        Returns:
+            Conteo de productos nuevos, con cambios y sin cambios
+        """
+        timestamp = (captured_at or datetime.now()).isoformat(timespec='seconds')
+        products = {p.id: p for p in products if p.id}
+        counts = {'new': 0, 'changed': 0, 'unchanged': 0}
+
+        with self._lock, self._conn:
+            state = self._current_state(list(products))
+            upserts = []
+            changes = []
+            touched = []
+
+            for item_id, product in products.items():
+                previous = state.get(item_id)
+                values = (product.price, product.available_quantity, product.sold_quantity)
+
+                if previous is None:
+                    counts['new'] += 1
+                    changes.append((item_id, timestamp, product.price, None,
+                                    product.available_quantity, product.sold_quantity, None))
+                elif tuple(previous[f] for f in TRACKED_FIELDS) != values:
+                    counts['changed'] += 1
+                    price_change = _difference(product.price, previous['price'])
+                    sold_change = _difference(product.sold_quantity, previous['sold_quantity'])
+                    changes.append((item_id, timestamp, product.price, price_change,
+                                    product.available_quantity, product.sold_quantity, sold_change))
+                else:
+                    counts['unchanged'] += 1
+                    touched.append((timestamp, item_id))
+                    continue
+
+                upserts.append((item_id, product.title, product.seller_id, product.category_id,
+                                product.currency_id, product.price, product.available_quantity,
+                                product.sold_quantity, timestamp, timestamp))
+
+            self._conn.executemany(
+                """
+                INSERT INTO items (item_id, title, seller_id, category_id, currency_id, price,
+                                   available_quantity, sold_quantity, first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (item_id) DO UPDATE SET
+                    title = excluded.title,
+                    seller_id = excluded.seller_id,
+                    category_id = excluded.category_id,
+                    currency_id = excluded.currency_id,
+                    price = excluded.price,
+                    available_quantity = excluded.available_quantity,
+                    sold_quantity = excluded.sold_quantity,
+                    last_seen = excluded.last_seen
+                """,
+                upserts
+            )
+            self._conn.executemany(
+                "INSERT INTO changes VALUES (?, ?, ?, ?, ?, ?, ?)", changes
+            )
+            self._conn.executemany(
+                "UPDATE items SET last_seen = ? WHERE item_id = ?", touched
+            )
+
+        self.logger.info(
+            f"Snapshot guardado: {counts['new']} nuevos, {counts['changed']} con cambios, "
+            f"{counts['unchanged']} sin cambios"
+        )
+        return counts
+
+    def price_history(self, item_id: str) -> List[Dict[str, Any]]:
+        """Obtiene el historial de cambios de un producto, del más antiguo al más reciente"""
+        rows = self._conn.execute(
+            "SELECT * FROM changes WHERE item_id = ? ORDER BY captured_at", (item_id,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def biggest_drops(self, since: Optional[datetime] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Obtiene los productos con las mayores bajadas de precio desde una fecha
+
+        Args:
+            since: Inicio del periodo (por defecto el inicio del día de hoy)
+            limit: Número máximo de productos
+
+        Returns:
+            Lista de productos con su precio actual y la bajada acumulada
+        """
+        since = since or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        rows = self._conn.execute(
+            """
+            SELECT c.item_id, i.title, i.price, i.currency_id, i.seller_id,
+                   SUM(c.price_change) AS price_change,
+                   SUM(c.price_change) * 100.0 / (i.price - SUM(c.price_change)) AS percent_change
+            FROM changes c JOIN items i ON i.item_id = c.item_id
+            WHERE c.captured_at >= ? AND c.price_change IS NOT NULL
+            GROUP BY c.item_id
+            HAVING SUM(c.price_change) < 0
+            ORDER BY percent_change ASC
+            LIMIT ?
+            """,
+            (since.isoformat(timespec='seconds'), limit)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def items_by_seller(self, seller_id: str) -> List[Dict[str, Any]]:
+        """Obtiene el último estado de los productos de un vendedor"""
+        rows = self._conn.execute(
+            "SELECT * FROM items WHERE seller_id = ? ORDER BY item_id", (str(seller_id),)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def items_by_category(self, category_id: str) -> List[Dict[str, Any]]:
+        """Obtiene el último estado de los productos de una categoría"""
+        rows = self._conn.execute(
+            "SELECT * FROM items WHERE category_id = ? ORDER BY item_id", (category_id,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def import_export_file(self, json_file: str) -> Dict[str, int]:
+        """
+        Importa un archivo de exports/ como snapshot (usa su fecha de modificación)
+
+        Args:
+            json_file: Ruta del archivo JSON exportado
+
+        Returns:
+            Conteo de productos nuevos, con cambios y sin cambios
+        """
+        with open(json_file, 'r', encoding='utf-8') as f:
+            rows = json.load(f)
+
+        products = [
+            Product(
+                id=row.get('id', ''),
+                title=row.get('titulo', ''),
+                price=row.get('precio', 0.0),
+                currency_id=row.get('moneda', 'MXN'),
+                permalink=row.get('url', ''),
+                thumbnail=row.get('imagen', ''),
+                condition=row.get('condicion', ''),
+                listing_type_id=row.get('tipo_publicacion', ''),
+                seller_id=row.get('vendedor_id'),
+                category_id=row.get('categoria_id'),
+                available_quantity=row.get('cantidad_disponible'),
+                sold_quantity=row.get('cantidad_vendida'),
+                free_shipping=row.get('envio_gratis', False),
+                official_store_id=row.get('tienda_oficial_id')
+            )
+            for row in rows
+        ]
+
+        captured_at = datetime.fromtimestamp(os.path.getmtime(json_file))
+        return self.record_products(products, captured_at=captured_at)
+
+    def import_exports(self, directory: str = Config.EXPORTS_DIR) -> Dict[str, int]:
+        """
+        Importa todos los JSON de un directorio de exportaciones, del más antiguo al más reciente
+
+        Args:
+            directory: Directorio con los archivos exportados
+
+        Returns:
+            Conteo acumulado de productos nuevos, con cambios y sin cambios
+        """
+        files = [os.path.join(directory, f) for f in os.listdir(directory) if f.endswith('.json')]
+        files.sort(key=os.path.getmtime)
+
+        totals = {'new': 0, 'changed': 0, 'unchanged': 0}
+        for json_file in files:
+            try:
+                counts = self.import_export_file(json_file)
+            except (ValueError, OSError, AttributeError) as e:
+                self.logger.warning(f"No se pudo importar {json_file}: {e}")
+                continue
+            for key, value in counts.items():
+                totals[key] += value
+
+        return totals
+
+    def close(self):
+        """Cierra la base de datos"""
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _difference(current: Optional[float], previous: Optional[float]) -> Optional[float]:
+    """Diferencia entre dos valores que pueden faltar"""
+    if current is None or previous is None:
+        return None
+    return current - previous
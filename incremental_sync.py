@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Sincronización incremental de listas de seguimiento
+
+Guarda el último estado visto de cada producto y usa los campos baratos de la
+búsqueda (o de un multi-get con pocos atributos) para decidir qué productos
+necesitan volver a pedir sus detalles o su descripción. El costo de cada
+sincronización depende de cuántos productos cambiaron, no del tamaño de la lista.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from config import Config
+from mercadolibre_client import MercadoLibreClient
+
+# Campos baratos que se comparan para detectar cambios
+CHEAP_FIELDS = ('price', 'available_quantity', 'sold_quantity')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sync_state (
+    item_id TEXT PRIMARY KEY,
+    price REAL,
+    available_quantity INTEGER,
+    sold_quantity INTEGER,
+    last_updated TEXT,
+    detail TEXT,
+    description TEXT,
+    detail_fetched_at TEXT,
+    description_fetched_at TEXT
+);
+"""
+
+
+@dataclass
+class SyncReport:
+    """Resumen de una sincronización"""
+    seen: int = 0
+    new: int = 0
+    changed: int = 0
+    unchanged: int = 0
+    details_fetched: int = 0
+    descriptions_fetched: int = 0
+    errors: Dict[str, str] = field(default_factory=dict)
+    changed_ids: List[str] = field(default_factory=list)
+
+
+class SyncState:
+    """Último estado conocido de cada producto (SQLite)"""
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Abre (o crea) el estado de sincronización
+
+        Args:
+            path: Ruta del archivo SQLite (por defecto Config.SYNC_DB)
+        """
+        self.path = path or Config.SYNC_DB
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def get_many(self, item_ids: List[str]) -> Dict[str, sqlite3.Row]:
+        """Obtiene el estado de varios productos"""
+        state = {}
+        with self._lock:
+            for start in range(0, len(item_ids), 500):
+                chunk = item_ids[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT * FROM sync_state WHERE item_id IN ({placeholders})", chunk
+                ).fetchall()
+                state.update({row['item_id']: row for row in rows})
+        return state
+
+    def save(self, item_id: str, cheap: Dict[str, Any], detail: Optional[Dict] = None,
+             description: Optional[Dict] = None):
+        """Guarda el estado de un producto (los campos que no se indican se conservan)"""
+        now = datetime.now().isoformat(timespec='seconds')
+        last_updated = detail.get('last_updated') if detail else cheap.get('last_updated')
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO sync_state (item_id, price, available_quantity, sold_quantity, last_updated,
+                                        detail, description, detail_fetched_at, description_fetched_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (item_id) DO UPDATE SET
+                    price = excluded.price,
+                    available_quantity = excluded.available_quantity,
+                    sold_quantity = excluded.sold_quantity,
+                    last_updated = COALESCE(excluded.last_updated, sync_state.last_updated),
+                    detail = COALESCE(excluded.detail, sync_state.detail),
+                    description = COALESCE(excluded.description, sync_state.description),
+                    detail_fetched_at = COALESCE(excluded.detail_fetched_at, sync_state.detail_fetched_at),
+                    description_fetched_at = COALESCE(excluded.description_fetched_at, sync_state.description_fetched_at)
+                """,
+                (
+                    item_id,
+                    cheap.get('price'),
+                    cheap.get('available_quantity'),
+                    cheap.get('sold_quantity'),
+                    last_updated,
+                    json.dumps(detail, ensure_ascii=False) if detail is not None else None,
+                    json.dumps(description, ensure_ascii=False) if description is not None else None,
+                    now if detail is not None else None,
+                    now if description is not None else None
+                )
+            )
+
+    def get_detail(self, item_id: str) -> Optional[Dict]:
+        """Obtiene los últimos detalles guardados de un producto"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT detail FROM sync_state WHERE item_id = ?", (item_id,)
+            ).fetchone()
+        return json.loads(row['detail']) if row and row['detail'] else None
+
+    def close(self):
+        """Cierra la base de datos"""
+        self._conn.close()
+
+
+class IncrementalSync:
+    """Sincroniza búsquedas y listas de productos pidiendo solo lo que cambió"""
+
+    def __init__(self, client: MercadoLibreClient, state: Optional[SyncState] = None,
+                 max_detail_age: Optional[timedelta] = None,
+                 on_change: Optional[Callable[[str, Dict, Optional[Dict]], None]] = None):
+        """
+        Inicializa la sincronización
+
+        Args:
+            client: Cliente de MercadoLibre
+            state: Estado persistente (por defecto SyncState())
+            max_detail_age: Antigüedad máxima de los detalles antes de pedirlos aunque no cambien
+            on_change: Callback llamado con (item_id, detalles, descripción) por cada producto refrescado
+        """
+        self.client = client
+        self.state = state or SyncState()
+        self.max_detail_age = max_detail_age
+        self.on_change = on_change
+        self.logger = logging.getLogger(__name__)
+
+    def _needs_refresh(self, cheap: Dict[str, Any], previous: Optional[sqlite3.Row]) -> bool:
+        """Decide si un producto necesita pedir sus detalles de nuevo"""
+        if previous is None or previous['detail'] is None:
+            return True
+
+        if any(cheap.get(f) != previous[f] for f in CHEAP_FIELDS if f in cheap):
+            return True
+
+        if cheap.get('last_updated') and cheap['last_updated'] != previous['last_updated']:
+            return True
+
+        if self.max_detail_age and previous['detail_fetched_at']:
+            fetched_at = datetime.fromisoformat(previous['detail_fetched_at'])
+            return datetime.now() - fetched_at > self.max_detail_age
+
+        return False
+
+    def _process(self, cheap_items: List[Dict[str, Any]], include_description: bool) -> SyncReport:
+        """Compara los datos baratos con el estado y refresca los productos que cambiaron"""
+        report = SyncReport()
+        cheap_by_id = {item['id']: item for item in cheap_items if item.get('id')}
+        previous_state = self.state.get_many(list(cheap_by_id))
+        report.seen = len(cheap_by_id)
+
+        for item_id, cheap in cheap_by_id.items():
+            previous = previous_state.get(item_id)
+
+            if not self._needs_refresh(cheap, previous):
+                report.unchanged += 1
+                continue
+
+            if previous is None:
+                report.new += 1
+            else:
+                report.changed += 1
+            report.changed_ids.append(item_id)
+
+            try:
+                detail = self.client.get_product_details(item_id)
+                report.details_fetched += 1
+
+                # La descripción solo cambia cuando cambia last_updated
+                description = None
+                if include_description and (
+                    previous is None
+                    or previous['description'] is None
+                    or detail.get('last_updated') != previous['last_updated']
+                ):
+                    try:
+                        description = self.client.get_product_description(item_id)
+                        report.descriptions_fetched += 1
+                    except Exception as e:
+                        self.logger.warning(f"No se pudo obtener la descripción de {item_id}: {e}")
+
+                self.state.save(item_id, {f: detail.get(f, cheap.get(f)) for f in CHEAP_FIELDS},
+                                detail=detail, description=description)
+
+                if self.on_change:
+                    self.on_change(item_id, detail, description)
+
+            except Exception as e:
+                self.logger.error(f"Error sincronizando {item_id}: {e}")
+                report.errors[item_id] = str(e)
+
+        self.logger.info(
+            f"Sincronización: {report.seen} vistos, {report.new} nuevos, {report.changed} con cambios, "
+            f"{report.unchanged} sin cambios, {report.details_fetched} detalles pedidos"
+        )
+        return report
+
+    def sync_query(self, query: str, max_results: int = 1000, category: Optional[str] = None,
+                   condition: Optional[str] = None, include_description: bool = False) -> SyncReport:
+        """
+        Sincroniza los productos de una búsqueda
+
+        Args:
+            query: Término de búsqueda
+            max_results: Número máximo de resultados a revisar
+            category: ID de categoría para filtrar
+            condition: Condición del producto
+            include_description: Si también se mantienen actualizadas las descripciones
+
+        Returns:
+            Resumen de la sincronización
+        """
+        products = self.client.search_all_pages(
+            query=query,
+            max_results=max_results,
+            category=category,
+            condition=condition
+        )
+
+        cheap_items = [
+            {'id': p.id, 'price': p.price, 'available_quantity': p.available_quantity,
+             'sold_quantity': p.sold_quantity}
+            for p in products
+        ]
+        return self._process(cheap_items, include_description)
+
+    def sync_items(self, item_ids: Iterable[str], include_description: bool = False) -> SyncReport:
+        """
+        Sincroniza una lista de productos por ID
+
+        Los campos baratos se obtienen con multi-get de 20 en 20, pidiendo solo
+        los atributos necesarios para detectar cambios.
+
+        Args:
+            item_ids: IDs de los productos
+            include_description: Si también se mantienen actualizadas las descripciones
+
+        Returns:
+            Resumen de la sincronización
+        """
+        item_ids = list(dict.fromkeys(item_ids))
+        cheap_items = []
+        failed = {}
+
+        for start in range(0, len(item_ids), 20):
+            chunk = item_ids[start:start + 20]
+            try:
+                responses = self.client.get_items(chunk, attributes=['id'] + list(CHEAP_FIELDS) + ['last_updated'])
+            except Exception as e:
+                self.logger.error(f"Error en multi-get: {e}")
+                failed.update({item_id: str(e) for item_id in chunk})
+                continue
+
+            for item_id, response in zip(chunk, responses):
+                if response.get('code') == 200:
+                    cheap_items.append(response.get('body', {}))
+                else:
+                    failed[item_id] = f"HTTP {response.get('code')}"
+
+        report = self._process(cheap_items, include_description)
+        report.errors.update(failed)
+        return report
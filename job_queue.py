@@ -0,0 +1,509 @@
+#!/usr/bin/env python3
+"""
+Cola de trabajos de crawl con prioridades, fechas límite y reintentos (SQLite)
+
+Búsquedas recurrentes, barridos de categorías y refrescos de detalles dejan de
+competir a ciegas por la cuota: se encolan en JobQueue y uno o varios
+JobWorker los toman en orden de prioridad y fecha límite. Cada trabajo corre
+con una parte del presupuesto global (budget_share, ver
+throttling.ShareRateLimiter).
+
+Recuperación: un trabajo tomado tiene un lease que el worker renueva mientras
+corre. Si el proceso muere, el lease vence y el trabajo vuelve a la cola (el
+intento cuenta contra max_attempts). Todas las transiciones son transacciones
+SQLite, así que varios procesos pueden compartir la misma cola.
+"""
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from cache import shared_cache
+from config import Config
+from mercadolibre_client import MercadoLibreClient
+from throttling import RateLimiter, ShareRateLimiter
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT UNIQUE,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL,
+    run_at REAL NOT NULL,
+    deadline REAL,
+    every REAL,
+    deadline_window REAL,
+    budget_share REAL NOT NULL DEFAULT 1.0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    lease_owner TEXT,
+    lease_until REAL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (state, run_at);
+"""
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+EXPIRED = 'expired'
+
+# Espera base entre reintentos (se duplica en cada intento)
+RETRY_DELAY = 30.0
+
+
+@dataclass
+class Job:
+    """Un trabajo de la cola"""
+    id: int
+    kind: str
+    payload: Dict[str, Any]
+    priority: int
+    state: str
+    run_at: float
+    deadline: Optional[float]
+    every: Optional[float]
+    budget_share: float
+    attempts: int
+    max_attempts: int
+    name: Optional[str] = None
+    lease_owner: Optional[str] = None
+    lease_until: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> 'Job':
+        return cls(
+            id=row['id'], kind=row['kind'], payload=json.loads(row['payload']), priority=row['priority'],
+            state=row['state'], run_at=row['run_at'], deadline=row['deadline'], every=row['every'],
+            budget_share=row['budget_share'], attempts=row['attempts'], max_attempts=row['max_attempts'],
+            name=row['name'], lease_owner=row['lease_owner'], lease_until=row['lease_until'],
+            result=json.loads(row['result']) if row['result'] else None, error=row['error']
+        )
+
+
+class JobQueue:
+    """Cola persistente de trabajos"""
+
+    def __init__(self, path: Optional[str] = None, journal_mode: str = 'WAL'):
+        """
+        Abre (o crea) la cola
+
+        Args:
+            path: Ruta del archivo SQLite (por defecto Config.JOB_DB)
+            journal_mode: Modo de journal de SQLite; WAL requiere que todos los procesos estén
+                en la misma máquina, para almacenamiento compartido entre nodos usar DELETE
+        """
+        self.path = path or Config.JOB_DB
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Transacciones explícitas (BEGIN IMMEDIATE) para que dos procesos no tomen el mismo trabajo
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute(f"PRAGMA journal_mode={journal_mode}")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def submit(self, kind: str, payload: Optional[Dict[str, Any]] = None, priority: int = 0,
+               deadline: Optional[float] = None, max_attempts: int = 3, budget_share: float = 1.0,
+               run_at: Optional[float] = None, every: Optional[float] = None, name: Optional[str] = None) -> int:
+        """
+        Encola un trabajo
+
+        Args:
+            kind: Tipo de trabajo (ej. search, category, refresh; ver JobWorker.handlers)
+            payload: Parámetros del trabajo
+            priority: Mayor prioridad se atiende primero
+            deadline: Momento (epoch) después del cual el trabajo ya no sirve y se descarta; en un
+                trabajo recurrente se aplica a cada periodo (el mismo margen después de cada run_at)
+            max_attempts: Intentos antes de marcarlo como fallido
+            budget_share: Fracción del presupuesto global de peticiones que puede usar
+            run_at: Momento (epoch) a partir del cual puede correr (por defecto ahora)
+            every: Si se indica, el trabajo se repite cada `every` segundos
+            name: Nombre único; volver a encolar con el mismo nombre actualiza el trabajo
+                en lugar de duplicarlo (útil para trabajos recurrentes desde cron)
+
+        Returns:
+            ID del trabajo
+        """
+        now = time.time()
+        run_at = run_at if run_at is not None else now
+        values = {
+            'name': name, 'kind': kind, 'payload': json.dumps(payload or {}, ensure_ascii=False),
+            'priority': priority, 'state': QUEUED, 'run_at': run_at, 'deadline': deadline, 'every': every,
+            'deadline_window': deadline - run_at if every is not None and deadline is not None else None,
+            'budget_share': budget_share, 'max_attempts': max_attempts, 'created_at': now
+        }
+
+        with self._transaction() as conn:
+            if name is not None:
+                row = conn.execute("SELECT id, state FROM jobs WHERE name = ?", (name,)).fetchone()
+                if row is not None:
+                    # Un trabajo en curso conserva su estado; los demás se vuelven a encolar
+                    conn.execute(
+                        "UPDATE jobs SET kind = :kind, payload = :payload, priority = :priority, "
+                        "deadline = :deadline, every = :every, deadline_window = :deadline_window, "
+                        "budget_share = :budget_share, "
+                        "max_attempts = :max_attempts, "
+                        "run_at = CASE WHEN state = 'running' THEN run_at ELSE :run_at END, "
+                        "attempts = CASE WHEN state = 'running' THEN attempts ELSE 0 END, "
+                        "state = CASE WHEN state = 'running' THEN state ELSE 'queued' END "
+                        "WHERE id = :id",
+                        dict(values, id=row['id'])
+                    )
+                    return row['id']
+
+            cursor = conn.execute(
+                "INSERT INTO jobs (name, kind, payload, priority, state, run_at, deadline, every, deadline_window, "
+                "budget_share, max_attempts, created_at) VALUES (:name, :kind, :payload, :priority, :state, :run_at, "
+                ":deadline, :every, :deadline_window, :budget_share, :max_attempts, :created_at)",
+                values
+            )
+            return cursor.lastrowid
+
+    def claim(self, worker_id: str, lease: Optional[float] = None,
+              kinds: Optional[List[str]] = None) -> Optional[Job]:
+        """
+        Toma el siguiente trabajo listo
+
+        Antes de elegir, devuelve a la cola los trabajos cuyo lease venció (worker
+        caído) y descarta los que pasaron su fecha límite.
+
+        Args:
+            worker_id: Identificador del worker que lo toma
+            lease: Segundos que el trabajo queda reservado sin renovar (por defecto Config.JOB_LEASE)
+            kinds: Tipos de trabajo que acepta este worker (por defecto todos)
+
+        Returns:
+            El trabajo tomado, o None si no hay ninguno listo
+        """
+        lease = lease if lease is not None else Config.JOB_LEASE
+        now = time.time()
+
+        with self._transaction() as conn:
+            self._recover(conn, now)
+
+            query = ("SELECT * FROM jobs WHERE state = 'queued' AND run_at <= ? "
+                     "AND (deadline IS NULL OR deadline > ?)")
+            params: List[Any] = [now, now]
+            if kinds:
+                query += f" AND kind IN ({','.join('?' * len(kinds))})"
+                params.extend(kinds)
+            # Prioridad, luego la fecha límite más próxima, luego el más antiguo
+            query += " ORDER BY priority DESC, deadline IS NULL, deadline, run_at LIMIT 1"
+
+            row = conn.execute(query, params).fetchone()
+            if row is None:
+                return None
+
+            conn.execute(
+                "UPDATE jobs SET state = 'running', attempts = attempts + 1, lease_owner = ?, lease_until = ? "
+                "WHERE id = ?",
+                (worker_id, now + lease, row['id'])
+            )
+            return Job.from_row(conn.execute("SELECT * FROM jobs WHERE id = ?", (row['id'],)).fetchone())
+
+    def _recover(self, conn: sqlite3.Connection, now: float):
+        """Reencola los trabajos de workers caídos y descarta los vencidos (dentro de una transacción)"""
+        error = 'lease vencido (worker detenido)'
+        abandoned = conn.execute(
+            "SELECT id, attempts, max_attempts, every, deadline_window FROM jobs "
+            "WHERE state = 'running' AND lease_until < ?", (now,)
+        ).fetchall()
+        for row in abandoned:
+            if row['attempts'] < row['max_attempts']:
+                conn.execute("UPDATE jobs SET state = 'queued', error = ?, lease_owner = NULL, lease_until = NULL "
+                             "WHERE id = ?", (error, row['id']))
+            elif row['every'] is not None:
+                # Igual que fail(): un trabajo recurrente espera a su siguiente periodo
+                self._reschedule(conn, row, now + row['every'], error)
+            else:
+                conn.execute("UPDATE jobs SET state = 'failed', error = ?, finished_at = ?, lease_owner = NULL, "
+                             "lease_until = NULL WHERE id = ?", (error, now, row['id']))
+
+        conn.execute(
+            "UPDATE jobs SET state = 'expired', finished_at = ? "
+            "WHERE state = 'queued' AND deadline IS NOT NULL AND deadline <= ? AND every IS NULL",
+            (now, now)
+        )
+
+        # Un trabajo recurrente que perdió la ventana de este periodo pasa al siguiente
+        missed = conn.execute(
+            "SELECT id, run_at, every, deadline_window FROM jobs "
+            "WHERE state = 'queued' AND deadline IS NOT NULL AND deadline <= ? AND every IS NOT NULL", (now,)
+        ).fetchall()
+        for row in missed:
+            periods = int((now - row['run_at']) // row['every']) + 1
+            self._reschedule(conn, row, row['run_at'] + periods * row['every'], 'fuera de la ventana del periodo')
+
+    def _reschedule(self, conn: sqlite3.Connection, row: sqlite3.Row, run_at: float, error: Optional[str]):
+        """Agenda el siguiente periodo de un trabajo recurrente (con su fecha límite relativa)"""
+        deadline = run_at + row['deadline_window'] if row['deadline_window'] is not None else None
+        conn.execute(
+            "UPDATE jobs SET state = 'queued', run_at = ?, deadline = ?, attempts = 0, error = ?, "
+            "lease_owner = NULL, lease_until = NULL WHERE id = ?",
+            (run_at, deadline, error, row['id'])
+        )
+
+    def heartbeat(self, job_id: int, worker_id: str, lease: Optional[float] = None) -> bool:
+        """Renueva el lease de un trabajo; False si el worker ya no es su dueño"""
+        lease = lease if lease is not None else Config.JOB_LEASE
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND lease_owner = ? AND state = 'running'",
+                (time.time() + lease, job_id, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job_id: int, worker_id: str, result: Optional[Dict[str, Any]] = None):
+        """Marca un trabajo como terminado (los recurrentes se agendan de nuevo)"""
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT id, every, deadline_window FROM jobs WHERE id = ? AND lease_owner = ?",
+                               (job_id, worker_id)).fetchone()
+            if row is None:
+                return
+
+            conn.execute(
+                "UPDATE jobs SET result = ?, finished_at = ?, state = 'done', error = NULL, lease_owner = NULL, "
+                "lease_until = NULL WHERE id = ?",
+                (json.dumps(result or {}, ensure_ascii=False, default=str), now, job_id)
+            )
+            if row['every'] is not None:
+                self._reschedule(conn, row, now + row['every'], None)
+
+    def fail(self, job_id: int, worker_id: str, error: str, retry_delay: float = RETRY_DELAY):
+        """
+        Registra un intento fallido
+
+        Se reintenta con espera exponencial mientras queden intentos; después el
+        trabajo queda fallido (o, si es recurrente, espera a su siguiente periodo).
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT id, attempts, max_attempts, every, deadline_window FROM jobs "
+                               "WHERE id = ? AND lease_owner = ?", (job_id, worker_id)).fetchone()
+            if row is None:
+                return
+
+            if row['attempts'] < row['max_attempts']:
+                conn.execute(
+                    "UPDATE jobs SET state = 'queued', run_at = ?, error = ?, lease_owner = NULL, lease_until = NULL "
+                    "WHERE id = ?",
+                    (now + retry_delay * 2 ** (row['attempts'] - 1), error, job_id)
+                )
+            elif row['every'] is not None:
+                self._reschedule(conn, row, now + row['every'], error)
+            else:
+                conn.execute(
+                    "UPDATE jobs SET state = 'failed', error = ?, finished_at = ?, lease_owner = NULL, "
+                    "lease_until = NULL WHERE id = ?",
+                    (error, now, job_id)
+                )
+
+    def get(self, job_id: int) -> Optional[Job]:
+        """Obtiene un trabajo"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job.from_row(row) if row is not None else None
+
+    def jobs(self, state: Optional[str] = None, limit: int = 100) -> List[Job]:
+        """Trabajos en orden de atención (opcionalmente solo los de un estado)"""
+        query = "SELECT * FROM jobs"
+        params: List[Any] = []
+        if state:
+            query += " WHERE state = ?"
+            params.append(state)
+        query += " ORDER BY state = 'running' DESC, priority DESC, run_at LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            return [Job.from_row(row) for row in self._conn.execute(query, params).fetchall()]
+
+    def counts(self, kind: Optional[str] = None, name_prefix: Optional[str] = None) -> Dict[str, int]:
+        """Número de trabajos por estado (opcionalmente solo de un tipo o cuyo nombre empieza con name_prefix)"""
+        query = "SELECT state, COUNT(*) FROM jobs WHERE 1 = 1"
+        params: List[Any] = []
+        if kind:
+            query += " AND kind = ?"
+            params.append(kind)
+        if name_prefix:
+            query += " AND substr(name, 1, ?) = ?"
+            params.extend([len(name_prefix), name_prefix])
+        with self._lock:
+            rows = self._conn.execute(query + " GROUP BY state", params).fetchall()
+        return {state: count for state, count in rows}
+
+    def close(self):
+        """Cierra la conexión"""
+        self._conn.close()
+
+
+# Manejador: (cliente con la parte de presupuesto del trabajo, payload) -> resultado
+JobHandler = Callable[[MercadoLibreClient, Dict[str, Any]], Dict[str, Any]]
+
+
+def run_search_job(client: MercadoLibreClient, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Búsqueda paginada (o barrido de una categoría si no hay query), exportada a JSON Lines
+
+    El avance se guarda en un CrawlCheckpoint junto al export: si una página falla
+    se lanza un error para que la cola reintente el trabajo, y el reintento continúa
+    desde la última página guardada en lugar de empezar de nuevo.
+    """
+    from crawl_checkpoint import CrawlCheckpoint
+
+    query = payload.get('query', '')
+    category = payload.get('category')
+    condition = payload.get('condition')
+    max_results = payload.get('max_results', 1000)
+    label = query or category or 'busqueda'
+    safe_label = "".join(c for c in label if c.isalnum() or c in ('-', '_', ' ')).strip().replace(' ', '_')
+    export = payload.get('export')
+    checkpoint_path = payload.get('checkpoint') or (
+        f"{export}.checkpoint.json" if export
+        else os.path.join(Config.EXPORTS_DIR, f"{client.site_id}_{safe_label}.checkpoint.json"))
+    path = export or os.path.join(
+        Config.EXPORTS_DIR, f"{client.site_id}_{safe_label}_{time.strftime('%Y%m%d_%H%M%S')}.jsonl")
+
+    crawl = CrawlCheckpoint.open(checkpoint_path, query, category, condition, max_results)
+    with crawl.attach_exporter(path) as exporter:
+        client.search_all_pages(query, max_results=max_results, category=category, condition=condition,
+                                checkpoint=crawl, on_page=exporter.write)
+
+    if not crawl.completed:
+        raise RuntimeError(f"Búsqueda incompleta ({crawl.items_collected} productos); "
+                           f"el progreso queda en {crawl.path}")
+
+    # Terminada: la siguiente ejecución (ej. de un trabajo recurrente) empieza de cero
+    os.remove(crawl.path)
+    return {'items': crawl.items_collected, 'export': crawl.export_path}
+
+
+def run_refresh_job(client: MercadoLibreClient, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Refresco incremental de detalles de una lista de productos (ver incremental_sync)"""
+    from incremental_sync import IncrementalSync, SyncState
+
+    state = SyncState()
+    try:
+        report = IncrementalSync(client, state=state).sync_items(
+            payload.get('item_ids', []), include_description=payload.get('description', False))
+    finally:
+        state.close()
+    return {'seen': report.seen, 'changed': report.changed, 'new': report.new,
+            'details_fetched': report.details_fetched, 'errors': len(report.errors)}
+
+
+DEFAULT_HANDLERS: Dict[str, JobHandler] = {
+    'search': run_search_job,
+    'category': run_search_job,
+    'refresh': run_refresh_job,
+}
+
+
+class JobWorker:
+    """Toma trabajos de la cola y los ejecuta con una parte del presupuesto global"""
+
+    def __init__(self, queue: JobQueue, rate_limiter: Optional[RateLimiter] = None,
+                 handlers: Optional[Dict[str, JobHandler]] = None,
+                 client_factory: Optional[Callable[[str, RateLimiter], MercadoLibreClient]] = None,
+                 worker_id: Optional[str] = None, lease: Optional[float] = None):
+        """
+        Inicializa el worker
+
+        Args:
+            queue: Cola de trabajos
+            rate_limiter: Presupuesto global, compartido por todos los workers del proceso
+                (por defecto uno con Config.REQUESTS_PER_MINUTE)
+            handlers: Manejadores por tipo de trabajo (por defecto DEFAULT_HANDLERS)
+            client_factory: Función (site_id, rate_limiter) -> cliente (por defecto uno con
+                cache.shared_cache(), para aprovechar lo precargado con `meli cache warm`)
+            worker_id: Identificador del worker (por defecto host:pid:aleatorio)
+            lease: Segundos de cada lease; se renueva a la mitad (por defecto Config.JOB_LEASE)
+        """
+        self.queue = queue
+        self.rate_limiter = rate_limiter or RateLimiter(Config.REQUESTS_PER_MINUTE, Config.DELAY_BETWEEN_REQUESTS)
+        self.handlers = handlers if handlers is not None else dict(DEFAULT_HANDLERS)
+        self.client_factory = client_factory or (
+            lambda site_id, limiter: MercadoLibreClient(site_id=site_id, rate_limiter=limiter, cache=shared_cache()))
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.lease = lease if lease is not None else Config.JOB_LEASE
+        self.completed = 0
+        self.failed = 0
+        self.logger = logging.getLogger(__name__)
+
+    def run_once(self) -> Optional[Job]:
+        """Ejecuta el siguiente trabajo listo (None si no había ninguno)"""
+        job = self.queue.claim(self.worker_id, self.lease, kinds=list(self.handlers))
+        if job is None:
+            return None
+
+        self.logger.info(f"Trabajo {job.id} ({job.kind}, intento {job.attempts}/{job.max_attempts})")
+        done = threading.Event()
+
+        def keep_lease():
+            while not done.wait(self.lease / 2):
+                if not self.queue.heartbeat(job.id, self.worker_id, self.lease):
+                    return
+
+        renewer = threading.Thread(target=keep_lease, name=f'job-{job.id}-lease', daemon=True)
+        renewer.start()
+        try:
+            limiter = ShareRateLimiter(self.rate_limiter, job.budget_share)
+            client = self.client_factory(job.payload.get('site', Config.DEFAULT_SITE), limiter)
+            try:
+                result = self.handlers[job.kind](client, job.payload)
+            finally:
+                client.close()
+        except Exception as e:
+            self.logger.warning(f"Trabajo {job.id} falló: {e}")
+            self.queue.fail(job.id, self.worker_id, str(e))
+            self.failed += 1
+        else:
+            self.queue.complete(job.id, self.worker_id, result)
+            self.completed += 1
+        finally:
+            done.set()
+            renewer.join()
+
+        return job
+
+    def run(self, stop: Optional[threading.Event] = None, idle: float = 5.0):
+        """
+        Ejecuta trabajos hasta que se active stop
+
+        Args:
+            stop: Evento para detener el ciclo (el trabajo en curso termina)
+            idle: Segundos de espera cuando la cola no tiene trabajos listos
+        """
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            if self.run_once() is None:
+                stop.wait(idle)
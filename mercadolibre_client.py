@@ -8,12 +8,21 @@ import requests
 import time
 import json
 import os
-from typing import Dict, List, Optional, Any
+import threading
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Union, Any
 from datetime import datetime, timedelta
 import logging
 from urllib.parse import urlencode
 from dataclasses import dataclass
 from dotenv import load_dotenv
+from cache import (MISS, NEGATIVE_STATUSES, CachedHTTPError, CachePolicy, ResponseCache, cache_policy,
+                   make_cache_key, shared_cache)
+from fast_json import decode_search, loads, product_fields
+from metrics import MetricsRegistry, registry as default_metrics
+from search_query import canonical_search_params
+from throttling import MapResult, RateLimiter, concurrent_map
+from tracing import span
+from transport import Transport, create_transport
 
 # Cargar variables de entorno
 load_dotenv()
@@ -40,26 +49,39 @@ class Product:
     @classmethod
     def from_api_response(cls, data: Dict) -> 'Product':
         """Crea un Product desde la respuesta de la API"""
-        shipping = data.get('shipping', {})
-        seller = data.get('seller', {})
-        
-        return cls(
-            id=data.get('id', ''),
-            title=data.get('title', ''),
-            price=data.get('price', 0.0),
-            currency_id=data.get('currency_id', 'MXN'),
-            permalink=data.get('permalink', ''),
-            thumbnail=data.get('thumbnail', ''),
-            condition=data.get('condition', ''),
-            listing_type_id=data.get('listing_type_id', ''),
-            seller_id=seller.get('id'),
-            category_id=data.get('category_id'),
-            available_quantity=data.get('available_quantity'),
-            sold_quantity=data.get('sold_quantity'),
-            free_shipping=shipping.get('free_shipping', False),
-            official_store_id=data.get('official_store_id'),
-            seller_reputation=seller.get('seller_reputation')
-        )
+        return cls(**product_fields(data))
+    
+    def to_export_dict(self) -> Dict[str, Any]:
+        """Convierte el producto al formato usado en las exportaciones"""
+        return {
+            'id': self.id,
+            'titulo': self.title,
+            'precio': self.price,
+            'moneda': self.currency_id,
+            'url': self.permalink,
+            'imagen': self.thumbnail,
+            'condicion': self.condition,
+            'tipo_publicacion': self.listing_type_id,
+            'vendedor_id': self.seller_id,
+            'categoria_id': self.category_id,
+            'cantidad_disponible': self.available_quantity,
+            'cantidad_vendida': self.sold_quantity,
+            'envio_gratis': self.free_shipping,
+            'tienda_oficial_id': self.official_store_id
+        }
+
+@dataclass
+class SearchPage:
+    """Página de búsqueda decodificada directamente a productos"""
+    products: List[Product]
+    paging: Dict
+    
+    @classmethod
+    def decode(cls, body: bytes) -> 'SearchPage':
+        """Decodifica el cuerpo crudo de /sites/{site}/search (ver fast_json)"""
+        items, paging = decode_search(body)
+        with span('model-build', items=len(items)):
+            return cls([Product(**fields) for fields in items], paging)
 
 class MercadoLibreClient:
     """Cliente para interactuar con las APIs oficiales de MercadoLibre"""
@@ -67,7 +89,10 @@ class MercadoLibreClient:
     BASE_URL = "https://api.mercadolibre.com"
     
     def __init__(self, site_id: str = "MLM", client_id: Optional[str] = None, 
-                 client_secret: Optional[str] = None):
+                 client_secret: Optional[str] = None, rate_limiter: Optional[RateLimiter] = None,
+                 history_store: Optional[Any] = None, base_url: Optional[str] = None,
+                 transport: Optional[Transport] = None, metrics: Optional[MetricsRegistry] = None,
+                 parse_pool: Optional[Any] = None, cache: Optional[ResponseCache] = None):
         """
         Inicializa el cliente de MercadoLibre
         
@@ -75,15 +100,32 @@ class MercadoLibreClient:
             site_id: ID del sitio (MLM=México, MLA=Argentina, MLB=Brasil, etc.)
             client_id: Client ID para APIs autenticadas (opcional)
             client_secret: Client Secret para APIs autenticadas (opcional)
+            rate_limiter: Rate limiter compartido con otros clientes (opcional)
+            history_store: PriceHistoryStore donde guardar snapshots de las búsquedas (opcional)
+            base_url: URL base alternativa de la API, ej. un servidor simulado (opcional)
+            transport: Transporte HTTP, ej. grabación/reproducción de cassettes (opcional)
+            metrics: Registro de métricas (por defecto el registro global del proceso)
+            parse_pool: ParsePool que decodifica las páginas de search_all_pages en otros procesos (opcional)
+            cache: Cache de respuestas con políticas por familia de endpoints (opcional)
         """
         self.site_id = site_id
+        self.BASE_URL = base_url or os.getenv('MELI_API_BASE_URL', self.BASE_URL)
         self.client_id = client_id or os.getenv('MELI_CLIENT_ID')
         self.client_secret = client_secret or os.getenv('MELI_CLIENT_SECRET')
         
-        # Configuración de rate limiting
-        self.requests_per_minute = int(os.getenv('REQUESTS_PER_MINUTE', 60))
-        self.delay_between_requests = float(os.getenv('DELAY_BETWEEN_REQUESTS', 1.0))
-        self.last_request_time = 0
+        # Configuración de rate limiting (RateLimiter es seguro entre hilos, así que
+        # un mismo cliente se puede usar desde varios hilos a la vez)
+        self.rate_limiter = rate_limiter or RateLimiter(
+            requests_per_minute=int(os.getenv('REQUESTS_PER_MINUTE', 60)),
+            delay_between_requests=float(os.getenv('DELAY_BETWEEN_REQUESTS', 1.0))
+        )
+        self.rate_limit_backoff = float(os.getenv('RATE_LIMIT_BACKOFF', 60))
+        self.history_store = history_store
+        self.metrics = metrics or default_metrics
+        self.parse_pool = parse_pool
+        self.cache = cache
+        self._seller_repository = None
+        self._seller_lock = threading.Lock()
         
         # Configurar logging
         logging.basicConfig(level=logging.INFO)
@@ -96,64 +138,134 @@ class MercadoLibreClient:
             'Accept': 'application/json',
             'Content-Type': 'application/json'
         })
+        self.transport = transport or create_transport(self.session)
         
         # Token de acceso (si está disponible)
         self.access_token = None
         
         self.logger.info(f"Cliente inicializado para sitio: {site_id}")
     
+    @property
+    def requests_per_minute(self) -> int:
+        """Máximo de peticiones por minuto (del rate limiter del cliente)"""
+        return self.rate_limiter.requests_per_minute
+    
+    @requests_per_minute.setter
+    def requests_per_minute(self, value: int):
+        self.rate_limiter.requests_per_minute = value
+    
+    @property
+    def delay_between_requests(self) -> float:
+        """Segundos mínimos entre peticiones (del rate limiter del cliente)"""
+        return self.rate_limiter.delay_between_requests
+    
+    @delay_between_requests.setter
+    def delay_between_requests(self, value: float):
+        self.rate_limiter.delay_between_requests = value
+    
+    @property
+    def last_request_time(self) -> float:
+        """Momento de la última petición reservada"""
+        return self.rate_limiter.last_request_time
+    
     def _rate_limit(self):
         """Implementa rate limiting para respetar los límites de la API"""
-        current_time = time.time()
-        time_since_last_request = current_time - self.last_request_time
-        
-        if time_since_last_request < self.delay_between_requests:
-            sleep_time = self.delay_between_requests - time_since_last_request
-            time.sleep(sleep_time)
-        
-        self.last_request_time = time.time()
+        self.rate_limiter.acquire()
     
-    def _make_request(self, endpoint: str, params: Optional[Dict] = None) -> Dict:
+    def _make_request(self, endpoint: str, params: Optional[Dict] = None,
+                      decoder: Optional[Callable[[bytes], Any]] = None,
+                      policy: Optional[CachePolicy] = None) -> Any:
         """
         Hace una petición a la API con manejo de errores y rate limiting
         
+        Si el cliente tiene cache, se aplica la política de la familia del
+        endpoint (ver cache.cache_policy): respuestas frescas, vencidas que se
+        refrescan en segundo plano y 404 recordados.
+        
         Args:
             endpoint: Endpoint de la API
             params: Parámetros de la petición
+            decoder: Función que decodifica el cuerpo crudo, ej. SearchPage.decode (opcional)
+            policy: Política de cache de esta llamada (por defecto la de la familia del endpoint)
             
         Returns:
-            Respuesta de la API como diccionario
+            Respuesta de la API como diccionario (o lo que regrese decoder)
         """
-        self._rate_limit()
+        if self.cache is None:
+            return self._fetch(endpoint, params, decoder)
+        
+        policy = policy or cache_policy(endpoint, self.cache.ttl)
+        if policy.ttl <= 0 and policy.stale_ttl <= 0 and policy.negative_ttl <= 0:
+            return self._fetch(endpoint, params, decoder)
+        
+        key = make_cache_key(endpoint, params)
+        if decoder is not None:
+            key = f"{key}#{getattr(decoder, '__qualname__', repr(decoder))}"
+        
+        try:
+            value, state = self.cache.fetch(key, lambda: self._fetch(endpoint, params, decoder), policy)
+        except CachedHTTPError:
+            self.metrics.record_cache(endpoint, True)
+            raise
+        
+        self.metrics.record_cache(endpoint, state != MISS)
+        return value
+    
+    def _fetch(self, endpoint: str, params: Optional[Dict] = None,
+               decoder: Optional[Callable[[bytes], Any]] = None) -> Any:
+        """Hace la petición real a la API (sin cache)"""
+        with span('rate-limit'):
+            self._rate_limit()
         
         url = f"{self.BASE_URL}{endpoint}"
         
+        response = None
+        start = time.perf_counter()
+        
         try:
             self.logger.debug(f"Haciendo petición a: {url}")
-            response = self.session.get(url, params=params, timeout=30)
+            with span('request', endpoint=endpoint):
+                response = self.transport.get(url, params=params, timeout=30)
+            self.metrics.record_request(endpoint, response.status_code, time.perf_counter() - start,
+                                        len(response.content or b''))
             response.raise_for_status()
             
-            return response.json()
+            with span('parse', endpoint=endpoint):
+                if decoder is not None:
+                    return decoder(response.content)
+                return loads(response.content)
             
         except requests.exceptions.HTTPError as e:
             if response.status_code == 429:
-                self.logger.warning("Rate limit excedido, esperando...")
-                time.sleep(60)  # Esperar 1 minuto
-                return self._make_request(endpoint, params)  # Reintentar
+                # Respetar Retry-After si la API lo indica; si no, esperar rate_limit_backoff
+                retry_after = response.headers.get('Retry-After')
+                wait = float(retry_after) if retry_after and retry_after.isdigit() else self.rate_limit_backoff
+                self.logger.warning(f"Rate limit excedido, esperando {wait:.0f}s...")
+                self.metrics.record_retry(endpoint)
+                with span('rate-limit', retry_after=wait):
+                    time.sleep(wait)
+                return self._fetch(endpoint, params, decoder)  # Reintentar
             else:
                 self.logger.error(f"Error HTTP {response.status_code}: {e}")
                 raise
                 
         except requests.exceptions.RequestException as e:
+            if response is None:
+                self.metrics.record_request(endpoint, 'error', time.perf_counter() - start)
             self.logger.error(f"Error en la petición: {e}")
             raise
     
     def search_products(self, query: str, limit: int = 50, offset: int = 0, 
                        category: Optional[str] = None, condition: Optional[str] = None,
-                       sort: str = 'relevance') -> Dict:
+                       sort: str = 'relevance',
+                       decoder: Optional[Callable[[bytes], Any]] = None,
+                       cache_ttl: Optional[float] = None) -> Dict:
         """
         Busca productos usando la API de búsqueda
         
+        La búsqueda se envía en forma canónica (ver search_query): "iPhone 15",
+        "iphone  15" e "IPHONE 15" son la misma petición y la misma llave de cache.
+        
         Args:
             query: Término de búsqueda
             limit: Número de resultados (máximo 50)
@@ -161,27 +273,30 @@ class MercadoLibreClient:
             category: ID de categoría para filtrar
             condition: Condición del producto (new, used, not_specified)
             sort: Ordenamiento (relevance, price_asc, price_desc)
+            decoder: Decodificador del cuerpo, ej. SearchPage.decode (opcional)
+            cache_ttl: Segundos que se puede reutilizar el resultado si el cliente tiene cache
+                (por defecto Config.SEARCH_CACHE_TTL; 0 = siempre pedirlo a la API)
             
         Returns:
-            Diccionario con los resultados de la búsqueda
+            Diccionario con los resultados de la búsqueda (o lo que regrese decoder)
         """
         endpoint = f"/sites/{self.site_id}/search"
         
-        params = {
+        # API limita a 50 resultados por página
+        params = canonical_search_params({
             'q': query,
-            'limit': min(limit, 50),  # API limita a 50
+            'limit': limit,
             'offset': offset,
-            'sort': sort
-        }
-        
-        if category:
-            params['category'] = category
-        if condition:
-            params['condition'] = condition
+            'sort': sort,
+            'category': category,
+            'condition': condition
+        })
         
         self.logger.info(f"Buscando productos: '{query}' (limit={limit}, offset={offset})")
         
-        return self._make_request(endpoint, params)
+        if cache_ttl is None:
+            return self._make_request(endpoint, params, decoder)
+        return self._make_request(endpoint, params, decoder, CachePolicy(cache_ttl))
     
     def get_product_details(self, product_id: str) -> Dict:
         """
@@ -199,6 +314,52 @@ class MercadoLibreClient:
         
         return self._make_request(endpoint)
     
+    def get_items(self, product_ids: List[str], attributes: Optional[List[str]] = None) -> List[Dict]:
+        """
+        Obtiene varios productos en una sola petición (multi-get, máximo 20 IDs)
+        
+        Args:
+            product_ids: IDs de los productos
+            attributes: Campos a incluir en la respuesta (opcional, reduce el tamaño)
+            
+        Returns:
+            Lista de respuestas con 'code' y 'body' por producto
+        """
+        endpoint = "/items"
+        product_ids = product_ids[:20]
+        
+        # IDs con un 404 reciente en el cache negativo (ej. publicaciones borradas)
+        known_missing = {}
+        if self.cache is not None:
+            for product_id in product_ids:
+                status = self.cache.negative_status(make_cache_key(f"/items/{product_id}"))
+                if status is not None:
+                    known_missing[product_id] = status
+        
+        to_fetch = [pid for pid in product_ids if pid not in known_missing]
+        responses = []
+        
+        if to_fetch:
+            params = {'ids': ','.join(to_fetch)}
+            if attributes:
+                params['attributes'] = ','.join(attributes)
+            responses = self._make_request(endpoint, params)
+        
+        if self.cache is None or not product_ids:
+            return responses
+        
+        policy = cache_policy(f"/items/{product_ids[0]}")
+        by_id = dict(zip(to_fetch, responses))
+        for product_id, response in by_id.items():
+            if response.get('code') in NEGATIVE_STATUSES:
+                self.cache.set_negative(make_cache_key(f"/items/{product_id}"), response['code'],
+                                        'multi-get', policy.negative_ttl)
+        
+        return [
+            by_id[pid] if pid in by_id else {'code': known_missing[pid], 'body': {'id': pid, 'status': known_missing[pid]}}
+            for pid in product_ids
+        ]
+    
     def get_product_description(self, product_id: str) -> Dict:
         """
         Obtiene la descripción de un producto
@@ -254,8 +415,85 @@ class MercadoLibreClient:
         
         return self._make_request(endpoint)
     
+    def get_users(self, seller_ids: List[str]) -> List[Dict]:
+        """
+        Obtiene varios vendedores en una sola petición (multi-get, máximo 20 IDs)
+        
+        Args:
+            seller_ids: IDs de los vendedores
+            
+        Returns:
+            Lista de respuestas con 'code' y 'body' por vendedor
+        """
+        endpoint = "/users"
+        params = {'ids': ','.join(str(sid) for sid in seller_ids[:20])}
+        
+        return self._make_request(endpoint, params)
+    
+    def get_sellers(self, seller_ids: Iterable[Any]) -> Dict[str, Dict]:
+        """
+        Obtiene nickname y reputación de muchos vendedores
+        
+        Usa el almacén persistente de SellerRepository y solo consulta a la API
+        los vendedores que faltan o cuyo perfil ya venció.
+        
+        Args:
+            seller_ids: IDs de los vendedores (puede tener repetidos)
+            
+        Returns:
+            Diccionario ID (str) -> perfil con id, nickname y seller_reputation
+        """
+        with self._seller_lock:
+            if self._seller_repository is None:
+                from seller_repository import SellerRepository
+                self._seller_repository = SellerRepository(self)
+        
+        return self._seller_repository.resolve(seller_ids)
+    
+    def map(self, method: Union[str, Callable[..., Any]], args: Iterable[Any], concurrency: int = 4,
+            ordered: bool = True) -> Iterator[MapResult]:
+        """
+        Llama a un método del cliente para muchos argumentos con hilos acotados
+        
+        Todas las llamadas comparten el rate limiter del cliente. Ejemplo:
+        
+            for result in client.map('get_product_details', ids, concurrency=8):
+                print(result.arg, result.value if result.ok else result.error)
+        
+        Args:
+            method: Nombre de un método del cliente (ej. 'get_product_details') o cualquier función
+            args: Argumentos, uno por llamada (las tuplas se pasan como varios argumentos)
+            concurrency: Llamadas simultáneas como máximo
+            ordered: True para regresar en el orden de args; False en orden de terminación
+            
+        Returns:
+            Iterador de MapResult con index, arg, value y error por llamada
+        """
+        func = getattr(self, method) if isinstance(method, str) else method
+        return concurrent_map(func, args, concurrency=concurrency, ordered=ordered)
+    
+    def get_currency_conversion(self, from_currency: str, to_currency: str) -> Dict:
+        """
+        Obtiene la tasa de conversión entre dos monedas
+        
+        Args:
+            from_currency: Moneda de origen (ej. ARS)
+            to_currency: Moneda de destino (ej. USD)
+            
+        Returns:
+            Diccionario con la conversión (campo 'ratio')
+        """
+        endpoint = "/currency_conversions/search"
+        params = {'from': from_currency, 'to': to_currency}
+        
+        return self._make_request(endpoint, params)
+    
     def search_all_pages(self, query: str, max_results: int = 1000, 
-                        category: Optional[str] = None, condition: Optional[str] = None) -> List[Product]:
+                        category: Optional[str] = None, condition: Optional[str] = None,
+                        checkpoint: Optional[Any] = None,
+                        on_page: Optional[Callable[[List[Product]], None]] = None,
+                        sort: str = 'relevance',
+                        on_paging: Optional[Callable[[Dict], None]] = None) -> List[Product]:
         """
         Busca productos en todas las páginas hasta alcanzar max_results
         
@@ -264,53 +502,104 @@ class MercadoLibreClient:
             max_results: Número máximo de resultados
             category: ID de categoría para filtrar
             condition: Condición del producto
+            checkpoint: CrawlCheckpoint donde guardar el progreso para poder reanudar (opcional)
+            on_page: Función llamada con los productos de cada página, ej. JsonLinesExporter.write (opcional)
+            sort: Ordenamiento (relevance, price_asc, price_desc)
+            on_paging: Función llamada con el paging de cada página, ej. para conocer el total de la API (opcional)
             
         Returns:
-            Lista de productos encontrados
+            Lista de productos encontrados (al reanudar, solo los obtenidos en esta ejecución)
         """
         all_products = []
         offset = 0
         limit = 50
+        collected = 0
+        seen_ids = set()
+        failed = False
+        
+        if checkpoint is not None:
+            if checkpoint.completed:
+                self.logger.info(f"La búsqueda ya estaba completa según {checkpoint.path}")
+                return []
+            
+            offset = checkpoint.next_offset
+            collected = checkpoint.items_collected
+            seen_ids = set(checkpoint.item_ids)
+            
+            if offset:
+                self.logger.info(f"Reanudando búsqueda desde offset={offset} ({collected} productos previos)")
         
         self.logger.info(f"Iniciando búsqueda completa: '{query}' (max_results={max_results})")
         
-        while len(all_products) < max_results:
+        decoder = self.parse_pool.decode if self.parse_pool is not None else SearchPage.decode
+        
+        while collected < max_results:
             try:
-                response = self.search_products(
+                # La página se decodifica directamente a objetos Product
+                page = self.search_products(
                     query=query,
                     limit=limit,
                     offset=offset,
                     category=category,
-                    condition=condition
+                    condition=condition,
+                    sort=sort,
+                    decoder=decoder
                 )
+                products = page.products
                 
-                results = response.get('results', [])
+                if on_paging is not None:
+                    on_paging(page.paging)
                 
-                if not results:
+                if not products:
                     self.logger.info("No hay más resultados")
                     break
                 
-                # Convertir a objetos Product
-                products = [Product.from_api_response(item) for item in results]
+                if checkpoint is not None:
+                    # La paginación puede desplazarse entre ejecuciones
+                    products = [p for p in products if p.id not in seen_ids]
+                    seen_ids.update(p.id for p in products)
+                
+                truncated = len(products) > max_results - collected
+                products = products[:max_results - collected]
                 all_products.extend(products)
+                collected += len(products)
+                
+                if on_page is not None:
+                    on_page(products)
                 
-                self.logger.info(f"Obtenidos {len(products)} productos (total: {len(all_products)})")
+                self.logger.info(f"Obtenidos {len(products)} productos (total: {collected})")
                 
                 # Verificar si hay más páginas
-                paging = response.get('paging', {})
-                total = paging.get('total', 0)
+                total = page.paging.get('total', 0)
                 
-                if offset + limit >= total or len(all_products) >= max_results:
+                if checkpoint is not None:
+                    # Si max_results cortó la página, al reanudar con más resultados se vuelve a pedir
+                    # (los ya obtenidos se descartan por ID)
+                    checkpoint.record_page(offset if truncated else offset + limit, [p.id for p in products], total)
+                
+                if offset + limit >= total or collected >= max_results:
                     break
                 
                 offset += limit
                 
             except Exception as e:
                 self.logger.error(f"Error en búsqueda: {e}")
+                failed = True
+                if checkpoint is not None:
+                    self.logger.info(f"Progreso guardado en {checkpoint.path}; vuelve a ejecutar para reanudar")
                 break
         
+        if checkpoint is not None and not failed:
+            checkpoint.mark_completed()
+        
         # Limitar al número máximo solicitado
-        return all_products[:max_results]
+        all_products = all_products[:max_results]
+        
+        if self.history_store is not None and all_products:
+            with span('history', items=len(all_products)):
+                self.history_store.record_products(all_products)
+        
+        return all_products
     
     def export_to_json(self, products: List[Product], filename: str):
         """
@@ -323,29 +612,12 @@ class MercadoLibreClient:
         os.makedirs('exports', exist_ok=True)
         filepath = f"exports/{filename}"
         
-        # Convertir productos a diccionarios
-        products_data = []
-        for product in products:
-            product_dict = {
-                'id': product.id,
-                'titulo': product.title,
-                'precio': product.price,
-                'moneda': product.currency_id,
-                'url': product.permalink,
-                'imagen': product.thumbnail,
-                'condicion': product.condition,
-                'tipo_publicacion': product.listing_type_id,
-                'vendedor_id': product.seller_id,
-                'categoria_id': product.category_id,
-                'cantidad_disponible': product.available_quantity,
-                'cantidad_vendida': product.sold_quantity,
-                'envio_gratis': product.free_shipping,
-                'tienda_oficial_id': product.official_store_id
-            }
-            products_data.append(product_dict)
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(products_data, f, ensure_ascii=False, indent=2)
+        with span('export', format='json', items=len(products)):
+            # Convertir productos a diccionarios
+            products_data = [product.to_export_dict() for product in products]
+            
+            with open(filepath, 'w', encoding='utf-8') as f:
+                json.dump(products_data, f, ensure_ascii=False, indent=2)
         
         self.logger.info(f"Productos exportados a: {filepath}")
     
@@ -358,33 +630,18 @@ class MercadoLibreClient:
             filename: Nombre del archivo
         """
         try:
-            import pandas as pd
-            
-            os.makedirs('exports', exist_ok=True)
-            filepath = f"exports/{filename}"
-            
-            # Convertir a DataFrame
-            data = []
-            for product in products:
-                data.append({
-                    'id': product.id,
-                    'titulo': product.title,
-                    'precio': product.price,
-                    'moneda': product.currency_id,
-                    'url': product.permalink,
-                    'imagen': product.thumbnail,
-                    'condicion': product.condition,
-                    'tipo_publicacion': product.listing_type_id,
-                    'vendedor_id': product.seller_id,
-                    'categoria_id': product.category_id,
-                    'cantidad_disponible': product.available_quantity,
-                    'cantidad_vendida': product.sold_quantity,
-                    'envio_gratis': product.free_shipping,
-                    'tienda_oficial_id': product.official_store_id
-                })
-            
-            df = pd.DataFrame(data)
-            df.to_csv(filepath, index=False, encoding='utf-8')
+            with span('export', format='csv', items=len(products)):
+                import pandas as pd
+                
+                os.makedirs('exports', exist_ok=True)
+                filepath = f"exports/{filename}"
+                
+                # Convertir a DataFrame
+                data = [product.to_export_dict() for product in products]
+                
+                with span('dataframe', items=len(products)):
+                    df = pd.DataFrame(data)
+                df.to_csv(filepath, index=False, encoding='utf-8')
             
             self.logger.info(f"Productos exportados a: {filepath}")
             
@@ -393,6 +650,7 @@ class MercadoLibreClient:
     
     def close(self):
         """Cierra la sesión"""
+        self.transport.close()
         self.session.close()
         self.logger.info("Cliente cerrado")
     
@@ -403,14 +661,24 @@ class MercadoLibreClient:
         self.close()
 
 # Función de conveniencia
-def create_client(site_id: str = "MLM") -> MercadoLibreClient:
+def create_client(site_id: str = "MLM", cache=None) -> MercadoLibreClient:
     """
     Crea un cliente de MercadoLibre con configuración por defecto
     
+    Si MELI_GATEWAY_URL está configurado, el cliente usa el gateway local
+    (`meli serve`) en lugar de conectarse directamente a la API.
+    
     Args:
         site_id: ID del sitio (MLM=México por defecto)
+        cache: Cache de respuestas (por defecto, con CACHE_ENABLED, cache.shared_cache(): el
+            que precarga `meli cache warm`; se ignora con el gateway, que tiene su propio cache)
         
     Returns:
         Cliente configurado
     """
-    return MercadoLibreClient(site_id=site_id)
+    gateway_url = os.getenv('MELI_GATEWAY_URL')
+    if gateway_url:
+        from gateway import GatewayClient
+        return GatewayClient(gateway_url, site_id=site_id)
+    
+    return MercadoLibreClient(site_id=site_id, cache=cache if cache is not None else shared_cache())
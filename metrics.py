@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Métricas de las peticiones a la API por familia de endpoint
+
+Cada cliente registra, por familia de endpoint (/sites/:site/search,
+/items/:id, /users/:id, ...), el número de peticiones por código HTTP,
+reintentos, aciertos de cache, bytes recibidos y un histograma de latencia
+log-lineal (estilo HDR, ~3% de precisión). Las métricas se exportan en
+formato de texto de Prometheus o como snapshot JSON.
+"""
+
+import json
+import math
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+# Bits de sub-bucket por potencia de dos: 2**5 = 32 sub-buckets (~3% de error relativo)
+SUB_BUCKET_BITS = 5
+
+# Límites (segundos) de los buckets acumulados en la exportación a Prometheus
+PROMETHEUS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_SITE_SEGMENT = re.compile(r'^/sites/[A-Z]{3}(?=/|$)')
+_ID_SEGMENT = re.compile(r'/(?:[A-Z]{3}\d+|\d+)(?=/|$)')
+
+
+def endpoint_family(endpoint: str) -> str:
+    """
+    Agrupa un endpoint en su familia, sustituyendo IDs por marcadores
+
+    Ejemplos:
+        /sites/MLM/search           -> /sites/:site/search
+        /items/MLM123/description   -> /items/:id/description
+        /users/123456               -> /users/:id
+    """
+    path = endpoint.split('?', 1)[0]
+    path = _SITE_SEGMENT.sub('/sites/:site', path)
+    return _ID_SEGMENT.sub('/:id', path)
+
+
+class LatencyHistogram:
+    """Histograma log-lineal de latencias en microsegundos"""
+
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    @staticmethod
+    def _index(micros: int) -> int:
+        if micros < (1 << SUB_BUCKET_BITS) * 2:
+            return micros
+        exponent = micros.bit_length() - SUB_BUCKET_BITS - 1
+        return (exponent << SUB_BUCKET_BITS) + (micros >> exponent)
+
+    @staticmethod
+    def _upper_bound(index: int) -> int:
+        """Mayor valor (microsegundos) que cae en un bucket"""
+        if index < (1 << SUB_BUCKET_BITS) * 2:
+            return index
+        exponent = (index >> SUB_BUCKET_BITS) - 1
+        mantissa = index - (exponent << SUB_BUCKET_BITS)
+        return ((mantissa + 1) << exponent) - 1
+
+    def record(self, seconds: float):
+        """Registra una latencia en segundos"""
+        micros = max(0, int(seconds * 1_000_000))
+        index = self._index(micros)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def percentile(self, pct: float) -> float:
+        """Latencia (segundos) del percentil indicado"""
+        if not self.count:
+            return 0.0
+
+        target = max(1, math.ceil(self.count * pct / 100))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= target:
+                return min(self._upper_bound(index) / 1_000_000, self.max)
+        return self.max
+
+    def cumulative(self, bounds: Iterable[float]) -> List[int]:
+        """Conteos acumulados por debajo de cada límite (segundos)"""
+        ordered = sorted(self.buckets.items())
+        counts = []
+        for bound in bounds:
+            limit = bound * 1_000_000
+            counts.append(sum(c for i, c in ordered if self._upper_bound(i) <= limit))
+        return counts
+
+    def merge(self, other: 'LatencyHistogram'):
+        """Suma los conteos de otro histograma"""
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        if other.max is not None:
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'buckets': {str(k): v for k, v in self.buckets.items()},
+            'count': self.count,
+            'total': self.total,
+            'min': self.min,
+            'max': self.max
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'LatencyHistogram':
+        histogram = cls()
+        histogram.buckets = {int(k): v for k, v in data.get('buckets', {}).items()}
+        histogram.count = data.get('count', 0)
+        histogram.total = data.get('total', 0.0)
+        histogram.min = data.get('min')
+        histogram.max = data.get('max')
+        return histogram
+
+
+class EndpointMetrics:
+    """Contadores e histograma de una familia de endpoints"""
+
+    def __init__(self):
+        self.requests: Dict[str, int] = {}
+        self.retries = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.bytes_received = 0
+        self.latency = LatencyHistogram()
+
+    @property
+    def total_requests(self) -> int:
+        return sum(self.requests.values())
+
+    @property
+    def errors(self) -> int:
+        return sum(count for status, count in self.requests.items() if not status.startswith('2'))
+
+    def merge(self, other: 'EndpointMetrics'):
+        for status, count in other.requests.items():
+            self.requests[status] = self.requests.get(status, 0) + count
+        self.retries += other.retries
+        self.cache_hits += other.cache_hits
+        self.cache_misses += other.cache_misses
+        self.bytes_received += other.bytes_received
+        self.latency.merge(other.latency)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'requests': dict(self.requests),
+            'retries': self.retries,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'bytes_received': self.bytes_received,
+            'latency': self.latency.to_dict(),
+            'p50': self.latency.percentile(50),
+            'p90': self.latency.percentile(90),
+            'p99': self.latency.percentile(99)
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'EndpointMetrics':
+        metrics = cls()
+        metrics.requests = dict(data.get('requests', {}))
+        metrics.retries = data.get('retries', 0)
+        metrics.cache_hits = data.get('cache_hits', 0)
+        metrics.cache_misses = data.get('cache_misses', 0)
+        metrics.bytes_received = data.get('bytes_received', 0)
+        metrics.latency = LatencyHistogram.from_dict(data.get('latency', {}))
+        return metrics
+
+
+class MetricsRegistry:
+    """Registro de métricas por familia de endpoint, seguro para hilos"""
+
+    def __init__(self):
+        self._families: Dict[str, EndpointMetrics] = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def _family(self, endpoint: str) -> EndpointMetrics:
+        family = endpoint_family(endpoint)
+        metrics = self._families.get(family)
+        if metrics is None:
+            metrics = self._families[family] = EndpointMetrics()
+        return metrics
+
+    def record_request(self, endpoint: str, status: Any, seconds: float, bytes_received: int = 0):
+        """
+        Registra una petición terminada
+
+        Args:
+            endpoint: Endpoint de la API
+            status: Código HTTP (o 'error' si no hubo respuesta)
+            seconds: Duración de la petición
+            bytes_received: Tamaño del cuerpo de la respuesta
+        """
+        with self._lock:
+            metrics = self._family(endpoint)
+            key = str(status)
+            metrics.requests[key] = metrics.requests.get(key, 0) + 1
+            metrics.bytes_received += bytes_received
+            metrics.latency.record(seconds)
+
+    def record_retry(self, endpoint: str):
+        """Registra un reintento (ej. tras un 429)"""
+        with self._lock:
+            self._family(endpoint).retries += 1
+
+    def record_cache(self, endpoint: str, hit: bool):
+        """Registra un acierto o fallo del cache"""
+        with self._lock:
+            metrics = self._family(endpoint)
+            if hit:
+                metrics.cache_hits += 1
+            else:
+                metrics.cache_misses += 1
+
+    def families(self) -> Dict[str, EndpointMetrics]:
+        """Copia de las métricas por familia"""
+        with self._lock:
+            return {name: EndpointMetrics.from_dict(m.to_dict()) for name, m in self._families.items()}
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Snapshot JSON serializable de todas las métricas"""
+        with self._lock:
+            return {
+                'started_at': self.started_at,
+                'generated_at': time.time(),
+                'endpoints': {name: m.to_dict() for name, m in sorted(self._families.items())}
+            }
+
+    def merge_snapshot(self, snapshot: Dict[str, Any]):
+        """Suma a este registro las métricas de un snapshot"""
+        with self._lock:
+            self.started_at = min(self.started_at, snapshot.get('started_at', self.started_at))
+            for name, data in snapshot.get('endpoints', {}).items():
+                metrics = self._families.setdefault(name, EndpointMetrics())
+                metrics.merge(EndpointMetrics.from_dict(data))
+
+    def reset(self):
+        """Borra todas las métricas"""
+        with self._lock:
+            self._families.clear()
+            self.started_at = time.time()
+
+    def to_prometheus(self, prefix: str = 'meli') -> str:
+        """Exporta las métricas en formato de texto de Prometheus"""
+        lines = [
+            f"# HELP {prefix}_requests_total Peticiones a la API por familia de endpoint y código HTTP",
+            f"# TYPE {prefix}_requests_total counter"
+        ]
+        families = self.families()
+
+        for name, m in sorted(families.items()):
+            for status, count in sorted(m.requests.items()):
+                lines.append(f'{prefix}_requests_total{{endpoint="{name}",status="{status}"}} {count}')
+
+        for metric, attr, help_text in (
+            ('retries_total', 'retries', 'Reintentos por rate limiting'),
+            ('cache_hits_total', 'cache_hits', 'Aciertos del cache'),
+            ('cache_misses_total', 'cache_misses', 'Fallos del cache'),
+            ('response_bytes_total', 'bytes_received', 'Bytes recibidos')
+        ):
+            lines.append(f"# HELP {prefix}_{metric} {help_text}")
+            lines.append(f"# TYPE {prefix}_{metric} counter")
+            for name, m in sorted(families.items()):
+                lines.append(f'{prefix}_{metric}{{endpoint="{name}"}} {getattr(m, attr)}')
+
+        lines.append(f"# HELP {prefix}_request_duration_seconds Latencia de las peticiones")
+        lines.append(f"# TYPE {prefix}_request_duration_seconds histogram")
+        for name, m in sorted(families.items()):
+            for bound, count in zip(PROMETHEUS_BUCKETS, m.latency.cumulative(PROMETHEUS_BUCKETS)):
+                lines.append(f'{prefix}_request_duration_seconds_bucket{{endpoint="{name}",le="{bound}"}} {count}')
+            lines.append(f'{prefix}_request_duration_seconds_bucket{{endpoint="{name}",le="+Inf"}} {m.latency.count}')
+            lines.append(f'{prefix}_request_duration_seconds_sum{{endpoint="{name}"}} {m.latency.total}')
+            lines.append(f'{prefix}_request_duration_seconds_count{{endpoint="{name}"}} {m.latency.count}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def save_snapshot(registry: MetricsRegistry, path: str, accumulate: bool = True):
+    """
+    Guarda el snapshot JSON de un registro
+
+    Args:
+        registry: Registro a guardar
+        path: Ruta del archivo JSON
+        accumulate: Si se suman las métricas ya guardadas en el archivo
+    """
+    merged = MetricsRegistry()
+    if accumulate:
+        previous = load_snapshot(path)
+        if previous:
+            merged.merge_snapshot(previous)
+    merged.merge_snapshot(registry.snapshot())
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(merged.snapshot(), f)
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path: str) -> Optional[Dict[str, Any]]:
+    """Carga un snapshot JSON (None si no existe)"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+# Registro global usado por defecto por los clientes
+registry = MetricsRegistry()
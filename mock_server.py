@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Servidor local que simula la API de MercadoLibre
+
+Genera respuestas realistas y deterministas para /sites/{site}/search, /items,
+/users y /categories, con latencia, jitter, respuestas 429 y paginación
+configurables. Se usa en los benchmarks y para correr el cliente sin red.
+
+Uso:
+    python mock_server.py --port 8766 --latency 0.05 --jitter 0.02 --rate-429 0.01
+    MELI_API_BASE_URL=http://127.0.0.1:8766 python cli.py search "iPhone"
+"""
+
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import click
+
+from config import Config
+
+CONDITIONS = ['new', 'new', 'new', 'used', 'not_specified']
+LISTING_TYPES = ['gold_special', 'gold_pro', 'gold', 'silver', 'free']
+LEVELS = ['5_green', '4_light_green', '3_yellow', '2_orange', '1_red']
+CITIES = ['Ciudad de México', 'Guadalajara', 'Monterrey', 'Puebla', 'Querétaro', 'Mérida']
+WORDS = ['Pro', 'Max', 'Plus', 'Mini', 'Ultra', 'Lite', 'Edición Especial', 'Reacondicionado',
+         '128 GB', '256 GB', 'Negro', 'Azul', 'Original', 'Nuevo', 'Garantía']
+
+
+def _rng(*parts: Any) -> random.Random:
+    """Generador aleatorio determinista a partir de una llave"""
+    return random.Random(zlib.crc32('|'.join(str(p) for p in parts).encode('utf-8')))
+
+
+def generate_item(item_id: str, query: str = 'Producto') -> Dict[str, Any]:
+    """Genera el detalle de un producto con la forma de /items/{id}"""
+    rng = _rng(item_id)
+    site_id = item_id[:3]
+    seller_id = rng.randint(10000000, 10000000 + 5000)
+    category_id = f"{site_id}{rng.randint(1000, 1100)}"
+    title = f"{query.title()} {' '.join(rng.sample(WORDS, 3))}"
+
+    return {
+        'id': item_id,
+        'site_id': site_id,
+        'title': title,
+        'seller_id': seller_id,
+        'category_id': category_id,
+        'price': round(rng.uniform(99, 49999), 2),
+        'currency_id': Config.SITE_CURRENCIES.get(site_id, 'MXN'),
+        'available_quantity': rng.randint(0, 500),
+        'sold_quantity': rng.randint(0, 25000),
+        'buying_mode': 'buy_it_now',
+        'listing_type_id': rng.choice(LISTING_TYPES),
+        'condition': rng.choice(CONDITIONS),
+        'permalink': f"https://articulo.mercadolibre.com.mx/{item_id}",
+        'thumbnail': f"https://http2.mlstatic.com/D_{item_id}-I.jpg",
+        'pictures': [{'url': f"https://http2.mlstatic.com/D_{item_id}-{i}.jpg"} for i in range(rng.randint(1, 6))],
+        'shipping': {'free_shipping': rng.random() < 0.6, 'mode': 'me2'},
+        'seller_address': {'city': {'name': rng.choice(CITIES)}},
+        'attributes': [
+            {'id': 'BRAND', 'name': 'Marca', 'value_name': query.split()[0].title() if query else 'Genérica'},
+            {'id': 'MODEL', 'name': 'Modelo', 'value_name': f"M{rng.randint(100, 999)}"},
+            {'id': 'COLOR', 'name': 'Color', 'value_name': rng.choice(['Negro', 'Azul', 'Blanco'])}
+        ],
+        'warranty': 'Garantía del vendedor: 90 días',
+        'official_store_id': rng.choice([None, None, None, rng.randint(1, 3000)]),
+        'last_updated': '2024-09-29T12:00:00.000Z'
+    }
+
+
+def generate_search_result(item_id: str, query: str) -> Dict[str, Any]:
+    """Genera un resultado de búsqueda (forma reducida de un producto)"""
+    item = generate_item(item_id, query)
+    rng = _rng(item['seller_id'])
+
+    return {
+        'id': item['id'],
+        'site_id': item['site_id'],
+        'title': item['title'],
+        'price': item['price'],
+        'currency_id': item['currency_id'],
+        'available_quantity': item['available_quantity'],
+        'sold_quantity': item['sold_quantity'],
+        'buying_mode': item['buying_mode'],
+        'listing_type_id': item['listing_type_id'],
+        'condition': item['condition'],
+        'permalink': item['permalink'],
+        'thumbnail': item['thumbnail'],
+        'category_id': item['category_id'],
+        'official_store_id': item['official_store_id'],
+        'shipping': item['shipping'],
+        'seller': {
+            'id': item['seller_id'],
+            'seller_reputation': {'level_id': rng.choice(LEVELS), 'power_seller_status': None}
+        },
+        'seller_address': item['seller_address'],
+        'attributes': item['attributes']
+    }
+
+
+def generate_user(user_id: str) -> Dict[str, Any]:
+    """Genera un vendedor con la forma de /users/{id}"""
+    rng = _rng('user', user_id)
+    total = rng.randint(10, 50000)
+
+    return {
+        'id': int(user_id) if str(user_id).isdigit() else user_id,
+        'nickname': f"VENDEDOR{user_id}",
+        'country_id': 'MX',
+        'registration_date': '2015-03-01T00:00:00.000-04:00',
+        'seller_reputation': {
+            'level_id': rng.choice(LEVELS),
+            'power_seller_status': rng.choice([None, 'silver', 'gold', 'platinum']),
+            'transactions': {'total': total, 'completed': int(total * 0.95), 'canceled': int(total * 0.05)}
+        }
+    }
+
+
+def generate_category(category_id: str) -> Dict[str, Any]:
+    """Genera una categoría con la forma de /categories/{id} (árbol de 3 niveles)"""
+    site_id = category_id[:3]
+    depth = (len(category_id) - 3 - 4) // 2
+    rng = _rng('category', category_id)
+    children = []
+
+    if depth < 2:
+        children = [
+            {'id': f"{category_id}{i:02d}", 'name': f"Subcategoría {category_id[3:]}-{i}",
+             'total_items_in_this_category': rng.randint(100, 100000)}
+            for i in range(1, rng.randint(2, 5))
+        ]
+
+    path = [{'id': category_id[:7 + 2 * level], 'name': f"Categoría {category_id[3:7 + 2 * level]}"}
+            for level in range(depth + 1)]
+
+    return {
+        'id': category_id,
+        'name': path[-1]['name'],
+        'total_items_in_this_category': rng.randint(1000, 500000),
+        'path_from_root': path,
+        'children_categories': children,
+        'site_id': site_id
+    }
+
+
+class MockState:
+    """Configuración y contadores del servidor simulado"""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, rate_429: float = 0.0,
+                 total_results: int = 1000, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.total_results = total_results
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def delay(self):
+        """Simula la latencia de la red"""
+        with self._lock:
+            wait = self.latency + self.random.uniform(-self.jitter, self.jitter)
+        if wait > 0:
+            time.sleep(wait)
+
+    def should_throttle(self) -> bool:
+        """Decide si la petición recibe un 429"""
+        with self._lock:
+            self.requests += 1
+            throttled = self.rate_429 > 0 and self.random.random() < self.rate_429
+            if throttled:
+                self.throttled += 1
+            return throttled
+
+
+def route(state: MockState, path: str, params: Dict[str, str]) -> Tuple[int, Any]:
+    """Resuelve una ruta de la API simulada"""
+    match = re.fullmatch(r'/sites/(\w+)/search', path)
+    if match:
+        site_id = match.group(1)
+        query = params.get('q', '')
+        limit = min(int(params.get('limit', 50)), 50)
+        offset = int(params.get('offset', 0))
+        total = state.total_results
+        base = zlib.crc32(f"{site_id}|{query}".encode('utf-8')) % 10 ** 8
+        results = [generate_search_result(f"{site_id}{base + i}", query)
+                   for i in range(offset, min(offset + limit, total))]
+        if params.get('condition'):
+            results = [r for r in results if r['condition'] == params['condition']]
+        return 200, {
+            'site_id': site_id,
+            'query': query,
+            'paging': {'total': total, 'offset': offset, 'limit': limit, 'primary_results': total},
+            'results': results
+        }
+
+    match = re.fullmatch(r'/sites/(\w+)/categories', path)
+    if match:
+        site_id = match.group(1)
+        return 200, [{'id': f"{site_id}{1000 + i * 7}", 'name': f"Categoría {1000 + i * 7}"} for i in range(12)]
+
+    if path == '/items':
+        ids = [i for i in params.get('ids', '').split(',') if i][:20]
+        attributes = [a for a in params.get('attributes', '').split(',') if a]
+        bodies = []
+        for item_id in ids:
+            body = generate_item(item_id)
+            if attributes:
+                body = {k: v for k, v in body.items() if k in attributes}
+            bodies.append({'code': 200, 'body': body})
+        return 200, bodies
+
+    match = re.fullmatch(r'/items/(\w+)/description', path)
+    if match:
+        item_id = match.group(1)
+        return 200, {'id': f"{item_id}-1", 'plain_text': f"Descripción de {item_id}. " * 20}
+
+    match = re.fullmatch(r'/items/(\w+)', path)
+    if match:
+        return 200, generate_item(match.group(1))
+
+    if path == '/users':
+        ids = [i for i in params.get('ids', '').split(',') if i][:20]
+        return 200, [{'code': 200, 'body': generate_user(user_id)} for user_id in ids]
+
+    match = re.fullmatch(r'/users/(\w+)', path)
+    if match:
+        return 200, generate_user(match.group(1))
+
+    match = re.fullmatch(r'/categories/(\w+)', path)
+    if match:
+        return 200, generate_category(match.group(1))
+
+    if path == '/currency_conversions/search':
+        ratio = _rng(params.get('from'), params.get('to')).uniform(0.0005, 20)
+        return 200, {'currency_base': params.get('from'), 'currency_quote': params.get('to'), 'ratio': ratio}
+
+    return 404, {'message': f'resource not found: {path}', 'error': 'not_found', 'status': 404}
+
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    """Atiende las peticiones del servidor simulado"""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        state: MockState = self.server.state
+        parts = urlsplit(self.path)
+        state.delay()
+
+        if state.should_throttle():
+            self._send_json(429, {'message': 'Too many requests', 'status': 429}, {'Retry-After': '0'})
+            return
+
+        status, payload = route(state, parts.path, dict(parse_qsl(parts.query)))
+        self._send_json(status, payload)
+
+    def _send_json(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockMercadoLibreServer:
+    """Servidor simulado que corre en un hilo de fondo"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, **options):
+        """
+        Inicializa el servidor
+
+        Args:
+            host: Host donde escuchar
+            port: Puerto (0 = elegir uno libre)
+            **options: latency, jitter, rate_429, total_results, seed (ver MockState)
+        """
+        self.state = MockState(**options)
+        self.httpd = ThreadingHTTPServer((host, port), MockRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.state = self.state
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """URL base para usar como base_url del cliente"""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'MockMercadoLibreServer':
+        """Inicia el servidor en segundo plano"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Detiene el servidor"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+@click.command()
+@click.option('--host', default='127.0.0.1', help='Host donde escuchar')
+@click.option('--port', default=8766, help='Puerto donde escuchar')
+@click.option('--latency', default=0.0, help='Latencia base por petición en segundos')
+@click.option('--jitter', default=0.0, help='Variación aleatoria de la latencia en segundos')
+@click.option('--rate-429', default=0.0, help='Proporción de peticiones que reciben 429 (0-1)')
+@click.option('--total-results', default=1000, help='Total de resultados por búsqueda')
+def main(host, port, latency, jitter, rate_429, total_results):
+    """Inicia el servidor simulado de la API de MercadoLibre"""
+    server = MockMercadoLibreServer(host, port, latency=latency, jitter=jitter,
+                                    rate_429=rate_429, total_results=total_results)
+    print(f"🧪 API simulada en {server.url} (MELI_API_BASE_URL={server.url})")
+
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Servidor detenido")
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Búsqueda simultánea en varios sitios de MercadoLibre
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import Config
+from mercadolibre_client import MercadoLibreClient, Product, create_client
+
+
+@dataclass
+class SiteResult:
+    """Resultados de búsqueda de un sitio"""
+    site_id: str
+    products: List[Product] = field(default_factory=list)
+    total: int = 0
+    elapsed: float = 0.0
+    error: Optional[str] = None
+    conversion_rates: Dict[str, float] = field(default_factory=dict)
+
+    def normalized_price(self, product: Product) -> Optional[float]:
+        """Precio del producto en la moneda de normalización (None si no hay tasa)"""
+        ratio = self.conversion_rates.get(product.currency_id)
+        if ratio is None:
+            return None
+        return product.price * ratio
+
+
+class MultiSiteSearch:
+    """Ejecuta una búsqueda en varios sitios en paralelo"""
+
+    def __init__(self, sites: Optional[List[str]] = None, max_workers: Optional[int] = None,
+                 parse_pool: Optional[Any] = None):
+        """
+        Inicializa la búsqueda multi-sitio
+
+        Cada sitio usa su propio cliente, por lo que el rate limiting se aplica
+        por sitio y una búsqueda lenta no retrasa a las demás.
+
+        Args:
+            sites: IDs de los sitios (por defecto todos los de Config.AVAILABLE_SITES)
+            max_workers: Hilos simultáneos (por defecto uno por sitio)
+            parse_pool: ParsePool compartido por todos los sitios para decodificar páginas (opcional)
+        """
+        self.sites = list(sites or Config.AVAILABLE_SITES.keys())
+        self.max_workers = max_workers or len(self.sites)
+        self.clients: Dict[str, MercadoLibreClient] = {site: create_client(site) for site in self.sites}
+        for client in self.clients.values():
+            client.parse_pool = parse_pool
+
+        self._rates: Dict[Tuple[str, str], Optional[float]] = {}
+        self._rates_lock = threading.Lock()
+
+        self.logger = logging.getLogger(__name__)
+
+    def _conversion_rate(self, client: MercadoLibreClient, from_currency: str,
+                         to_currency: str) -> Optional[float]:
+        """Obtiene (y memoriza) la tasa de conversión entre dos monedas"""
+        if from_currency == to_currency:
+            return 1.0
+
+        key = (from_currency, to_currency)
+        with self._rates_lock:
+            if key in self._rates:
+                return self._rates[key]
+
+        try:
+            ratio = client.get_currency_conversion(from_currency, to_currency).get('ratio')
+        except Exception as e:
+            self.logger.warning(f"No se pudo obtener la conversión {from_currency}->{to_currency}: {e}")
+            ratio = None
+
+        with self._rates_lock:
+            self._rates[key] = ratio
+        return ratio
+
+    def _search_site(self, site_id: str, query: str, limit: int, pages: int,
+                     category: Optional[str], condition: Optional[str], sort: str) -> SiteResult:
+        """Busca en un solo sitio"""
+        client = self.clients[site_id]
+        result = SiteResult(site_id=site_id)
+        start = time.time()
+
+        try:
+            if pages > 1:
+                def record_total(paging: Dict):
+                    result.total = paging.get('total', 0)
+
+                result.products = client.search_all_pages(
+                    query=query,
+                    max_results=limit * pages,
+                    category=category,
+                    condition=condition,
+                    sort=sort,
+                    on_paging=record_total
+                )
+            else:
+                response = client.search_products(
+                    query=query,
+                    limit=limit,
+                    category=category,
+                    condition=condition,
+                    sort=sort
+                )
+                result.products = [Product.from_api_response(item) for item in response.get('results', [])]
+                result.total = response.get('paging', {}).get('total', 0)
+
+        except Exception as e:
+            self.logger.error(f"Error buscando en {site_id}: {e}")
+            result.error = str(e)
+
+        result.elapsed = time.time() - start
+        return result
+
+    def search(self, query: str, limit: int = 50, pages: int = 1,
+               category: Optional[str] = None, condition: Optional[str] = None,
+               sort: str = 'relevance', currency: Optional[str] = None) -> List[SiteResult]:
+        """
+        Busca un término en todos los sitios configurados
+
+        Args:
+            query: Término de búsqueda
+            limit: Resultados por página
+            pages: Páginas a obtener por sitio
+            category: ID de categoría para filtrar
+            condition: Condición del producto
+            sort: Ordenamiento
+            currency: Moneda para normalizar precios (ej. USD), opcional
+
+        Returns:
+            Lista de resultados por sitio, en el orden de self.sites
+        """
+        self.logger.info(f"Búsqueda multi-sitio: '{query}' en {', '.join(self.sites)}")
+
+        # Las tasas van en su propio executor para no esperar a que se libere un hilo de búsqueda
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor, \
+                ThreadPoolExecutor(max_workers=len(self.sites)) as rate_executor:
+            searches = {
+                site: executor.submit(self._search_site, site, query, limit, pages, category, condition, sort)
+                for site in self.sites
+            }
+
+            # Las tasas de la moneda local se piden junto con las búsquedas
+            local_rates = {}
+            if currency:
+                for site in self.sites:
+                    local = Config.SITE_CURRENCIES.get(site)
+                    if local:
+                        local_rates[site] = rate_executor.submit(self._conversion_rate, self.clients[site], local,
+                                                                 currency)
+
+            results = [searches[site].result() for site in self.sites]
+
+            if currency:
+                for result in results:
+                    for currency_id in {p.currency_id for p in result.products}:
+                        if currency_id == Config.SITE_CURRENCIES.get(result.site_id) and result.site_id in local_rates:
+                            ratio = local_rates[result.site_id].result()
+                        else:
+                            ratio = self._conversion_rate(self.clients[result.site_id], currency_id, currency)
+                        if ratio is not None:
+                            result.conversion_rates[currency_id] = ratio
+
+        return results
+
+    def close(self):
+        """Cierra los clientes de todos los sitios"""
+        for client in self.clients.values():
+            client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def export_to_json(results: List[SiteResult], filename: str, currency: Optional[str] = None):
+    """
+    Exporta resultados multi-sitio a JSON, etiquetando cada producto con su sitio
+
+    Args:
+        results: Resultados por sitio
+        filename: Nombre del archivo dentro de exports/
+        currency: Moneda de normalización usada en la búsqueda (opcional)
+    """
+    os.makedirs('exports', exist_ok=True)
+    filepath = f"exports/{filename}"
+
+    data = []
+    for result in results:
+        for product in result.products:
+            row = product.to_export_dict()
+            row['sitio'] = result.site_id
+            if currency:
+                row['precio_normalizado'] = result.normalized_price(product)
+                row['moneda_normalizada'] = currency
+            data.append(row)
+
+    with open(filepath, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+    logging.getLogger(__name__).info(f"Productos exportados a: {filepath}")
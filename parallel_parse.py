@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Decodificación de páginas de búsqueda en un pool de procesos
+
+Con muchos hilos (o tareas async) descargando páginas, el parseo JSON y la
+extracción de campos corren bajo el GIL y limitan el throughput a un núcleo.
+ParsePool manda el cuerpo crudo a un proceso que lo decodifica y devuelve la
+página en formato columnar dentro de un bloque de memoria compartida: una
+columna por campo de Product (enteros y flotantes como arreglos binarios,
+textos concatenados con sus longitudes). El proceso principal solo copia el
+bloque y arma los Product, sin pickle de diccionarios anidados.
+
+Ejemplo:
+    with ParsePool(max_workers=4) as pool:
+        client.parse_pool = pool
+        products = client.search_all_pages('iphone', max_results=2000)
+"""
+
+import asyncio
+import dataclasses
+import json
+import os
+import queue
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from config import Config
+from fast_json import decode_search
+from mercadolibre_client import Product, SearchPage
+from tracing import span
+
+# Tipos de columna: i=int64, f=float64, b=bool, s=texto, j=arreglo JSON (valores mixtos o anidados)
+_INT64_MIN, _INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+# Separador de los textos de una columna 's'; un texto que lo contenga pasa a columna 'j'
+_SEPARATOR = '\x00'
+
+# Campos de Product en orden posicional
+_FIELDS = [f.name for f in dataclasses.fields(Product)]
+
+# (nombre, tipo, [(offset, tamaño) de cada segmento en el bloque])
+ColumnLayout = Tuple[str, str, List[Tuple[int, int]]]
+
+# Bloques compartidos abiertos por cada proceso del pool (uno por slot)
+_attached: Dict[str, shared_memory.SharedMemory] = {}
+
+
+def _column_kind(values: Sequence[Any]) -> str:
+    present = [v for v in values if v is not None]
+    if all(isinstance(v, bool) for v in present):
+        return 'b'
+    if all(isinstance(v, int) and not isinstance(v, bool) and _INT64_MIN <= v <= _INT64_MAX for v in present):
+        return 'i'
+    if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+        return 'f'
+    if all(isinstance(v, str) and _SEPARATOR not in v for v in present):
+        return 's'
+    return 'j'
+
+
+def _encode_column(values: Sequence[Any]) -> Tuple[str, List[bytes]]:
+    """Codifica una columna como segmentos binarios: [nulos, datos]"""
+    kind = _column_kind(values)
+    nulls = bytes(v is None for v in values)
+
+    if kind == 'b':
+        data = bytes(bool(v) for v in values)
+    elif kind == 'i':
+        data = array('q', (v or 0 for v in values)).tobytes()
+    elif kind == 'f':
+        data = array('d', (v or 0.0 for v in values)).tobytes()
+    elif kind == 's':
+        data = _SEPARATOR.join(v or '' for v in values).encode('utf-8')
+    else:
+        data = json.dumps(list(values), ensure_ascii=False).encode('utf-8')
+
+    return kind, [nulls, data]
+
+
+def _decode_column(kind: str, segments: List[bytes]) -> List[Any]:
+    """Decodifica una columna con una sola llamada en C por segmento"""
+    nulls, data = segments
+
+    if kind == 'j':
+        return json.loads(data)
+    if kind == 'b':
+        values = [bool(v) for v in data]
+    elif kind == 's':
+        values = data.decode('utf-8').split(_SEPARATOR)
+    else:
+        values = array('q' if kind == 'i' else 'd', data).tolist()
+
+    if nulls.count(1):
+        return [None if null else value for value, null in zip(values, nulls)]
+    return values
+
+
+def _write_block(block: shared_memory.SharedMemory, encoded) -> List[ColumnLayout]:
+    layout, offset = [], 0
+    for name, kind, segments in encoded:
+        positions = []
+        for segment in segments:
+            block.buf[offset:offset + len(segment)] = segment
+            positions.append((offset, len(segment)))
+            offset += len(segment)
+        layout.append((name, kind, positions))
+    return layout
+
+
+def _decode_to_shared(body: bytes, slot: str) -> Tuple[Optional[str], int, List[ColumnLayout], Dict]:
+    """
+    Decodifica una página en el proceso del pool y la escribe en memoria compartida
+
+    Args:
+        body: Cuerpo crudo de la respuesta de búsqueda
+        slot: Bloque compartido reservado para esta página
+
+    Returns:
+        Tupla (bloque propio si la página no cupo en el slot, número de productos, columnas, paging)
+    """
+    items, paging = decode_search(body)
+    if not items:
+        return None, 0, [], paging
+
+    encoded = [(name,) + _encode_column([item.get(name) for item in items]) for name in items[0]]
+    size = sum(len(segment) for _, _, segments in encoded for segment in segments)
+
+    block = _attached.get(slot)
+    if block is None:
+        block = _attached[slot] = shared_memory.SharedMemory(name=slot)
+
+    if size <= block.size:
+        return None, len(items), _write_block(block, encoded), paging
+
+    # Página más grande que el slot: bloque propio que el proceso principal libera
+    overflow = shared_memory.SharedMemory(create=True, size=size)
+    try:
+        layout = _write_block(overflow, encoded)
+    finally:
+        overflow.close()
+    return overflow.name, len(items), layout, paging
+
+
+def _page_from_columns(data: bytes, count: int, layout: List[ColumnLayout], paging: Dict) -> SearchPage:
+    """Arma la SearchPage a partir de las columnas copiadas del bloque compartido"""
+    columns = {
+        name: _decode_column(kind, [data[start:start + length] for start, length in positions])
+        for name, kind, positions in layout
+    }
+    missing = [None] * count
+    ordered = [columns.get(name, missing) for name in _FIELDS]
+
+    with span('model-build', items=count):
+        return SearchPage([Product(*row) for row in zip(*ordered)], paging)
+
+
+class ParsePool:
+    """Pool de procesos que decodifica páginas de búsqueda fuera del GIL"""
+
+    def __init__(self, max_workers: Optional[int] = None, min_bytes: int = 16 * 1024,
+                 slot_size: int = 1024 * 1024):
+        """
+        Crea el pool
+
+        Args:
+            max_workers: Procesos del pool (por defecto Config.PARSE_WORKERS o un proceso por núcleo)
+            min_bytes: Los cuerpos más pequeños se decodifican en el hilo actual, donde
+                el viaje al proceso cuesta más que el parseo
+            slot_size: Tamaño de cada bloque compartido; se reservan dos por proceso y se
+                reutilizan, así que una página no crea ni destruye memoria compartida
+        """
+        self.max_workers = max_workers or Config.PARSE_WORKERS or os.cpu_count() or 1
+        self.min_bytes = min_bytes
+
+        # Los procesos del pool heredan el resource tracker del proceso principal,
+        # que es quien libera los bloques con unlink()
+        resource_tracker.ensure_running()
+        self._slots = [shared_memory.SharedMemory(create=True, size=slot_size)
+                       for _ in range(self.max_workers * 2)]
+        self._free: 'queue.Queue[int]' = queue.Queue()
+        for index in range(len(self._slots)):
+            self._free.put(index)
+
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+
+    def _collect(self, index: int, payload: Tuple[Optional[str], int, List[ColumnLayout], Dict]) -> SearchPage:
+        """Copia las columnas del slot (o del bloque propio de la página), lo libera y arma la página"""
+        overflow, count, layout, paging = payload
+        try:
+            if overflow is not None:
+                block = shared_memory.SharedMemory(name=overflow)
+                try:
+                    data = bytes(block.buf)
+                finally:
+                    block.close()
+                    block.unlink()
+            else:
+                end = max((start + length for _, _, positions in layout for start, length in positions), default=0)
+                data = bytes(self._slots[index].buf[:end])
+        finally:
+            self._free.put(index)
+
+        return _page_from_columns(data, count, layout, paging)
+
+    def decode(self, body: bytes) -> SearchPage:
+        """
+        Decodifica una página bloqueando solo al hilo que la pidió
+
+        Se usa como decoder de search_products: el hilo de red espera sin el
+        GIL mientras otro proceso parsea. Si todos los slots están ocupados,
+        el hilo espera a que se libere uno.
+        """
+        if len(body) < self.min_bytes:
+            return SearchPage.decode(body)
+
+        index = self._free.get()
+        try:
+            payload = self._executor.submit(_decode_to_shared, body, self._slots[index].name).result()
+        except BaseException:
+            self._free.put(index)
+            raise
+        return self._collect(index, payload)
+
+    async def decode_async(self, body: bytes) -> SearchPage:
+        """Versión async de decode, para AsyncMercadoLibreClient.search_products(decoder=...)"""
+        if len(body) < self.min_bytes:
+            return SearchPage.decode(body)
+
+        try:
+            index = self._free.get_nowait()
+        except queue.Empty:
+            index = await asyncio.get_running_loop().run_in_executor(None, self._free.get)
+        try:
+            future = self._executor.submit(_decode_to_shared, body, self._slots[index].name)
+            payload = await asyncio.wrap_future(future)
+        except BaseException:
+            self._free.put(index)
+            raise
+        return self._collect(index, payload)
+
+    def close(self):
+        """Detiene los procesos del pool y libera los bloques compartidos"""
+        self._executor.shutdown(wait=True)
+        for block in self._slots:
+            block.close()
+            block.unlink()
+        self._slots = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -13,6 +13,8 @@ import logging
 from urllib.parse import urlencode, quote_plus
 from dataclasses import dataclass
 
+from transport import Transport, create_transport
+
 @dataclass
 class SimpleProduct:
     """Clase simplificada para productos públicos"""
@@ -31,7 +33,7 @@ class SimpleProduct:
 class PublicMercadoLibreClient:
     """Cliente público para MercadoLibre sin autenticación"""
     
-    def __init__(self, site_id: str = "MLM"):
+    def __init__(self, site_id: str = "MLM", transport: Optional[Transport] = None):
         self.site_id = site_id
         self.base_url = "https://api.mercadolibre.com"
         
@@ -45,6 +47,7 @@ class PublicMercadoLibreClient:
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
             'Accept': 'application/json'
         })
+        self.transport = transport or create_transport(self.session)
         
         self.logger.info(f"Cliente público inicializado para sitio: {site_id}")
     
@@ -59,7 +62,7 @@ class PublicMercadoLibreClient:
             
             # Enfoque 1: Usar el endpoint de sitios
             url = f"{self.base_url}/sites/{self.site_id}"
-            response = self.session.get(url, timeout=10)
+            response = self.transport.get(url, timeout=10)
             
             if response.status_code == 200:
                 site_info = response.json()
@@ -75,7 +78,7 @@ class PublicMercadoLibreClient:
             for search_url in search_urls:
                 try:
                     self.logger.info(f"Intentando: {search_url}")
-                    response = self.session.get(search_url, timeout=10)
+                    response = self.transport.get(search_url, timeout=10)
                     
                     if response.status_code == 200:
                         data = response.json()
@@ -182,7 +185,7 @@ class PublicMercadoLibreClient:
         try:
             # Intentar obtener categorías
             url = f"{self.base_url}/sites/{self.site_id}/categories"
-            response = self.session.get(url, timeout=10)
+            response = self.transport.get(url, timeout=10)
             
             if response.status_code == 200:
                 return response.json()
@@ -226,6 +229,7 @@ class PublicMercadoLibreClient:
     
     def close(self):
         """Cierra la sesión"""
+        self.transport.close()
         self.session.close()
     
     def __enter__(self):
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Conjuntos de resultados completos de una búsqueda, consultables localmente
+
+Cambiar --sort, --condition, envío gratis o rango de precio sobre la misma
+búsqueda no debería costar otro barrido paginado de la API. LocalSearch guarda
+el conjunto base de una búsqueda (orden de relevancia, sin filtros) en un
+SQLite y en un índice en memoria (precios ordenados, condición, envío) y
+responde las variantes desde ahí mientras el conjunto tenga menos de max_age
+segundos.
+
+Una variante solo se responde localmente si el conjunto está completo (tiene
+todos los resultados de la búsqueda): sobre un prefijo de N resultados, ordenar
+por precio o filtrar no da lo mismo que la API. Sin filtros y en orden de
+relevancia también sirve un prefijo con suficientes resultados.
+
+Sin un conjunto completo, una variante regresa None y el llamador hace su
+petición normal a la API: una búsqueda nueva cuesta lo mismo que sin
+LocalSearch. Descargar el conjunto completo para una variante es opcional
+(build=True); también queda completo cuando la búsqueda base pide al menos
+todos los resultados.
+"""
+
+import bisect
+import dataclasses
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import Config
+from mercadolibre_client import Product, SearchPage
+from search_query import MAX_LIMIT, normalize_query
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS result_sets (
+    site_id TEXT NOT NULL,
+    query TEXT NOT NULL,
+    category TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    complete INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    products BLOB NOT NULL,
+    PRIMARY KEY (site_id, query, category)
+);
+"""
+
+SORTS = ('relevance', 'price_asc', 'price_desc')
+
+# (sitio, búsqueda normalizada, categoría)
+ResultSetKey = Tuple[str, str, str]
+
+
+def result_set_key(site_id: str, query: str, category: Optional[str] = None) -> ResultSetKey:
+    """Llave de un conjunto de resultados (misma normalización que el cache de búsquedas)"""
+    return site_id.upper(), normalize_query(query), (category or '').upper()
+
+
+class ResultSet:
+    """Resultados de una búsqueda en orden de relevancia, indexados por precio, condición y envío"""
+
+    def __init__(self, products: Iterable[Product], fetched_at: float, complete: bool, total: int):
+        """
+        Crea el índice
+
+        Args:
+            products: Productos en el orden de relevancia de la API
+            fetched_at: Momento en que se obtuvieron
+            complete: Si están todos los resultados de la búsqueda
+            total: Total de resultados reportado por la API
+        """
+        self.products = list(products)
+        self.fetched_at = fetched_at
+        self.complete = complete
+        self.total = total
+
+        self._by_price = sorted(range(len(self.products)), key=lambda i: self.products[i].price or 0.0)
+        self._prices = [self.products[i].price or 0.0 for i in self._by_price]
+        self._by_condition: Dict[str, set] = {}
+        for index, product in enumerate(self.products):
+            self._by_condition.setdefault(product.condition, set()).add(index)
+        self._free_shipping = {i for i, product in enumerate(self.products) if product.free_shipping}
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    @property
+    def age(self) -> float:
+        """Segundos desde que se obtuvo"""
+        return time.time() - self.fetched_at
+
+    def select(self, condition: Optional[str] = None, free_shipping: Optional[bool] = None,
+               min_price: Optional[float] = None, max_price: Optional[float] = None,
+               sort: str = 'relevance', limit: Optional[int] = None) -> List[Product]:
+        """
+        Filtra y ordena los resultados sin salir a la red
+
+        Args:
+            condition: Condición (new, used, not_specified)
+            free_shipping: True/False para filtrar por envío gratis (None = ambos)
+            min_price: Precio mínimo (inclusive)
+            max_price: Precio máximo (inclusive)
+            sort: relevance, price_asc o price_desc
+            limit: Máximo de productos a regresar
+
+        Returns:
+            Productos que cumplen los filtros, en el orden pedido
+        """
+        if sort not in SORTS:
+            raise ValueError(f"Ordenamiento no soportado: {sort}")
+
+        start = bisect.bisect_left(self._prices, min_price) if min_price is not None else 0
+        end = bisect.bisect_right(self._prices, max_price) if max_price is not None else len(self._prices)
+        indices = self._by_price[start:end]
+
+        if condition:
+            allowed = self._by_condition.get(condition.lower(), set())
+            indices = [i for i in indices if i in allowed]
+        if free_shipping is not None:
+            indices = [i for i in indices if (i in self._free_shipping) == free_shipping]
+
+        if sort == 'relevance':
+            indices = sorted(indices)
+        elif sort == 'price_desc':
+            indices = indices[::-1]
+
+        if limit is not None:
+            indices = indices[:limit]
+        return [self.products[i] for i in indices]
+
+
+class ResultSetStore:
+    """Almacén SQLite de conjuntos de resultados (productos en JSON comprimido)"""
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Abre (o crea) el almacén
+
+        Args:
+            path: Ruta del archivo SQLite (por defecto Config.RESULT_SET_DB; ':memory:' para no persistir)
+        """
+        self.path = path or Config.RESULT_SET_DB
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def get(self, key: ResultSetKey) -> Optional[ResultSet]:
+        """Conjunto guardado para una llave (None si no existe)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fetched_at, complete, total, products FROM result_sets "
+                "WHERE site_id = ? AND query = ? AND category = ?", key
+            ).fetchone()
+        if row is None:
+            return None
+
+        fetched_at, complete, total, body = row
+        products = [Product(*values) for values in json.loads(zlib.decompress(body))]
+        return ResultSet(products, fetched_at, bool(complete), total)
+
+    def put(self, key: ResultSetKey, result_set: ResultSet):
+        """Guarda o reemplaza un conjunto"""
+        rows = [dataclasses.astuple(product) for product in result_set.products]
+        body = zlib.compress(json.dumps(rows, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO result_sets VALUES (?, ?, ?, ?, ?, ?, ?)",
+                key + (result_set.fetched_at, int(result_set.complete), result_set.total, body)
+            )
+
+    def purge(self, max_age: float) -> int:
+        """Elimina los conjuntos más viejos que max_age segundos y regresa cuántos se borraron"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM result_sets WHERE fetched_at < ?", (time.time() - max_age,))
+        return cursor.rowcount
+
+    def close(self):
+        """Cierra la conexión"""
+        self._conn.close()
+
+
+@dataclass
+class LocalResult:
+    """Respuesta de LocalSearch"""
+    products: List[Product]
+    matched: int
+    total: int
+    age: float
+    from_network: bool
+
+
+class LocalSearch:
+    """Responde variantes de una búsqueda desde su conjunto de resultados guardado"""
+
+    def __init__(self, client, store: Optional[ResultSetStore] = None, max_age: Optional[float] = None,
+                 max_items: Optional[int] = None, memory_entries: int = 32):
+        """
+        Inicializa el buscador local
+
+        Args:
+            client: MercadoLibreClient (o compatible) del sitio
+            store: Almacén de conjuntos (por defecto uno en Config.RESULT_SET_DB)
+            max_age: Antigüedad máxima en segundos de un conjunto usable (por defecto Config.RESULT_SET_MAX_AGE)
+            max_items: Tamaño máximo de un conjunto que se descarga completo para responder una
+                variante (por defecto Config.RESULT_SET_MAX_ITEMS)
+            memory_entries: Conjuntos indexados que se conservan en memoria
+        """
+        self.client = client
+        self.store = store if store is not None else ResultSetStore()
+        self.max_age = max_age if max_age is not None else Config.RESULT_SET_MAX_AGE
+        self.max_items = max_items if max_items is not None else Config.RESULT_SET_MAX_ITEMS
+        self.memory_entries = memory_entries
+        self._memory: 'OrderedDict[ResultSetKey, ResultSet]' = OrderedDict()
+        self.logger = logging.getLogger(__name__)
+
+    def search(self, query: str, max_results: int = 50, category: Optional[str] = None,
+               condition: Optional[str] = None, sort: str = 'relevance', free_shipping: Optional[bool] = None,
+               min_price: Optional[float] = None, max_price: Optional[float] = None,
+               build: bool = False) -> Optional[LocalResult]:
+        """
+        Busca productos usando el conjunto guardado cuando es posible
+
+        Args:
+            query: Término de búsqueda
+            max_results: Número máximo de resultados
+            category: ID de categoría (forma parte de la llave del conjunto)
+            condition, sort, free_shipping, min_price, max_price: Variante a responder (ver ResultSet.select)
+            build: Si no hay conjunto completo, descargarlo para responder la variante
+                (solo si la búsqueda tiene a lo sumo max_items resultados)
+
+        Returns:
+            LocalResult, o None si la variante no se puede responder localmente (el
+            llamador debe pedirla a la API)
+        """
+        key = result_set_key(self.client.site_id, query, category)
+        is_base = (sort == 'relevance' and not condition and free_shipping is None
+                   and min_price is None and max_price is None)
+
+        result_set = self._cached(key)
+        fresh = result_set is not None and result_set.age <= self.max_age
+        if fresh and (result_set.complete or (is_base and len(result_set) >= max_results)):
+            return self._answer(result_set, False, condition, sort, free_shipping, min_price, max_price, max_results)
+
+        if is_base:
+            # Misma cantidad de peticiones que la búsqueda directa
+            result_set = self._fetch(query, category, max_results)
+        elif not build:
+            return None
+        elif result_set is not None and result_set.total > self.max_items:
+            # El total ya se conoce (aunque el conjunto sea viejo): no vale la pena la primera página
+            return None
+        else:
+            first = self._page(query, category, 0)
+            total = first.paging.get('total', 0)
+            if total > self.max_items:
+                self.logger.info(f"'{query}' tiene {total:,} resultados; la variante se pide a la API")
+                if not fresh:
+                    # La primera página queda como prefijo de la búsqueda base y registra su total
+                    self._save(key, ResultSet(first.products, time.time(), False, total))
+                return None
+            result_set = self._fetch(query, category, self.max_items, first)
+
+        self._save(key, result_set)
+        return self._answer(result_set, True, condition, sort, free_shipping, min_price, max_price, max_results)
+
+    def _save(self, key: ResultSetKey, result_set: ResultSet):
+        self._remember(key, result_set)
+        self.store.put(key, result_set)
+
+    def _answer(self, result_set: ResultSet, from_network: bool, condition, sort, free_shipping,
+                min_price, max_price, max_results) -> LocalResult:
+        matched = result_set.select(condition, free_shipping, min_price, max_price, sort)
+        return LocalResult(matched[:max_results], len(matched), result_set.total, result_set.age, from_network)
+
+    def _cached(self, key: ResultSetKey) -> Optional[ResultSet]:
+        result_set = self._memory.get(key)
+        if result_set is not None:
+            self._memory.move_to_end(key)
+            return result_set
+
+        result_set = self.store.get(key)
+        if result_set is not None:
+            self._remember(key, result_set)
+        return result_set
+
+    def _remember(self, key: ResultSetKey, result_set: ResultSet):
+        self._memory[key] = result_set
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _page(self, query: str, category: Optional[str], offset: int) -> SearchPage:
+        # Con --parse-workers las páginas se decodifican en el ParsePool del cliente, como en search_all_pages
+        parse_pool = getattr(self.client, 'parse_pool', None)
+        decoder = parse_pool.decode if parse_pool is not None else SearchPage.decode
+        return self.client.search_products(query=query, limit=MAX_LIMIT, offset=offset, category=category,
+                                           decoder=decoder)
+
+    def _fetch(self, query: str, category: Optional[str], max_results: int,
+               first: Optional[SearchPage] = None) -> ResultSet:
+        """Descarga el conjunto base (relevancia, sin filtros) hasta max_results productos"""
+        fetched_at = time.time()
+        products: Dict[str, Product] = {}
+        page = first if first is not None else self._page(query, category, 0)
+        total = page.paging.get('total', 0)
+        offset = 0
+
+        while True:
+            for product in page.products:
+                products.setdefault(product.id, product)
+            offset += MAX_LIMIT
+            if not page.products or len(products) >= max_results or offset >= total:
+                break
+            page = self._page(query, category, offset)
+
+        # Completo si se recorrió hasta el final de la búsqueda
+        complete = not page.products or offset >= total
+        result = list(products.values())[:max_results]
+        return ResultSet(result, fetched_at, complete and len(result) == len(products), total)
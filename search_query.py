@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Forma canónica de las búsquedas
+
+"iPhone 15", "iphone  15" e "IPHONE 15" son la misma búsqueda para la API, pero
+como parámetros distintos generan llaves de cache distintas y peticiones
+duplicadas. canonical_search_params() normaliza el texto (mayúsculas, acentos y
+espacios), hace explícitos los valores por defecto y ordena los parámetros;
+make_cache_key() la aplica a /sites/{site}/search, así que el cache y el
+single-flight del gateway comparten una sola llave por búsqueda.
+"""
+
+import unicodedata
+from typing import Any, Dict
+
+from metrics import endpoint_family
+
+SEARCH_FAMILY = '/sites/:site/search'
+
+# Valores que la API usa cuando el parámetro no se envía
+SEARCH_DEFAULTS = {'limit': 50, 'offset': 0, 'sort': 'relevance'}
+
+# Máximo de resultados por página de la API de búsqueda
+MAX_LIMIT = 50
+
+# Parámetros cuyo valor es un código (ej. condition=new, sort=price_asc)
+_CODE_PARAMS = ('sort', 'condition', 'shipping_cost', 'buying_mode')
+
+
+def normalize_query(text: str) -> str:
+    """
+    Normaliza el texto de una búsqueda
+
+    Ejemplo:
+        normalize_query("  Cámara   CANON ") -> "camara canon"
+    """
+    decomposed = unicodedata.normalize('NFKD', text)
+    without_accents = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(without_accents.casefold().split())
+
+
+def canonical_search_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Forma canónica de los parámetros de /sites/{site}/search
+
+    Args:
+        params: Parámetros tal como los arma el llamador
+
+    Returns:
+        Parámetros equivalentes, con las llaves ordenadas: q normalizado, sin
+        valores vacíos, con limit/offset/sort explícitos y códigos en minúsculas
+    """
+    canonical = dict(SEARCH_DEFAULTS)
+
+    for name, value in params.items():
+        if value is None or value == '':
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+        if name == 'q':
+            value = normalize_query(str(value))
+        elif name == 'limit':
+            value = min(int(value), MAX_LIMIT)
+        elif name == 'offset':
+            value = int(value)
+        elif name == 'category':
+            value = str(value).upper()
+        elif name in _CODE_PARAMS:
+            value = str(value).lower()
+        canonical[name] = value
+
+    return dict(sorted(canonical.items()))
+
+
+def is_search_endpoint(endpoint: str) -> bool:
+    """Indica si un endpoint es la búsqueda de un sitio"""
+    return endpoint_family(endpoint) == SEARCH_FAMILY
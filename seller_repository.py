@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Perfiles de vendedores con cache persistente y resolución masiva
+
+SellerRepository.resolve() recibe cualquier cantidad de IDs (con repetidos),
+devuelve los perfiles vigentes desde un almacén SQLite con TTL y pide solo los
+faltantes o vencidos, en lotes de 20 con el multi-get de /users y varios
+lotes en paralelo.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+from config import Config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sellers (
+    seller_id TEXT PRIMARY KEY,
+    nickname TEXT,
+    seller_reputation TEXT,
+    fetched_at REAL NOT NULL
+);
+"""
+
+# Máximo de IDs por petición al multi-get de /users
+BATCH_SIZE = 20
+
+
+class SellerStore:
+    """Almacén SQLite de perfiles de vendedores"""
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Abre (o crea) el almacén
+
+        Args:
+            path: Ruta del archivo SQLite (por defecto Config.SELLER_DB; ':memory:' para no persistir)
+        """
+        self.path = path or Config.SELLER_DB
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def get_many(self, seller_ids: List[str], max_age: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Obtiene perfiles guardados
+
+        Args:
+            seller_ids: IDs de los vendedores
+            max_age: Antigüedad máxima en segundos (None = devolver también los vencidos)
+
+        Returns:
+            Diccionario ID -> perfil con los vendedores encontrados
+        """
+        min_fetched_at = time.time() - max_age if max_age is not None else 0
+        profiles = {}
+
+        with self._lock:
+            for start in range(0, len(seller_ids), 500):
+                chunk = seller_ids[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT * FROM sellers WHERE seller_id IN ({placeholders}) AND fetched_at >= ?",
+                    chunk + [min_fetched_at]
+                ).fetchall()
+                profiles.update({row['seller_id']: _row_to_profile(row) for row in rows})
+
+        return profiles
+
+    def put_many(self, profiles: Iterable[Dict[str, Any]]):
+        """Guarda o reemplaza perfiles"""
+        rows = [
+            (str(p['id']), p.get('nickname', ''), json.dumps(p.get('seller_reputation') or {}),
+             p.get('fetched_at') or time.time())
+            for p in profiles
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO sellers (seller_id, nickname, seller_reputation, fetched_at) "
+                "VALUES (?, ?, ?, ?)",
+                rows
+            )
+
+    def purge(self, max_age: float) -> int:
+        """Elimina los perfiles más viejos que max_age segundos y regresa cuántos se borraron"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM sellers WHERE fetched_at < ?", (time.time() - max_age,))
+        return cursor.rowcount
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM sellers").fetchone()[0]
+
+    def close(self):
+        """Cierra la conexión"""
+        self._conn.close()
+
+
+def _row_to_profile(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        'id': row['seller_id'],
+        'nickname': row['nickname'] or '',
+        'seller_reputation': json.loads(row['seller_reputation'] or '{}'),
+        'fetched_at': row['fetched_at']
+    }
+
+
+def seller_profile(data: Dict) -> Dict[str, Any]:
+    """Perfil reducido a partir de una respuesta de /users/{id}"""
+    return {
+        'id': str(data.get('id', '')),
+        'nickname': data.get('nickname', ''),
+        'seller_reputation': data.get('seller_reputation') or {},
+        'fetched_at': time.time()
+    }
+
+
+class SellerRepository:
+    """Resolución masiva de perfiles de vendedores con cache persistente"""
+
+    def __init__(self, client, store: Optional[SellerStore] = None, ttl: Optional[float] = None,
+                 max_workers: int = 4):
+        """
+        Inicializa el repositorio
+
+        Args:
+            client: Cliente con get_users(ids) (multi-get) o, en su defecto, get_seller_info(id)
+            store: Almacén de perfiles (por defecto uno en Config.SELLER_DB)
+            ttl: Vigencia en segundos de un perfil guardado (por defecto Config.SELLER_TTL)
+            max_workers: Lotes de 20 IDs pedidos en paralelo
+        """
+        self.client = client
+        self.store = store if store is not None else SellerStore()
+        self.ttl = ttl if ttl is not None else Config.SELLER_TTL
+        self.max_workers = max_workers
+        self.fetched = 0
+        self.logger = logging.getLogger(__name__)
+
+    def get(self, seller_id: str) -> Dict[str, Any]:
+        """Perfil de un vendedor ({} si no se pudo obtener)"""
+        if not seller_id:
+            return {}
+        return self.resolve([seller_id]).get(str(seller_id), {})
+
+    def resolve(self, seller_ids: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+        """
+        Obtiene los perfiles de muchos vendedores
+
+        Args:
+            seller_ids: IDs de los vendedores (se ignoran vacíos y repetidos)
+
+        Returns:
+            Diccionario ID (str) -> perfil con id, nickname, seller_reputation y fetched_at.
+            Los vendedores que no se pudieron obtener no aparecen.
+        """
+        unique_ids = list(dict.fromkeys(str(sid) for sid in seller_ids if sid))
+        if not unique_ids:
+            return {}
+
+        profiles = self.store.get_many(unique_ids, max_age=self.ttl)
+        missing = [sid for sid in unique_ids if sid not in profiles]
+        self.fetched = 0
+
+        if missing:
+            batches = [missing[i:i + BATCH_SIZE] for i in range(0, len(missing), BATCH_SIZE)]
+            fetched = []
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for batch_profiles in executor.map(self._fetch_batch, batches):
+                    fetched.extend(batch_profiles)
+
+            self.store.put_many(fetched)
+            profiles.update({p['id']: p for p in fetched})
+            self.fetched = len(fetched)
+
+            # Si la API falla se usa la versión vencida antes que nada
+            failed = [sid for sid in missing if sid not in profiles]
+            if failed:
+                profiles.update(self.store.get_many(failed))
+
+        self.logger.debug(f"Vendedores: {len(unique_ids)} pedidos, {self.fetched} consultados a la API")
+        return {sid: profiles[sid] for sid in unique_ids if sid in profiles}
+
+    def _fetch_batch(self, seller_ids: List[str]) -> List[Dict[str, Any]]:
+        if not hasattr(self.client, 'get_users'):
+            return [profile for profile in map(self._fetch_one, seller_ids) if profile]
+
+        try:
+            responses = self.client.get_users(seller_ids)
+        except Exception as e:
+            self.logger.warning(f"No se pudieron obtener {len(seller_ids)} vendedores: {e}")
+            return []
+
+        return [seller_profile(r['body']) for r in responses
+                if r.get('code') == 200 and isinstance(r.get('body'), dict)]
+
+    def _fetch_one(self, seller_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            return seller_profile(self.client.get_seller_info(seller_id))
+        except Exception as e:
+            self.logger.warning(f"No se pudo obtener el vendedor {seller_id}: {e}")
+            return None
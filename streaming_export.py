@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Exportación incremental de productos en formato JSON Lines
+"""
+
+import json
+import os
+from typing import Iterable, Optional
+
+from mercadolibre_client import Product
+
+
+class JsonLinesExporter:
+    """Escribe productos a un archivo .jsonl a medida que llegan (un producto por línea)"""
+
+    def __init__(self, filepath: str, append: bool = False):
+        """
+        Abre el archivo de exportación
+
+        Args:
+            filepath: Ruta del archivo .jsonl
+            append: Si se agregan líneas a un archivo existente en lugar de sobrescribirlo
+        """
+        self.filepath = filepath
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.count = count_lines(filepath) if append and os.path.exists(filepath) else 0
+        self._file = open(filepath, 'a' if append else 'w', encoding='utf-8')
+
+    def write(self, products: Iterable[Product]):
+        """Escribe un lote de productos y lo asegura en disco"""
+        for product in products:
+            self._file.write(json.dumps(product.to_export_dict(), ensure_ascii=False))
+            self._file.write('\n')
+            self.count += 1
+
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def truncate_to(self, count: int):
+        """Descarta las líneas escritas después de las primeras `count` (usado al reanudar)"""
+        self._file.flush()
+        with open(self.filepath, 'r+b') as f:
+            for _ in range(count):
+                if not f.readline():
+                    break
+            f.truncate(f.tell())
+        self.count = min(self.count, count)
+
+    def close(self):
+        """Cierra el archivo"""
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def count_lines(filepath: str) -> int:
+    """Cuenta las líneas de un archivo"""
+    with open(filepath, 'rb') as f:
+        return sum(1 for _ in f)
+
+
+def read_json_lines(filepath: str, limit: Optional[int] = None):
+    """Lee los productos exportados de un archivo .jsonl (como diccionarios)"""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for index, line in enumerate(f):
+            if limit is not None and index >= limit:
+                break
+            if line.strip():
+                yield json.loads(line)
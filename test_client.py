@@ -6,6 +6,11 @@ Script de pruebas para el cliente de MercadoLibre API
 import unittest
 import sys
 import os
+import threading
+import time
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import Mock, patch
 from rich.console import Console
 
@@ -14,6 +19,38 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from public_client import PublicMercadoLibreClient, SimpleProduct
 from config import Config
+from cache import (FRESH, MISS, STALE, CachedHTTPError, CachePolicy, ResponseCache, TieredCache, cache_policy,
+                   make_cache_key)
+from gateway import Gateway, GatewayClient, create_server
+from multi_site import MultiSiteSearch
+from history_store import PriceHistoryStore
+from incremental_sync import IncrementalSync, SyncState
+from crawl_checkpoint import CrawlCheckpoint
+from streaming_export import read_json_lines
+from mercadolibre_client import MercadoLibreClient, create_client
+from mock_server import MockMercadoLibreServer, generate_category, generate_item, generate_search_result, generate_user
+from fast_json import authenticated_fields, decode_authenticated_item, decode_search
+from metrics import LatencyHistogram, MetricsRegistry, endpoint_family
+from tracing import SpanProfiler, Tracer, tracer
+from transport import (Cassette, RecordingTransport, ReplayTransport, SessionTransport, CassetteMissError,
+                       HttpxTransport, AsyncHttpxTransport, DnsCache, SessionRegistry, SharedSessionTransport,
+                       Transport, create_transport)
+from async_client import AsyncMercadoLibreClient
+from category_tree import CategoryTree, CategoryTreeBuilder
+from throttling import RateLimiter, concurrent_map
+from seller_repository import SellerRepository, SellerStore
+from parallel_parse import ParsePool
+from auth_client import AuthenticatedMercadoLibreClient
+from cache_warmer import CacheWarmer, WarmSpec
+from search_query import canonical_search_params, normalize_query
+from result_set import LocalSearch, ResultSetStore
+from watch import WatchEngine, WatchStore
+from job_queue import JobQueue, JobWorker
+from crawl_coordinator import Coordinator, CrawlWorker, plan_units
+import requests
+from mercadolibre_client import Product, SearchPage
+import tempfile
+from datetime import datetime, timedelta
 
 console = Console()
 
@@ -107,6 +144,1343 @@ class TestSimpleProduct(unittest.TestCase):
         self.assertEqual(product.currency, "MXN")
         self.assertEqual(product.condition, "new")
 
+class TestGateway(unittest.TestCase):
+    """Pruebas para el gateway local"""
+    
+    def setUp(self):
+        """Levanta un gateway con un cliente simulado"""
+        self.upstream = Mock()
+        self.upstream._make_request.return_value = {'id': 'MLM1055', 'name': 'Celulares'}
+        self.gateway = Gateway(client=self.upstream, cache=ResponseCache(ttl=60))
+        self.server = create_server(self.gateway, port=0)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+    
+    def tearDown(self):
+        """Detiene el gateway"""
+        self.server.shutdown()
+        self.server.server_close()
+    
+    def test_fetch_uses_cache(self):
+        """Prueba que las respuestas repetidas salen del cache"""
+        self.gateway.fetch('/categories/MLM1055')
+        status, data = self.gateway.fetch('/categories/MLM1055')
+        
+        self.assertEqual(status, 200)
+        self.assertEqual(data['name'], 'Celulares')
+        self.assertEqual(self.upstream._make_request.call_count, 1)
+    
+    def test_gateway_client_roundtrip(self):
+        """Prueba que GatewayClient obtiene datos a través del servidor"""
+        client = GatewayClient(self.url)
+        try:
+            data = client.get_category_details('MLM1055')
+            client.get_category_details('MLM1055')
+            stats = client.gateway_stats()
+        finally:
+            client.close()
+        
+        self.assertEqual(data['id'], 'MLM1055')
+        self.assertEqual(stats['upstream_requests'], 1)
+        self.assertEqual(stats['cache']['hits'], 1)
+
+class TestMultiSiteSearch(unittest.TestCase):
+    """Pruebas para la búsqueda multi-sitio"""
+    
+    def _fake_client(self, site_id):
+        client = Mock()
+        client.search_products.return_value = {
+            'results': [{'id': f'{site_id}1', 'title': 'Producto', 'price': 100.0,
+                         'currency_id': Config.SITE_CURRENCIES[site_id]}],
+            'paging': {'total': 1}
+        }
+        client.get_currency_conversion.return_value = {'ratio': 0.5}
+        return client
+    
+    def test_results_tagged_and_normalized(self):
+        """Prueba que cada sitio regresa sus productos y precios normalizados"""
+        with patch('multi_site.create_client', side_effect=self._fake_client):
+            with MultiSiteSearch(['MLM', 'MLA']) as multi_search:
+                results = multi_search.search('test', currency='USD')
+        
+        self.assertEqual([r.site_id for r in results], ['MLM', 'MLA'])
+        self.assertEqual(results[1].products[0].id, 'MLA1')
+        self.assertEqual(results[0].normalized_price(results[0].products[0]), 50.0)
+
+    def test_multiple_pages_keep_sort_and_total(self):
+        """Prueba que con varias páginas se respeta el orden y se reporta el total de la API"""
+        def fake_client(site_id):
+            client = self._fake_client(site_id)
+
+            def search_all_pages(query, max_results, category, condition, sort, on_paging):
+                on_paging({'total': 5000, 'offset': 0, 'limit': 50})
+                return [Mock(id=f'{site_id}1')]
+
+            client.search_all_pages.side_effect = search_all_pages
+            return client
+
+        with patch('multi_site.create_client', side_effect=fake_client):
+            with MultiSiteSearch(['MLM']) as multi_search:
+                results = multi_search.search('test', sort='price_asc', pages=3)
+
+        call = multi_search.clients['MLM'].search_all_pages.call_args
+        self.assertEqual(call.kwargs['sort'], 'price_asc')
+        self.assertEqual(results[0].total, 5000)
+
+    def test_conversion_rates_run_alongside_searches(self):
+        """Prueba que las tasas de conversión no esperan a que termine la búsqueda del sitio"""
+        rate_requested = threading.Event()
+
+        def fake_client(site_id):
+            client = self._fake_client(site_id)
+            search_response = client.search_products.return_value
+            client.search_products.side_effect = lambda **kwargs: rate_requested.wait(2) and search_response
+            client.get_currency_conversion.side_effect = lambda *args: rate_requested.set() or {'ratio': 0.5}
+            return client
+
+        with patch('multi_site.create_client', side_effect=fake_client):
+            with MultiSiteSearch(['MLM']) as multi_search:
+                results = multi_search.search('test', currency='USD')
+
+        self.assertTrue(rate_requested.is_set())
+        self.assertEqual(len(results[0].products), 1)
+        self.assertEqual(results[0].normalized_price(results[0].products[0]), 50.0)
+
+class TestPriceHistoryStore(unittest.TestCase):
+    """Pruebas para el historial de precios"""
+    
+    def setUp(self):
+        """Crea un historial temporal"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = PriceHistoryStore(os.path.join(self.tmpdir.name, 'history.db'))
+    
+    def tearDown(self):
+        """Elimina el historial temporal"""
+        self.store.close()
+        self.tmpdir.cleanup()
+    
+    def _product(self, price, sold=10):
+        return Product(id="MLM1", title="Test", price=price, currency_id="MXN", permalink="",
+                       thumbnail="", condition="new", listing_type_id="gold", seller_id="99",
+                       sold_quantity=sold)
+    
+    def test_only_changes_are_stored(self):
+        """Prueba que los snapshots sin cambios no agregan filas"""
+        start = datetime.now() - timedelta(hours=2)
+        self.store.record_products([self._product(100.0)], captured_at=start)
+        counts = self.store.record_products([self._product(100.0)], captured_at=start + timedelta(hours=1))
+        self.store.record_products([self._product(80.0, sold=12)], captured_at=start + timedelta(hours=2))
+        
+        self.assertEqual(counts['unchanged'], 1)
+        history = self.store.price_history("MLM1")
+        self.assertEqual([h['price'] for h in history], [100.0, 80.0])
+        self.assertEqual(history[-1]['sold_change'], 2)
+        self.assertEqual(len(self.store.items_by_seller("99")), 1)
+    
+    def test_biggest_drops(self):
+        """Prueba el cálculo de las mayores bajadas de precio"""
+        yesterday = datetime.now() - timedelta(days=1)
+        self.store.record_products([self._product(100.0)], captured_at=yesterday)
+        self.store.record_products([self._product(75.0)])
+        
+        drops = self.store.biggest_drops(since=yesterday)
+        self.assertEqual(drops[0]['item_id'], "MLM1")
+        self.assertAlmostEqual(drops[0]['percent_change'], -25.0)
+
+class TestIncrementalSync(unittest.TestCase):
+    """Pruebas para la sincronización incremental"""
+    
+    def setUp(self):
+        """Crea un estado temporal y un cliente simulado"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.state = SyncState(os.path.join(self.tmpdir.name, 'sync.db'))
+        self.client = Mock()
+        self.client.get_product_details.side_effect = lambda item_id: {
+            'id': item_id, 'price': 100.0, 'last_updated': '2024-01-01T00:00:00'
+        }
+    
+    def tearDown(self):
+        """Elimina el estado temporal"""
+        self.state.close()
+        self.tmpdir.cleanup()
+    
+    def _multi_get(self, prices):
+        return [{'code': 200, 'body': {'id': item_id, 'price': price}} for item_id, price in prices.items()]
+    
+    def test_only_changed_items_are_refetched(self):
+        """Prueba que solo se piden detalles de productos nuevos o con cambios"""
+        syncer = IncrementalSync(self.client, state=self.state)
+        
+        self.client.get_items.return_value = self._multi_get({'MLM1': 100.0, 'MLM2': 100.0})
+        first = syncer.sync_items(['MLM1', 'MLM2'])
+        
+        self.client.get_items.return_value = self._multi_get({'MLM1': 100.0, 'MLM2': 90.0})
+        second = syncer.sync_items(['MLM1', 'MLM2'])
+        
+        self.assertEqual(first.new, 2)
+        self.assertEqual(second.unchanged, 1)
+        self.assertEqual(second.changed_ids, ['MLM2'])
+        self.assertEqual(self.client.get_product_details.call_count, 3)
+
+class TestCrawlCheckpoint(unittest.TestCase):
+    """Pruebas para las búsquedas reanudables"""
+    
+    def setUp(self):
+        """Crea un directorio temporal"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'crawl.json')
+    
+    def tearDown(self):
+        """Elimina el directorio temporal"""
+        self.tmpdir.cleanup()
+    
+    def _page(self, offset):
+        return {
+            'results': [{'id': f'MLM{offset + i}', 'title': 'P', 'price': 1.0} for i in range(50)],
+            'paging': {'total': 150}
+        }
+    
+    def test_resume_after_failure(self):
+        """Prueba que una búsqueda interrumpida continúa desde la última página"""
+        calls = []
+        
+        def flaky_search(query, limit, offset, category, condition, decoder, sort='relevance'):
+            calls.append(offset)
+            if offset == 50 and calls.count(50) == 1:
+                raise ConnectionError("fallo de red")
+            return decoder(json.dumps(self._page(offset)).encode('utf-8'))
+        
+        with MercadoLibreClient() as client:
+            client.search_products = flaky_search
+            
+            for _ in range(2):
+                crawl = CrawlCheckpoint.open(self.path, 'test', max_results=150)
+                with crawl.attach_exporter(os.path.join(self.tmpdir.name, 'out.jsonl')) as exporter:
+                    client.search_all_pages('test', max_results=150, checkpoint=crawl, on_page=exporter.write)
+        
+        self.assertEqual(calls, [0, 50, 50, 100])
+        self.assertTrue(CrawlCheckpoint.load(self.path).completed)
+        rows = list(read_json_lines(crawl.export_path))
+        self.assertEqual(len(rows), 150)
+        self.assertEqual(len({row['id'] for row in rows}), 150)
+
+    def test_sort_and_more_results_after_completion(self):
+        """Prueba que el orden es parte del checkpoint y que pedir más resultados reabre uno terminado"""
+        calls = []
+
+        def search(query, limit, offset, category, condition, decoder, sort='relevance'):
+            calls.append((offset, sort))
+            return decoder(json.dumps(self._page(offset)).encode('utf-8'))
+
+        with MercadoLibreClient() as client:
+            client.search_products = search
+
+            for max_results in (60, 150):
+                crawl = CrawlCheckpoint.open(self.path, 'test', max_results=max_results, sort='price_asc')
+                with crawl.attach_exporter(os.path.join(self.tmpdir.name, 'out.jsonl')) as exporter:
+                    client.search_all_pages('test', max_results=max_results, sort='price_asc',
+                                            checkpoint=crawl, on_page=exporter.write)
+                self.assertTrue(crawl.completed)
+
+        # La página cortada por max_results se vuelve a pedir y sus productos repetidos se descartan
+        self.assertEqual(calls, [(0, 'price_asc'), (50, 'price_asc'), (50, 'price_asc'), (100, 'price_asc')])
+        self.assertEqual(len({row['id'] for row in read_json_lines(crawl.export_path)}), 150)
+        self.assertEqual(crawl.items_collected, 150)
+
+        # Otro orden no reanuda el mismo checkpoint
+        self.assertEqual(CrawlCheckpoint.open(self.path, 'test', max_results=150).next_offset, 0)
+
+class TestMockServer(unittest.TestCase):
+    """Pruebas del cliente contra la API simulada"""
+    
+    def test_search_all_pages_offline(self):
+        """Prueba la paginación completa y el reintento tras 429 sin red"""
+        with MockMercadoLibreServer(total_results=120, rate_429=0.2, seed=1) as server:
+            with MercadoLibreClient(base_url=server.url) as client:
+                client.delay_between_requests = 0
+                products = client.search_all_pages("iphone", max_results=200)
+                seller = client.get_seller_info(str(products[0].seller_id))
+        
+        self.assertEqual(len(products), 120)
+        self.assertEqual(len({p.id for p in products}), 120)
+        self.assertIn('nickname', seller)
+    
+    def test_benchmark_counts_requests(self):
+        """Prueba que el benchmark de search_all_pages cronometra peticiones reales"""
+        from benchmark import bench_search_all_pages
+        
+        # Las dos ejecuciones (tiempo y memoria) hacen 6 peticiones: con el límite por minuto tardaría 60 s
+        with MockMercadoLibreServer() as server, patch.dict(os.environ, {'REQUESTS_PER_MINUTE': '5'}):
+            start = time.time()
+            result = bench_search_all_pages(server, 120)
+        
+        self.assertEqual(result['requests'], 3)
+        self.assertGreater(result['requests_per_second'], 0)
+        self.assertLess(time.time() - start, 10)
+
+class TestCassetteTransport(unittest.TestCase):
+    """Pruebas para la grabación y reproducción de respuestas"""
+    
+    def test_record_then_replay_without_network(self):
+        """Prueba que lo grabado se reproduce igual con el servidor apagado"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'test.cassette')
+            
+            with MockMercadoLibreServer(total_results=60) as server:
+                transport = RecordingTransport(Cassette(path), SessionTransport(requests.Session()))
+                with MercadoLibreClient(base_url=server.url, transport=transport) as client:
+                    client.delay_between_requests = 0
+                    recorded = client.search_all_pages("tv", max_results=60)
+            
+            with MercadoLibreClient(base_url=server.url, transport=ReplayTransport(Cassette(path))) as client:
+                client.delay_between_requests = 0
+                replayed = client.search_all_pages("tv", max_results=60)
+                
+                with self.assertRaises(CassetteMissError):
+                    client.get_product_details("MLM999")
+        
+        self.assertEqual([p.id for p in recorded], [p.id for p in replayed])
+    
+    def test_create_transport_uses_config(self):
+        """Prueba que create_transport toma el cassette y el modo de Config"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'config.cassette')
+            with patch.object(Config, 'CASSETTE_PATH', path), patch.object(Config, 'CASSETTE_MODE', 'record'):
+                transport = create_transport(requests.Session())
+            self.assertIsInstance(transport, RecordingTransport)
+            self.assertEqual(transport.cassette.path, path)
+        
+        with self.assertRaises(TypeError):
+            Transport()
+
+class TestMetrics(unittest.TestCase):
+    """Pruebas para las métricas por endpoint"""
+    
+    def test_endpoint_family(self):
+        """Prueba que los IDs se agrupan en la misma familia"""
+        self.assertEqual(endpoint_family('/sites/MLA/search'), '/sites/:site/search')
+        self.assertEqual(endpoint_family('/items/MLM123/description'), '/items/:id/description')
+        self.assertEqual(endpoint_family('/users/456'), '/users/:id')
+    
+    def test_histogram_percentiles(self):
+        """Prueba que los percentiles tienen error relativo acotado"""
+        histogram = LatencyHistogram()
+        for ms in range(1, 1001):
+            histogram.record(ms / 1000)
+        
+        self.assertAlmostEqual(histogram.percentile(50), 0.5, delta=0.5 * 0.04)
+        self.assertAlmostEqual(histogram.percentile(99), 0.99, delta=0.99 * 0.04)
+        self.assertEqual(histogram.cumulative([0.1, 2.0])[1], 1000)
+    
+    def test_client_records_requests_and_retries(self):
+        """Prueba que el cliente registra peticiones, 429 y bytes contra la API simulada"""
+        metrics = MetricsRegistry()
+        with MockMercadoLibreServer(total_results=100, rate_429=0.3, seed=2) as server:
+            with MercadoLibreClient(base_url=server.url, metrics=metrics) as client:
+                client.delay_between_requests = 0
+                client.search_all_pages("tv", max_results=100)
+        
+        search = metrics.families()['/sites/:site/search']
+        self.assertEqual(search.requests['200'], 2)
+        self.assertEqual(search.retries, search.requests.get('429', 0))
+        self.assertGreater(search.bytes_received, 0)
+        
+        restored = MetricsRegistry()
+        restored.merge_snapshot(metrics.snapshot())
+        self.assertIn('meli_requests_total{endpoint="/sites/:site/search",status="200"} 2',
+                      restored.to_prometheus())
+
+class TestTracing(unittest.TestCase):
+    """Pruebas para los spans y el perfil por etapa"""
+    
+    def test_nested_spans_report_self_time(self):
+        """Prueba que el tiempo de los spans hijos no se cuenta dos veces"""
+        local_tracer = Tracer()
+        profiler = SpanProfiler()
+        local_tracer.add_hook(profiler)
+        
+        with local_tracer.span('export'):
+            with local_tracer.span('dataframe') as inner:
+                inner.set_attribute('items', 10)
+        
+        stats = profiler.stats
+        self.assertEqual(stats['dataframe']['count'], 1)
+        self.assertAlmostEqual(stats['export']['total'], stats['export']['self'] + stats['dataframe']['total'])
+    
+    def test_client_emits_pipeline_spans(self):
+        """Prueba que una búsqueda paginada emite spans de red, parseo y modelos"""
+        profiler = SpanProfiler()
+        tracer.add_hook(profiler)
+        try:
+            with MockMercadoLibreServer(total_results=100) as server:
+                with MercadoLibreClient(base_url=server.url) as client:
+                    client.delay_between_requests = 0
+                    client.search_all_pages("tv", max_results=100)
+        finally:
+            tracer.remove_hook(profiler)
+        
+        stages = {row['stage']: row for row in profiler.breakdown()}
+        for stage in ('request', 'parse', 'model-build'):
+            self.assertEqual(stages[stage]['count'], 2)
+        self.assertIn('other', stages)
+
+class TestFastJson(unittest.TestCase):
+    """Pruebas para la decodificación rápida de respuestas"""
+    
+    def test_decode_search_matches_from_api_response(self):
+        """Prueba que la decodificación directa produce los mismos productos"""
+        results = [generate_search_result(f"MLM{i}", "tv") for i in range(20)]
+        results[0].pop('shipping')
+        results[1]['official_store_id'] = None
+        body = json.dumps({'results': results, 'paging': {'total': 20}}).encode('utf-8')
+        
+        fields, paging = decode_search(body)
+        
+        self.assertEqual(paging['total'], 20)
+        self.assertEqual([Product(**f) for f in fields], [Product.from_api_response(r) for r in results])
+    
+    def test_decode_authenticated_item(self):
+        """Prueba los campos anidados de AuthenticatedProduct"""
+        item = generate_item("MLM42")
+        item['seller_address'] = {'city': {'name': 'Monterrey'}}
+        
+        fields = decode_authenticated_item(json.dumps(item).encode('utf-8'))
+        
+        self.assertEqual(fields, authenticated_fields(item))
+        self.assertEqual(fields['location'], 'Monterrey')
+        self.assertEqual(fields['seller_id'], item['seller_id'])
+
+class TestHttpxTransport(unittest.TestCase):
+    """Pruebas para los transportes sobre httpx"""
+    
+    def test_sync_client_over_httpx(self):
+        """Prueba la paginación y el reintento tras 429 con el transporte httpx"""
+        with MockMercadoLibreServer(total_results=100, rate_429=0.2, seed=3) as server:
+            transport = HttpxTransport(http2=False, max_connections=2)
+            with MercadoLibreClient(base_url=server.url, transport=transport) as client:
+                client.delay_between_requests = 0
+                products = client.search_all_pages("tv", max_results=100)
+                
+                with self.assertRaises(requests.exceptions.HTTPError):
+                    client._make_request('/ruta/inexistente')
+        
+        self.assertEqual(len({p.id for p in products}), 100)
+    
+    def test_http2_negotiation_and_fallback(self):
+        """Prueba HTTP/2 activado (el servidor sin TLS negocia HTTP/1.1) y el respaldo sin el paquete h2"""
+        import httpx
+        
+        with MockMercadoLibreServer() as server:
+            transport = HttpxTransport(http2=True)
+            try:
+                self.assertTrue(transport.http2)
+                response = transport.get(f"{server.url}/items/MLM1")
+                self.assertEqual(response.json()['id'], 'MLM1')
+                
+                # Los errores de programación no se disfrazan de errores de red
+                with self.assertRaises(TypeError):
+                    transport.get(f"{server.url}/items/MLM1", parametro_inexistente=1)
+            finally:
+                transport.close()
+            
+            with patch('transport._http2_available', return_value=False):
+                fallback = HttpxTransport(http2=True)
+            try:
+                self.assertFalse(fallback.http2)
+                self.assertEqual(fallback.get(f"{server.url}/items/MLM2").status_code, 200)
+            finally:
+                fallback.close()
+        
+        transport = HttpxTransport(http2=True)
+        try:
+            with patch.object(transport.client, 'request', side_effect=httpx.ConnectError('sin conexión')):
+                with self.assertRaises(requests.exceptions.ConnectionError):
+                    transport.get('https://api.mercadolibre.com/sites')
+        finally:
+            transport.close()
+    
+    def test_async_client_concurrent_lookups(self):
+        """Prueba consultas concurrentes de items y vendedores con el cliente asíncrono"""
+        async def lookups(url):
+            transport = AsyncHttpxTransport(http2=False, max_connections=4)
+            async with AsyncMercadoLibreClient(base_url=url, transport=transport,
+                                               rate_limiter=RateLimiter(0, 0)) as client:
+                items = await client.get_many_product_details([f"MLM{i}" for i in range(12)])
+                sellers = await client.get_many_sellers([item['seller_id'] for item in items.values()])
+                return items, sellers
+        
+        with MockMercadoLibreServer(rate_429=0.1, seed=4) as server:
+            items, sellers = asyncio.run(lookups(server.url))
+        
+        self.assertEqual(items['MLM3']['id'], 'MLM3')
+        self.assertTrue(all('nickname' in seller for seller in sellers.values()))
+
+class TestSessionRegistry(unittest.TestCase):
+    """Pruebas para el pool de conexiones compartido"""
+    
+    def test_short_lived_clients_reuse_connection(self):
+        """Prueba que varios clientes sucesivos usan la misma conexión persistente"""
+        registry = SessionRegistry(dns_cache_ttl=0)
+        try:
+            with MockMercadoLibreServer() as server:
+                for i in range(5):
+                    with MercadoLibreClient(base_url=server.url) as client:
+                        client.transport = SharedSessionTransport(client.session, registry)
+                        client.delay_between_requests = 0
+                        self.assertEqual(client.get_product_details(f"MLM{i}")['id'], f"MLM{i}")
+                
+                self.assertEqual(list(registry.stats().values()), [1])
+        finally:
+            registry.close()
+    
+    def test_clients_keep_their_own_session(self):
+        """Prueba que solo se comparte el pool: cookies y auth siguen siendo de cada cliente"""
+        registry = SessionRegistry(dns_cache_ttl=0)
+        try:
+            first = SharedSessionTransport(requests.Session(), registry)
+            second = SharedSessionTransport(requests.Session(), registry)
+            first.session.cookies.set('sesion', 'uno')
+            first.session.auth = ('usuario', 'clave')
+            
+            self.assertIs(first.session.get_adapter('https://api.mercadolibre.com'),
+                          second.session.get_adapter('https://api.mercadolibre.com'))
+            prepared = second.session.prepare_request(requests.Request('GET', 'https://api.mercadolibre.com/sites'))
+            self.assertNotIn('Cookie', prepared.headers)
+            self.assertNotIn('Authorization', prepared.headers)
+            
+            # Cerrar un cliente no cierra el pool de los demás
+            first.close()
+            self.assertIs(registry.adapter(), second.session.get_adapter('https://api.mercadolibre.com'))
+            self.assertIsNotNone(registry.adapter().poolmanager)
+        finally:
+            registry.close()
+    
+    def test_dns_cache(self):
+        """Prueba que las resoluciones repetidas salen del cache y que las vencidas se eliminan"""
+        calls = []
+        cache = DnsCache(ttl=60, resolver=lambda *args: calls.append(args) or [('resultado',)])
+        
+        cache.getaddrinfo('api.mercadolibre.com', 443)
+        result = cache.getaddrinfo('api.mercadolibre.com', 443)
+        
+        self.assertEqual(result, [('resultado',)])
+        self.assertEqual(len(calls), 1)
+        
+        cache.ttl = -1
+        for i in range(5):
+            cache.getaddrinfo(f'host{i}.example', 443)
+        # La primera entrada sigue vigente; de las vencidas solo queda la última
+        self.assertEqual(len(cache), 2)
+    
+    def test_dns_cache_scoped_to_pool(self):
+        """Prueba que el pool compartido resuelve con su cache sin tocar socket.getaddrinfo"""
+        import socket
+        
+        original = socket.getaddrinfo
+        calls = []
+        registry = SessionRegistry(dns_cache_ttl=60)
+        try:
+            registry.adapter()
+            registry.dns_cache.resolver = lambda *args, **kwargs: calls.append(args) or original(*args, **kwargs)
+            with MockMercadoLibreServer() as server:
+                url = server.url.replace('127.0.0.1', 'localhost')
+                for i in range(3):
+                    with MercadoLibreClient(base_url=url, rate_limiter=RateLimiter(0, 0)) as client:
+                        client.transport = SharedSessionTransport(client.session, registry)
+                        self.assertEqual(client.get_product_details(f"MLM{i}")['id'], f"MLM{i}")
+                        # Fuerza una conexión nueva en cada cliente
+                        registry.adapter().poolmanager.clear()
+            
+            self.assertIs(socket.getaddrinfo, original)
+            self.assertEqual([args[0] for args in calls], ['localhost'])
+        finally:
+            registry.close()
+
+class TestCategoryTree(unittest.TestCase):
+    """Pruebas para el árbol de categorías local"""
+    
+    def test_build_lookup_and_incremental_refresh(self):
+        """Prueba el BFS, las búsquedas O(1), la persistencia y la actualización incremental"""
+        with MockMercadoLibreServer() as server, tempfile.TemporaryDirectory() as tmpdir:
+            with MercadoLibreClient(base_url=server.url) as client:
+                client.rate_limiter = RateLimiter(0, 0)
+                builder = CategoryTreeBuilder(client, max_workers=4)
+                tree = builder.build()
+                full_fetch = builder.fetched
+                
+                path = os.path.join(tmpdir, 'MLM.json.gz')
+                tree.save(path)
+                loaded = CategoryTree.load(path)
+                
+                refreshed = builder.build(previous=loaded, max_age=3600)
+                self.assertEqual(builder.fetched, 0)
+                
+                builder.build(previous=loaded, max_age=-1)
+                self.assertEqual(builder.fetched, full_fetch)
+        
+        self.assertEqual(len(tree), full_fetch)
+        self.assertEqual(len(tree.roots), 12)
+        
+        leaf = next(node for node in loaded.nodes() if len(loaded.ancestors(node.id)) == 2)
+        expected_path = [p['id'] for p in generate_category(leaf.id)['path_from_root']]
+        self.assertEqual([p['id'] for p in loaded.path_from_root(leaf.id)], expected_path)
+        self.assertEqual(loaded.name(leaf.id), tree.name(leaf.id))
+        self.assertEqual(len(refreshed), len(tree))
+
+
+class TestSellerRepository(unittest.TestCase):
+    """Pruebas para el repositorio de perfiles de vendedores"""
+    
+    def test_bulk_resolve_dedupes_and_persists(self):
+        """Prueba la resolución masiva con multi-get, el almacén persistente y el TTL"""
+        seller_ids = [str(1000 + i) for i in range(45)]
+        
+        with MockMercadoLibreServer() as server, tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'sellers.db')
+            with MercadoLibreClient(base_url=server.url) as client:
+                client.rate_limiter = RateLimiter(0, 0)
+                repository = SellerRepository(client, SellerStore(path), ttl=3600)
+                
+                profiles = repository.resolve(seller_ids + seller_ids[:10] + [None, ''])
+                self.assertEqual(repository.fetched, 45)
+                self.assertEqual(server.state.requests, 3)  # 3 lotes de hasta 20
+                
+                again = SellerRepository(client, SellerStore(path), ttl=3600)
+                self.assertEqual(again.resolve(reversed(seller_ids)), profiles)
+                self.assertEqual(again.fetched, 0)
+                
+                expired = SellerRepository(client, SellerStore(path), ttl=-1)
+                expired.resolve(seller_ids[:5])
+                self.assertEqual(expired.fetched, 5)
+        
+        self.assertEqual(list(profiles), seller_ids)
+        user = generate_user('1007')
+        self.assertEqual(profiles['1007']['nickname'], user['nickname'])
+        self.assertEqual(profiles['1007']['seller_reputation'], user['seller_reputation'])
+
+class TestParsePool(unittest.TestCase):
+    """Pruebas para la decodificación de páginas en un pool de procesos"""
+    
+    def test_pool_matches_inline_decoding(self):
+        """Prueba que el pool produce los mismos Product que la decodificación en el hilo"""
+        results = [generate_search_result(f"MLM{i}", 'iphone') for i in range(50)]
+        results[0]['price'] = None
+        results[1]['seller']['id'] = 'ABC'  # Columna con tipos mixtos
+        results[2]['seller']['seller_reputation'] = {'level_id': '5_green'}
+        results[3]['title'] = 'Título con\x00separador'
+        body = json.dumps({'results': results, 'paging': {'total': 50}}).encode()
+        expected = SearchPage.decode(body)
+        
+        with ParsePool(max_workers=1, min_bytes=0) as pool:
+            self.assertEqual(pool.decode(body), expected)
+            self.assertEqual(asyncio.run(pool.decode_async(body)), expected)
+        
+        with ParsePool(max_workers=1, min_bytes=0, slot_size=1024) as pool:
+            self.assertEqual(pool.decode(body), expected)  # Página más grande que el slot
+    
+    def test_search_all_pages_with_pool(self):
+        """Prueba search_all_pages con parse_pool contra la API simulada"""
+        with MockMercadoLibreServer() as server, ParsePool(max_workers=1, min_bytes=0) as pool:
+            with MercadoLibreClient(base_url=server.url) as client:
+                client.delay_between_requests = 0
+                expected = client.search_all_pages('iphone', max_results=150)
+                client.parse_pool = pool
+                products = client.search_all_pages('iphone', max_results=150)
+        
+        self.assertEqual(len(products), 150)
+        self.assertEqual(products, expected)
+
+class TestAuthenticatedClient(unittest.TestCase):
+    """Pruebas para el cliente autenticado"""
+    
+    def test_product_details_fan_out(self):
+        """Prueba que los detalles se obtienen en dos rondas de peticiones en lugar de cuatro"""
+        item = generate_item('MLM123', 'iphone')
+        user = generate_user(str(item['seller_id']))
+        responses = {
+            '/items/MLM123': json.dumps(item).encode(),
+            '/items/MLM123/description': {'plain_text': 'Descripción'},
+            '/users': [{'code': 200, 'body': user}],
+            f"/categories/{item['category_id']}": {'name': 'Celulares'}
+        }
+        
+        def fake_request(endpoint, params=None, decoder=None):
+            time.sleep(0.1)
+            response = responses[endpoint]
+            return decoder(response) if decoder else response
+        
+        client = AuthenticatedMercadoLibreClient('id', 'secret')
+        client._make_authenticated_request = fake_request
+        client._category_tree = False
+        client._seller_repository = SellerRepository(client, SellerStore(':memory:'))
+        
+        start = time.time()
+        product = client.get_product_details('MLM123')
+        elapsed = time.time() - start
+        
+        self.assertLess(elapsed, 0.35)
+        self.assertEqual(product.description, 'Descripción')
+        self.assertEqual(product.seller_nickname, user['nickname'])
+        self.assertEqual(product.category_name, 'Celulares')
+        self.assertEqual(product.title, item['title'])
+
+    def test_concurrent_requests_refresh_token_once(self):
+        """Prueba que varios hilos con el token por vencer lo refrescan una sola vez"""
+        refreshes = []
+
+        class FakeTransport:
+            def post(self, url, json=None):
+                refreshes.append(json['refresh_token'])
+                time.sleep(0.05)
+                return Mock(status_code=200, json=lambda: {'access_token': f'token-{len(refreshes)}',
+                                                           'refresh_token': f'refresh-{len(refreshes)}'})
+
+            def get(self, url, params=None, headers=None):
+                return Mock(status_code=200, json=lambda: {'authorization': headers['Authorization']})
+
+        client = AuthenticatedMercadoLibreClient('id', 'secret', transport=FakeTransport())
+        client._save_token = lambda: None
+        client.access_token, client.refresh_token = 'token-0', 'refresh-0'
+        client.token_expires_at = datetime.now()
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            responses = list(executor.map(lambda _: client._make_authenticated_request('/users/me'), range(4)))
+
+        self.assertEqual(refreshes, ['refresh-0'])
+        self.assertEqual({r['authorization'] for r in responses}, {'Bearer token-1'})
+        self.assertEqual(client.refresh_token, 'refresh-1')
+
+    def test_search_survives_seller_failure(self):
+        """Prueba que si fallan los vendedores la búsqueda regresa los productos sin vendedor"""
+        search = {'results': [generate_search_result('MLM1', 'iphone'), generate_search_result('MLM2', 'iphone')],
+                  'paging': {'total': 2}}
+
+        def fake_request(endpoint, params=None, decoder=None):
+            return decoder(json.dumps(search).encode())
+
+        client = AuthenticatedMercadoLibreClient('id', 'secret')
+        client._make_authenticated_request = fake_request
+        client._category_tree = False
+        client._get_category_name = lambda category_id: ''
+        client._seller_repository = Mock()
+        client._seller_repository.resolve.side_effect = Exception("database is locked")
+
+        products = client.search_products_authenticated('iphone')
+
+        self.assertEqual([p.id for p in products], ['MLM1', 'MLM2'])
+        self.assertEqual(products[0].seller_nickname, '')
+
+    def test_product_details_survive_seller_failure(self):
+        """Prueba que si falla el almacén de vendedores los detalles llegan sin vendedor"""
+        item = generate_item('MLM123', 'iphone')
+        responses = {
+            '/items/MLM123': json.dumps(item).encode(),
+            '/items/MLM123/description': {'plain_text': 'Descripción'},
+        }
+
+        client = AuthenticatedMercadoLibreClient('id', 'secret')
+        client._make_authenticated_request = lambda endpoint, params=None, decoder=None: (
+            decoder(responses[endpoint]) if decoder else responses[endpoint])
+        client._get_category_name = lambda category_id: ''
+        client._seller_repository = Mock()
+        client._seller_repository.resolve.side_effect = Exception("database is locked")
+
+        product = client.get_product_details('MLM123')
+
+        self.assertEqual(product.description, 'Descripción')
+        self.assertEqual(product.seller_nickname, '')
+
+class TestClientMap(unittest.TestCase):
+    """Pruebas para el uso concurrente de MercadoLibreClient"""
+    
+    def test_map_ordered_with_errors_and_shared_rate_limit(self):
+        """Prueba client.map: orden, errores por llamada y rate limiting compartido entre hilos"""
+        ids = [f"MLM{i}" for i in range(10)]
+        
+        with MockMercadoLibreServer() as server:
+            with MercadoLibreClient(base_url=server.url) as client:
+                client.delay_between_requests = 0.02
+                start = time.time()
+                results = list(client.map('get_product_details', ids + ['MLM-x/y'], concurrency=5))
+                elapsed = time.time() - start
+                
+                client.delay_between_requests = 0
+                unordered = list(client.map(client.get_product_details, ids, concurrency=5, ordered=False))
+        
+        self.assertEqual([r.arg for r in results], ids + ['MLM-x/y'])
+        self.assertTrue(all(r.ok for r in results[:10]))
+        self.assertEqual(results[3].value['id'], 'MLM3')
+        self.assertFalse(results[10].ok)
+        self.assertIsInstance(results[10].error, requests.exceptions.HTTPError)
+        self.assertGreaterEqual(elapsed, 0.02 * 10)  # El intervalo mínimo se respeta entre hilos
+        self.assertEqual(sorted(r.index for r in unordered), list(range(10)))
+    
+    def test_map_is_lazy(self):
+        """Prueba que map consume los argumentos a medida que avanza"""
+        consumed = []
+        
+        def args():
+            for i in range(1000):
+                consumed.append(i)
+                yield i
+        
+        with MercadoLibreClient() as client:
+            results = client.map(lambda x: x * 2, args(), concurrency=3)
+            first = [next(results).value for _ in range(3)]
+            results.close()
+        
+        self.assertEqual(first, [0, 2, 4])
+        self.assertLess(len(consumed), 10)
+    
+    def test_map_rejects_invalid_concurrency(self):
+        """Prueba que una concurrencia menor que 1 es un error y no descarta las llamadas"""
+        for concurrency in (0, -2):
+            with self.assertRaises(ValueError):
+                concurrent_map(lambda x: x, [1, 2, 3], concurrency=concurrency)
+        self.assertEqual([r.value for r in concurrent_map(lambda x: x, [1, 2, 3], concurrency=1)], [1, 2, 3])
+
+class TestCachePolicies(unittest.TestCase):
+    """Pruebas para stale-while-revalidate y el cache negativo"""
+    
+    def test_stale_while_revalidate(self):
+        """Prueba que una entrada vencida se sirve al instante y se refresca en segundo plano"""
+        cache = ResponseCache()
+        policy = CachePolicy(ttl=0.05, stale_ttl=60)
+        calls = []
+        
+        def loader():
+            calls.append(1)
+            return {'version': len(calls)}
+        
+        self.assertEqual(cache.fetch('/users/1', loader, policy), ({'version': 1}, MISS))
+        self.assertEqual(cache.fetch('/users/1', loader, policy), ({'version': 1}, FRESH))
+        time.sleep(0.1)
+        self.assertEqual(cache.fetch('/users/1', loader, policy), ({'version': 1}, STALE))
+        
+        for _ in range(50):
+            if cache.get('/users/1') is not None:
+                break
+            time.sleep(0.01)
+        self.assertEqual(cache.get('/users/1'), {'version': 2})
+        self.assertEqual(cache.stats()['revalidations'], 1)
+    
+    def test_negative_caching_through_client(self):
+        """Prueba que un 404 se recuerda y no se vuelve a pedir, también en el multi-get"""
+        with MockMercadoLibreServer() as server:
+            with MercadoLibreClient(base_url=server.url, cache=ResponseCache()) as client:
+                client.delay_between_requests = 0
+                
+                with self.assertRaises(requests.exceptions.HTTPError):
+                    client.get_product_details('MLM-borrado')
+                with self.assertRaises(CachedHTTPError) as error:
+                    client.get_product_details('MLM-borrado')
+                self.assertEqual(error.exception.response.status_code, 404)
+                self.assertEqual(server.state.requests, 1)
+                
+                responses = client.get_items(['MLM1', 'MLM-borrado', 'MLM2'])
+                self.assertEqual([r['code'] for r in responses], [200, 404, 200])
+                self.assertEqual(server.state.requests, 2)
+        
+        self.assertEqual(cache_policy('/items/MLM1').negative_ttl, Config.CACHE_NEGATIVE_TTL)
+        self.assertGreater(cache_policy('/categories/MLM1055').stale_ttl, 0)
+
+class TestTieredCache(unittest.TestCase):
+    """Pruebas para el cache de dos niveles (memoria y disco)"""
+    
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'responses.db')
+    
+    def tearDown(self):
+        self.tmpdir.cleanup()
+    
+    def test_memory_and_disk_tiers(self):
+        """Prueba que los aciertos salen de memoria y, tras reabrir, del disco"""
+        cache = TieredCache(self.path, ttl=60)
+        cache.set('/items/MLM1', {'id': 'MLM1', 'price': 10.5})
+        cache.set_negative('/items/MLM2', 404, 'Not Found', 60)
+        
+        self.assertEqual(cache.get('/items/MLM1'), {'id': 'MLM1', 'price': 10.5})
+        self.assertEqual(cache.stats()['memory']['hits'], 1)
+        cache.close()
+        
+        cache = TieredCache(self.path, ttl=60)
+        self.assertEqual(cache.get('/items/MLM1'), {'id': 'MLM1', 'price': 10.5})
+        self.assertEqual(cache.get('/items/MLM1'), {'id': 'MLM1', 'price': 10.5})
+        self.assertEqual(cache.negative_status('/items/MLM2'), 404)
+        self.assertIsNone(cache.get('/items/MLM3'))
+        
+        stats = cache.stats()
+        self.assertEqual(stats['disk']['hits'], 2)
+        self.assertEqual(stats['disk']['misses'], 1)
+        self.assertEqual(stats['memory']['hits'], 1)
+        self.assertEqual(stats['entries'], 2)
+        cache.close()
+    
+    def test_size_aware_eviction(self):
+        """Prueba que ambos niveles respetan su límite de bytes"""
+        cache = TieredCache(self.path, ttl=60, max_memory_bytes=3000, max_disk_bytes=2000, compress_level=1)
+        for i in range(20):
+            cache.set(f'/items/MLM{i}', {'id': i, 'data': os.urandom(400).hex()})
+        
+        stats = cache.stats()
+        self.assertLessEqual(stats['memory']['bytes'], 3000)
+        self.assertGreater(stats['memory']['evictions'], 0)
+        self.assertLessEqual(stats['disk']['bytes'], 2000)
+        self.assertGreater(stats['disk']['evictions'], 0)
+        # Lo más reciente sigue disponible; lo más viejo ya no
+        self.assertEqual(cache.get('/items/MLM19')['id'], 19)
+        self.assertIsNone(cache.get('/items/MLM0'))
+        cache.close()
+    
+    def test_authenticated_client_uses_cache(self):
+        """Prueba que el enriquecimiento repetido del cliente autenticado sale del cache"""
+        calls = []
+        client = AuthenticatedMercadoLibreClient('id', 'secret', cache=TieredCache(self.path, ttl=60))
+        client._fetch_authenticated = lambda endpoint, params=None, decoder=None: calls.append(endpoint) or {
+            'name': 'Celulares'}
+        
+        for _ in range(3):
+            self.assertEqual(client._make_authenticated_request('/categories/MLM1055')['name'], 'Celulares')
+        self.assertEqual(calls, ['/categories/MLM1055'])
+        client.cache.close()
+
+class TestSearchQuery(unittest.TestCase):
+    """Pruebas para la forma canónica de las búsquedas"""
+    
+    def test_variants_share_one_key(self):
+        """Prueba que mayúsculas, acentos, espacios y valores por defecto no cambian la llave"""
+        self.assertEqual(normalize_query('  Cámara   CANON '), 'camara canon')
+        
+        endpoint = '/sites/MLM/search'
+        keys = {
+            make_cache_key(endpoint, {'q': 'iPhone 15'}),
+            make_cache_key(endpoint, {'q': 'iphone  15', 'limit': 50, 'offset': 0, 'sort': 'relevance'}),
+            make_cache_key(endpoint, {'sort': 'RELEVANCE', 'offset': '0', 'q': 'IPHONE 15 ', 'category': None}),
+        }
+        self.assertEqual(len(keys), 1)
+        self.assertNotEqual(make_cache_key(endpoint, {'q': 'iphone 15', 'offset': 50}), keys.pop())
+        self.assertEqual(canonical_search_params({'q': 'x', 'limit': 200})['limit'], 50)
+    
+    def test_search_cache_is_opt_in(self):
+        """Prueba que las búsquedas solo se reutilizan cuando la llamada lo pide"""
+        with MockMercadoLibreServer() as server:
+            with MercadoLibreClient(base_url=server.url, cache=ResponseCache(),
+                                    rate_limiter=RateLimiter(0, 0)) as client:
+                client.search_products('iPhone 15')
+                client.search_products('iphone 15')
+                self.assertEqual(server.state.requests, 2)
+                
+                client.search_products('iPhone 15', cache_ttl=30)
+                client.search_products('IPHONE  15', cache_ttl=30)
+                client.search_products('iphone 15', sort='relevance', cache_ttl=30)
+                self.assertEqual(server.state.requests, 3)
+
+class TestLocalSearch(unittest.TestCase):
+    """Pruebas para las variantes de búsqueda respondidas desde el conjunto guardado"""
+    
+    def test_variants_answered_locally(self):
+        """Prueba que orden, condición, envío y precio no vuelven a recorrer la API"""
+        with MockMercadoLibreServer(total_results=120) as server:
+            with MercadoLibreClient(base_url=server.url, rate_limiter=RateLimiter(0, 0)) as client:
+                store = ResultSetStore(':memory:')
+                searcher = LocalSearch(client, store=store, max_age=60, max_items=500)
+                
+                base = searcher.search('Laptop', max_results=50)
+                self.assertEqual((len(base.products), server.state.requests), (50, 1))
+                self.assertTrue(base.from_network)
+                
+                # Con un prefijo de 50 resultados no se puede ordenar por precio: la variante va a la API
+                self.assertIsNone(searcher.search('laptop', max_results=50, sort='price_asc'))
+                self.assertEqual(server.state.requests, 1)
+                
+                # Solo si se pide, se descarga el conjunto completo
+                cheapest = searcher.search('laptop', max_results=50, sort='price_asc', build=True)
+                self.assertEqual(server.state.requests, 4)
+                self.assertEqual(cheapest.total, 120)
+                prices = [p.price for p in cheapest.products]
+                self.assertEqual(prices, sorted(prices))
+                
+                before = server.state.requests
+                used = searcher.search('LAPTOP ', max_results=200, condition='used', sort='price_desc',
+                                       free_shipping=True, min_price=1000, max_price=30000)
+                self.assertFalse(used.from_network)
+                self.assertTrue(all(p.condition == 'used' and p.free_shipping and 1000 <= p.price <= 30000
+                                    for p in used.products))
+                self.assertEqual([p.price for p in used.products], sorted((p.price for p in used.products), reverse=True))
+                
+                # Otro proceso con el mismo almacén también responde sin la API
+                other = LocalSearch(client, store=store, max_age=60)
+                self.assertEqual(len(other.search('laptop', max_results=200).products), 120)
+                self.assertEqual(server.state.requests, before)
+                
+                # Un conjunto más viejo que max_age se vuelve a pedir
+                stale = LocalSearch(client, store=store, max_age=-1).search('laptop', max_results=50)
+                self.assertTrue(stale.from_network)
+                self.assertEqual(server.state.requests, before + 1)
+                
+                # Búsqueda con más de max_items resultados: una sola página para conocer el total, después nada
+                small = LocalSearch(client, store=store, max_age=60, max_items=100)
+                self.assertIsNone(small.search('tablet', sort='price_asc', build=True))
+                self.assertIsNone(small.search('tablet', sort='price_desc', build=True))
+                self.assertEqual(server.state.requests, before + 2)
+                store.close()
+
+    def test_fetch_uses_parse_pool_and_local_offsets(self):
+        """Prueba que las páginas usan el ParsePool del cliente y que el offset no depende de paging"""
+        offsets = []
+        decoded = []
+
+        def search_products(query, limit, offset, category, decoder):
+            offsets.append(offset)
+            results = [{'id': f'MLM{i}', 'title': 'P', 'price': float(i)} for i in range(offset, min(offset + limit, 120))]
+            # Sin 'offset' en paging, como algunas respuestas de la API
+            return decoder(json.dumps({'results': results, 'paging': {'total': 120}}).encode('utf-8'))
+
+        def decode(body):
+            decoded.append(len(body))
+            return SearchPage.decode(body)
+
+        client = Mock(site_id='MLM', search_products=search_products, parse_pool=Mock(decode=decode))
+        searcher = LocalSearch(client, store=ResultSetStore(':memory:'), max_age=60, max_items=500)
+        result = searcher.search('laptop', max_results=200)
+
+        self.assertEqual(offsets, [0, 50, 100])
+        self.assertEqual(len(decoded), 3)
+        self.assertEqual(result.total, 120)
+        self.assertEqual(len(result.products), 120)
+        searcher.store.close()
+
+class FakeItemsClient:
+    """Cliente mínimo con multi-get sobre un diccionario de productos que la prueba modifica"""
+    
+    def __init__(self, items):
+        self.items = items
+        self.calls = []
+    
+    def get_items(self, item_ids, attributes=None):
+        self.calls.append(list(item_ids))
+        return [{'code': 200, 'body': dict(self.items[i], id=i)} if i in self.items
+                else {'code': 404, 'body': {'id': i}} for i in item_ids]
+    
+    def map(self, func, args, concurrency=4, ordered=True):
+        return concurrent_map(func, args, concurrency=concurrency, ordered=ordered)
+
+class TestWatchEngine(unittest.TestCase):
+    """Pruebas para el monitoreo adaptativo"""
+    
+    def test_events_and_adaptive_schedule(self):
+        """Prueba los eventos de cambio, el multi-get y la agenda según volatilidad"""
+        items = {f'MLM{i}': {'price': 100.0, 'available_quantity': 10, 'sold_quantity': 0} for i in range(45)}
+        client = FakeItemsClient(items)
+        store = WatchStore(':memory:')
+        received = []
+        engine = WatchEngine(client, store=store, min_interval=10, max_interval=1000, on_event=received.append)
+        self.assertEqual(engine.add(list(items) + ['MLM0']), 45)
+        
+        self.assertEqual(engine.poll_once(), [])
+        self.assertEqual(sorted(len(batch) for batch in client.calls), [5, 20, 20])
+        self.assertEqual(engine.poll_once(), [])
+        
+        # Se fuerza que todo esté vencido y cambian dos productos; uno se borra
+        store._conn.execute("UPDATE watched SET next_poll = 0, last_polled = last_polled - 100")
+        items['MLM1']['price'] = 90.0
+        items['MLM2']['sold_quantity'] = 50
+        del items['MLM3']
+        events = engine.poll_once()
+        
+        self.assertEqual(events, received)
+        self.assertEqual({(e.item_id, e.field, e.new) for e in events},
+                         {('MLM1', 'price', 90.0), ('MLM2', 'sold_quantity', 50), ('MLM3', 'status', 'removed')})
+        
+        intervals = {row['item_id']: row['interval'] for row in store._conn.execute("SELECT * FROM watched")}
+        self.assertEqual(intervals['MLM1'], 10)      # cambio de precio: intervalo a la mitad, acotado
+        self.assertEqual(intervals['MLM2'], 10)      # se vende rápido: ~1 venta entre revisiones
+        self.assertEqual(intervals['MLM3'], 1000)    # borrado: intervalo máximo
+        self.assertEqual(intervals['MLM4'], 15)      # sin cambios: intervalo creciente
+        self.assertEqual(store.summary()['removed'], 1)
+        store.close()
+
+class TestCacheWarmer(unittest.TestCase):
+    """Pruebas para la precarga del cache (meli cache warm)"""
+    
+    def test_warm_spec_then_lookups_skip_network(self):
+        """Prueba que tras la precarga categorías, vendedores y productos salen del cache"""
+        with MockMercadoLibreServer() as server, tempfile.TemporaryDirectory() as tmpdir:
+            exports = os.path.join(tmpdir, 'exports')
+            os.makedirs(exports)
+            with open(os.path.join(exports, 'iphone.json'), 'w', encoding='utf-8') as f:
+                json.dump([{'id': f'MLM{i}', 'vendedor_id': 5000 + i % 25} for i in range(60)], f)
+            watchlist = os.path.join(tmpdir, 'watchlist.txt')
+            with open(watchlist, 'w', encoding='utf-8') as f:
+                f.write('# seguimiento\n' + '\n'.join(f'MLM{900 + i}' for i in range(30)))
+            
+            cache = TieredCache(os.path.join(tmpdir, 'responses.db'), ttl=60)
+            limiter = RateLimiter(0, 0)
+            progress = []
+            warmer = CacheWarmer(
+                cache, rate_limiter=limiter, concurrency=4,
+                client_factory=lambda site: MercadoLibreClient(site_id=site, base_url=server.url,
+                                                               rate_limiter=limiter, cache=cache),
+                on_progress=lambda kind, done, total: progress.append((kind, done, total))
+            )
+            spec = WarmSpec(sites=['MLM'], exports_dir=exports, watchlist=watchlist)
+            report = warmer.warm(spec)
+            
+            self.assertEqual(report['sellers'].targets, 25)
+            self.assertEqual(report['items'].targets, 30)
+            for stats in report.values():
+                self.assertEqual(stats.coverage, 1.0)
+                self.assertEqual(stats.failed, 0)
+            self.assertEqual(progress[-1], ('items', 30, 30))
+            
+            # Multi-get en lotes de 20: 2 peticiones por 25 vendedores y 2 por 30 productos
+            category_requests = report['categories:MLM'].targets + 1
+            self.assertEqual(server.state.requests, category_requests + 4)
+            
+            requests_before = server.state.requests
+            with MercadoLibreClient(base_url=server.url, rate_limiter=limiter, cache=cache) as client:
+                self.assertEqual(client.get_product_details('MLM905')['id'], 'MLM905')
+                self.assertEqual(str(client.get_seller_info('5003')['id']), '5003')
+                self.assertEqual(client.get_category_details('MLM1000')['id'], 'MLM1000')
+            self.assertEqual(server.state.requests, requests_before)
+            
+            again = warmer.warm(spec)
+            self.assertEqual(sum(stats.fetched for stats in again.values()), 0)
+            warmer.close()
+            cache.close()
+    
+    def test_new_clients_read_the_warmed_cache(self):
+        """Prueba que un cliente recién creado con create_client usa lo precargado sin pedirlo a la red"""
+        with MockMercadoLibreServer() as server, tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'responses.db')
+            watchlist = os.path.join(tmpdir, 'watchlist.txt')
+            with open(watchlist, 'w', encoding='utf-8') as f:
+                f.write('MLM905\n')
+            
+            # Como `meli cache warm`: otro proceso llena el archivo del cache
+            cache = TieredCache(path, ttl=60)
+            limiter = RateLimiter(0, 0)
+            warmer = CacheWarmer(cache, rate_limiter=limiter, client_factory=lambda site: MercadoLibreClient(
+                site_id=site, base_url=server.url, rate_limiter=limiter, cache=cache))
+            warmer.warm(WarmSpec(watchlist=watchlist))
+            warmer.close()
+            cache.close()
+            
+            requests_before = server.state.requests
+            with patch.object(Config, 'CACHE_ENABLED', True), patch.object(Config, 'CACHE_DB', path), \
+                    patch('cache._shared_cache', None), patch.dict(os.environ, {'MELI_API_BASE_URL': server.url}):
+                with create_client() as client:
+                    self.assertEqual(client.get_product_details('MLM905')['id'], 'MLM905')
+                    client.cache.close()
+            self.assertEqual(server.state.requests, requests_before)
+
+class TestJobQueue(unittest.TestCase):
+    """Pruebas para la cola de trabajos de crawl"""
+    
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.queue = JobQueue(os.path.join(self.tmpdir.name, 'jobs.db'))
+    
+    def tearDown(self):
+        self.queue.close()
+        self.tmpdir.cleanup()
+    
+    def test_claim_order_and_deadlines(self):
+        """Prueba el orden por prioridad y fecha límite, y el descarte de trabajos vencidos"""
+        now = time.time()
+        low = self.queue.submit('search', {'query': 'a'}, priority=0)
+        late = self.queue.submit('search', {'query': 'b'}, priority=5, deadline=now + 600)
+        soon = self.queue.submit('search', {'query': 'c'}, priority=5, deadline=now + 60)
+        expired = self.queue.submit('search', {'query': 'd'}, priority=9, deadline=now - 1)
+        self.queue.submit('search', {'query': 'e'}, priority=9, run_at=now + 3600)
+        
+        claimed = [self.queue.claim('w1').id for _ in range(3)]
+        self.assertEqual(claimed, [soon, late, low])
+        self.assertIsNone(self.queue.claim('w1'))
+        self.assertEqual(self.queue.get(expired).state, 'expired')
+    
+    def test_retry_and_crash_recovery(self):
+        """Prueba los reintentos con espera y que un trabajo de un worker caído vuelve a la cola"""
+        job_id = self.queue.submit('search', {'query': 'a'}, max_attempts=2)
+        
+        job = self.queue.claim('w1')
+        self.queue.fail(job.id, 'w1', 'timeout', retry_delay=0)
+        self.assertEqual(self.queue.get(job_id).state, 'queued')
+        
+        # El worker muere con el trabajo tomado: su lease vence y otro lo toma
+        job = self.queue.claim('w1', lease=-1)
+        self.assertEqual(job.attempts, 2)
+        self.assertIsNone(self.queue.claim('w2'))
+        self.assertEqual(self.queue.get(job_id).state, 'failed')
+        
+        retry_id = self.queue.submit('search', {'query': 'b'}, max_attempts=3)
+        self.queue.claim('w1', lease=-1)
+        recovered = self.queue.claim('w2')
+        self.assertEqual(recovered.id, retry_id)
+        self.assertEqual(recovered.lease_owner, 'w2')
+        # El worker original ya no puede completar un trabajo que perdió
+        self.queue.complete(retry_id, 'w1', {'items': 1})
+        self.assertEqual(self.queue.get(retry_id).state, 'running')
+        self.queue.complete(retry_id, 'w2', {'items': 2})
+        self.assertEqual(self.queue.get(retry_id).result, {'items': 2})
+    
+    def test_recurring_deadline_and_crash(self):
+        """Prueba la fecha límite por periodo y que un trabajo recurrente sobrevive a un worker caído"""
+        now = time.time()
+        # Perdió la ventana de 60 s de este periodo: pasa al siguiente en lugar de quedarse en la cola
+        missed = self.queue.submit('search', {'query': 'a'}, every=3600, run_at=now - 100, deadline=now - 40)
+        self.assertIsNone(self.queue.claim('w1'))
+        job = self.queue.get(missed)
+        self.assertEqual(job.state, 'queued')
+        self.assertAlmostEqual(job.run_at, now + 3500, delta=1)
+        self.assertAlmostEqual(job.deadline, job.run_at + 60, delta=1)
+        
+        # Al terminar, la fecha límite se recalcula para el siguiente periodo
+        on_time = self.queue.submit('search', {'query': 'b'}, every=600, deadline=now + 30)
+        self.queue.complete(self.queue.claim('w1').id, 'w1', {})
+        job = self.queue.get(on_time)
+        self.assertAlmostEqual(job.deadline - job.run_at, 30, delta=1)
+        self.assertGreater(job.run_at, now + 590)
+        
+        # El worker cae en el último intento: el trabajo espera su siguiente periodo, no queda fallido
+        crashed = self.queue.submit('search', {'query': 'c'}, every=900, max_attempts=1)
+        self.assertEqual(self.queue.claim('w1', lease=-1).id, crashed)
+        self.assertIsNone(self.queue.claim('w2'))
+        job = self.queue.get(crashed)
+        self.assertEqual((job.state, job.attempts), ('queued', 0))
+        self.assertGreater(job.run_at, now + 890)
+    
+    def test_worker_runs_recurring_search_with_budget_share(self):
+        """Prueba que un worker ejecuta una búsqueda recurrente y la vuelve a agendar"""
+        with MockMercadoLibreServer(total_results=120) as server:
+            export = os.path.join(self.tmpdir.name, 'iphone.jsonl')
+            job_id = self.queue.submit('search', {'query': 'iphone', 'max_results': 100, 'export': export},
+                                       budget_share=0.5, every=3600, name='iphone-diario')
+            # Con el mismo nombre se actualiza en lugar de duplicarse
+            self.assertEqual(self.queue.submit('search', {'query': 'iphone', 'max_results': 100, 'export': export},
+                                               budget_share=0.5, every=3600, name='iphone-diario'), job_id)
+            
+            limiters = []
+            
+            def client_factory(site_id, limiter):
+                limiters.append(limiter)
+                return MercadoLibreClient(site_id=site_id, base_url=server.url, rate_limiter=limiter)
+            
+            worker = JobWorker(self.queue, rate_limiter=RateLimiter(0, 0), client_factory=client_factory)
+            self.assertEqual(worker.run_once().id, job_id)
+            self.assertIsNone(worker.run_once())
+            
+            job = self.queue.get(job_id)
+            self.assertEqual(job.state, 'queued')
+            self.assertGreater(job.run_at, time.time() + 3500)
+            self.assertEqual(job.result['items'], 100)
+            self.assertEqual(len(list(read_json_lines(export))), 100)
+            self.assertEqual(limiters[0].share, 0.5)
+            self.assertEqual(self.queue.counts(), {'queued': 1})
+
+    def test_search_job_retries_and_resumes_after_page_error(self):
+        """Prueba que un error en una página reencola el trabajo y el reintento continúa donde quedó"""
+        with MockMercadoLibreServer(total_results=150) as server:
+            export = os.path.join(self.tmpdir.name, 'iphone.jsonl')
+            job_id = self.queue.submit('search', {'query': 'iphone', 'max_results': 150, 'export': export})
+            offsets = []
+
+            def client_factory(site_id, limiter):
+                client = MercadoLibreClient(site_id=site_id, base_url=server.url, rate_limiter=limiter)
+                search_products = client.search_products
+
+                def flaky_search(**kwargs):
+                    offsets.append(kwargs['offset'])
+                    if offsets.count(50) == 1 and kwargs['offset'] == 50:
+                        raise requests.exceptions.HTTPError("503 Server Error")
+                    return search_products(**kwargs)
+
+                client.search_products = flaky_search
+                return client
+
+            worker = JobWorker(self.queue, rate_limiter=RateLimiter(0, 0), client_factory=client_factory)
+            worker.run_once()
+            job = self.queue.get(job_id)
+            self.assertEqual(job.state, 'queued')
+            self.assertIn('incompleta', job.error)
+
+            # Adelanta el reintento en lugar de esperar la espera exponencial
+            with self.queue._transaction() as conn:
+                conn.execute("UPDATE jobs SET run_at = 0 WHERE id = ?", (job_id,))
+            self.assertEqual(worker.run_once().id, job_id)
+
+            job = self.queue.get(job_id)
+            self.assertEqual(job.state, 'done')
+            self.assertEqual(offsets, [0, 50, 50, 100])
+            self.assertEqual(job.result['items'], 150)
+            self.assertEqual(len({row['id'] for row in read_json_lines(export)}), 150)
+            self.assertFalse(os.path.exists(f"{export}.checkpoint.json"))
+
+class TestCrawlCoordinator(unittest.TestCase):
+    """Pruebas para el crawl repartido entre nodos"""
+    
+    def test_plan_units(self):
+        """Prueba la división en unidades por búsqueda, sitio, rango de offsets y categoría"""
+        units = plan_units(['iPhone 15', 'iphone  15', 'laptop'], ['MLM', 'mla'], max_results=450, unit_size=220,
+                           categories=['MLB1055'])
+        self.assertEqual(len(units), 5 * 3)
+        self.assertEqual([(u.offset, u.end) for u in units[:3]], [(0, 200), (200, 400), (400, 450)])
+        self.assertEqual({u.site for u in units}, {'MLM', 'MLA', 'MLB'})
+        self.assertEqual(units[-1].category, 'MLB1055')
+        self.assertEqual(units[-1].query, '')
+    
+    def test_workers_survive_crash_and_export_dedupes(self):
+        """Prueba que varios workers completan el crawl, recuperan la unidad de un nodo caído y no duplican"""
+        with MockMercadoLibreServer(total_results=300) as server, tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'shared', 'crawl.db')
+            coordinator = Coordinator(path)
+            crawl_id = coordinator.submit(plan_units(['iphone', 'laptop'], ['MLM', 'MLA'], max_results=400,
+                                                     unit_size=100), crawl_id='prueba')
+            with self.assertRaises(ValueError):
+                coordinator.submit([], crawl_id='prueba')
+            
+            def client_factory(site_id, limiter):
+                return MercadoLibreClient(site_id=site_id, base_url=server.url, rate_limiter=limiter)
+            
+            # Un nodo toma una unidad, guarda sus productos y cae antes de completarla
+            crashed = CrawlWorker(Coordinator(path), rate_limiter=RateLimiter(0, 0), client_factory=client_factory,
+                                  worker_id='nodo-caido')
+            unit = crashed.queue.claim(crashed.worker_id, lease=-1)
+            with client_factory(unit.payload['site'], RateLimiter(0, 0)) as client:
+                self.assertEqual(crashed.run_unit(client, unit.payload)['new'], 100)
+            crashed.coordinator.close()
+            
+            # Dos nodos más, cada uno con su propia conexión a la base compartida
+            nodes = [CrawlWorker(Coordinator(path), rate_limiter=RateLimiter(0, 0), client_factory=client_factory,
+                                 worker_id=f'nodo-{i}', lease=30) for i in range(2)]
+            threads = [threading.Thread(target=node.drain, kwargs={'idle': 0.05}) for node in nodes]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(timeout=30)
+            
+            progress = coordinator.progress(crawl_id)
+            self.assertTrue(progress['finished'])
+            self.assertEqual(progress['states'], {'done': 16})
+            # total_results=300: las unidades de 300 a 400 no traen productos
+            self.assertEqual(progress['items'], 4 * 300)
+            self.assertEqual(sum(node.completed for node in nodes), 16)
+            # La unidad del nodo caído se repitió sin agregar duplicados
+            repeated = coordinator.queue.get(unit.id)
+            self.assertEqual((repeated.attempts, repeated.result['new']), (2, 0))
+            
+            export = os.path.join(tmpdir, 'prueba.jsonl')
+            self.assertEqual(coordinator.export(crawl_id, export), 1200)
+            ids = [row['id'] for row in read_json_lines(export)]
+            self.assertEqual(len(set(ids)), 1200)
+            self.assertTrue(ids[0].startswith('MLA'))
+            
+            for node in nodes:
+                node.coordinator.close()
+            coordinator.close()
+
 def run_integration_tests():
     """Ejecuta pruebas de integración"""
     console.print("\n🧪 [bold blue]Ejecutando pruebas de integración[/bold blue]")
@@ -198,6 +1572,31 @@ def main():
     suite.addTests(loader.loadTestsFromTestCase(TestPublicClient))
     suite.addTests(loader.loadTestsFromTestCase(TestConfig))
     suite.addTests(loader.loadTestsFromTestCase(TestSimpleProduct))
+    suite.addTests(loader.loadTestsFromTestCase(TestGateway))
+    suite.addTests(loader.loadTestsFromTestCase(TestMultiSiteSearch))
+    suite.addTests(loader.loadTestsFromTestCase(TestPriceHistoryStore))
+    suite.addTests(loader.loadTestsFromTestCase(TestIncrementalSync))
+    suite.addTests(loader.loadTestsFromTestCase(TestCrawlCheckpoint))
+    suite.addTests(loader.loadTestsFromTestCase(TestMockServer))
+    suite.addTests(loader.loadTestsFromTestCase(TestCassetteTransport))
+    suite.addTests(loader.loadTestsFromTestCase(TestMetrics))
+    suite.addTests(loader.loadTestsFromTestCase(TestTracing))
+    suite.addTests(loader.loadTestsFromTestCase(TestFastJson))
+    suite.addTests(loader.loadTestsFromTestCase(TestHttpxTransport))
+    suite.addTests(loader.loadTestsFromTestCase(TestSessionRegistry))
+    suite.addTests(loader.loadTestsFromTestCase(TestCategoryTree))
+    suite.addTests(loader.loadTestsFromTestCase(TestSellerRepository))
+    suite.addTests(loader.loadTestsFromTestCase(TestParsePool))
+    suite.addTests(loader.loadTestsFromTestCase(TestAuthenticatedClient))
+    suite.addTests(loader.loadTestsFromTestCase(TestClientMap))
+    suite.addTests(loader.loadTestsFromTestCase(TestCachePolicies))
+    suite.addTests(loader.loadTestsFromTestCase(TestTieredCache))
+    suite.addTests(loader.loadTestsFromTestCase(TestSearchQuery))
+    suite.addTests(loader.loadTestsFromTestCase(TestLocalSearch))
+    suite.addTests(loader.loadTestsFromTestCase(TestWatchEngine))
+    suite.addTests(loader.loadTestsFromTestCase(TestCacheWarmer))
+    suite.addTests(loader.loadTestsFromTestCase(TestJobQueue))
+    suite.addTests(loader.loadTestsFromTestCase(TestCrawlCoordinator))
     
     # Ejecutar pruebas unitarias
     runner = unittest.TextTestRunner(verbosity=2)
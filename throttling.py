@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Control de concurrencia para peticiones a la API: rate limiting (y partes de un
+presupuesto), single-flight y map concurrente
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, Optional
+
+
+class RateLimiter:
+    """Rate limiter seguro para hilos (intervalo mínimo + ventana por minuto)"""
+
+    def __init__(self, requests_per_minute: int = 60, delay_between_requests: float = 1.0):
+        """
+        Inicializa el rate limiter
+
+        Args:
+            requests_per_minute: Máximo de peticiones en cualquier ventana de 60 segundos
+            delay_between_requests: Segundos mínimos entre dos peticiones consecutivas
+        """
+        self.requests_per_minute = requests_per_minute
+        self.delay_between_requests = delay_between_requests
+        self.last_request_time = 0.0
+        self._window = deque()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Reserva el siguiente turno disponible y regresa cuándo empieza"""
+        with self._lock:
+            now = time.time()
+            slot = max(now, self.last_request_time + self.delay_between_requests)
+
+            # Ventana deslizante de un minuto
+            while self._window and self._window[0] <= slot - 60:
+                self._window.popleft()
+
+            if self.requests_per_minute > 0 and len(self._window) >= self.requests_per_minute:
+                slot = max(slot, self._window[0] + 60)
+                self._window.popleft()
+
+            self._window.append(slot)
+            self.last_request_time = slot
+            return slot
+
+    def acquire(self):
+        """Bloquea hasta que se pueda hacer la siguiente petición"""
+        wait = self._reserve() - time.time()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Versión asíncrona de acquire: espera sin bloquear el event loop"""
+        wait = self._reserve() - time.time()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class ShareRateLimiter(RateLimiter):
+    """
+    Fracción del presupuesto de otro RateLimiter
+
+    Cada petición espera su turno en los dos: el propio (share del presupuesto)
+    y el compartido, así que un trabajo no pasa de su parte y el total no pasa
+    del presupuesto global.
+    """
+
+    def __init__(self, parent: RateLimiter, share: float):
+        """
+        Crea el rate limiter
+
+        Args:
+            parent: Rate limiter con el presupuesto global
+            share: Fracción del presupuesto (0 < share <= 1)
+        """
+        share = min(max(share, 0.01), 1.0)
+        requests_per_minute = max(1, int(parent.requests_per_minute * share)) if parent.requests_per_minute > 0 else 0
+        super().__init__(requests_per_minute=requests_per_minute,
+                         delay_between_requests=parent.delay_between_requests / share)
+        self.parent = parent
+        self.share = share
+
+    def acquire(self):
+        """Bloquea hasta tener turno en la parte propia y en el presupuesto global"""
+        super().acquire()
+        self.parent.acquire()
+
+    async def acquire_async(self):
+        """Versión asíncrona de acquire"""
+        await super().acquire_async()
+        await self.parent.acquire_async()
+
+
+class SingleFlight:
+    """Agrupa peticiones idénticas concurrentes en una sola llamada"""
+
+    class _Call:
+        def __init__(self):
+            self.event = threading.Event()
+            self.result: Any = None
+            self.error: Optional[BaseException] = None
+
+    def __init__(self):
+        self._calls: Dict[str, 'SingleFlight._Call'] = {}
+        self._lock = threading.Lock()
+        self.shared = 0
+
+    def do(self, key: str, func: Callable[[], Any]) -> Any:
+        """
+        Ejecuta func una sola vez por llave aunque varios hilos la pidan a la vez
+
+        Args:
+            key: Llave que identifica la petición
+            func: Función que realiza la petición
+
+        Returns:
+            Resultado de func (compartido entre los hilos en espera)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._Call()
+                self._calls[key] = call
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+
+@dataclass
+class MapResult:
+    """Resultado de una llamada de concurrent_map"""
+    index: int
+    arg: Any
+    value: Any = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def concurrent_map(func: Callable[..., Any], args: Iterable[Any], concurrency: int = 4,
+                   ordered: bool = True) -> Iterator[MapResult]:
+    """
+    Aplica func a cada argumento con un número acotado de hilos
+
+    Los argumentos se consumen a medida que se liberan hilos, así que args
+    puede ser un generador largo. Las tuplas se pasan como varios argumentos
+    posicionales. Un error en una llamada no detiene a las demás: queda en
+    MapResult.error.
+
+    Args:
+        func: Función a aplicar
+        args: Argumentos (uno por llamada)
+        concurrency: Llamadas simultáneas como máximo (al menos 1; si no, ValueError)
+        ordered: True para regresar en el orden de args; False para regresar en orden de terminación
+
+    Returns:
+        Iterador de MapResult
+    """
+    if concurrency < 1:
+        raise ValueError(f"concurrency debe ser al menos 1 (se recibió {concurrency})")
+    return _concurrent_map(func, args, concurrency, ordered)
+
+
+def _concurrent_map(func: Callable[..., Any], args: Iterable[Any], concurrency: int,
+                    ordered: bool) -> Iterator[MapResult]:
+    def call(index: int, arg: Any) -> MapResult:
+        try:
+            value = func(*arg) if isinstance(arg, tuple) else func(arg)
+            return MapResult(index, arg, value)
+        except Exception as e:
+            return MapResult(index, arg, error=e)
+
+    items = enumerate(args)
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    pending: Deque[Future] = deque()
+
+    def submit_next() -> bool:
+        item = next(items, None)
+        if item is None:
+            return False
+        pending.append(executor.submit(call, *item))
+        return True
+
+    try:
+        while len(pending) < concurrency and submit_next():
+            pass
+
+        while pending:
+            if ordered:
+                done = [pending.popleft()]
+            else:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                done = [future for future in pending if future in finished]
+                for future in done:
+                    pending.remove(future)
+
+            for future in done:
+                submit_next()
+                yield future.result()
+    finally:
+        # Si el consumidor deja de iterar, no se inician las llamadas pendientes
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
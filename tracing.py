@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Spans de tracing para las etapas del pipeline (petición, parseo, modelos, exportación, render)
+
+El código instrumentado abre spans con `span('request')`, etc. Sin hooks
+registrados un span no hace nada más que comprobar una lista vacía. Los hooks
+reciben cada span al abrirse y al cerrarse: SpanProfiler acumula tiempos por
+etapa (usado por `cli.py search --profile`) y OpenTelemetryHook reenvía los
+spans a OpenTelemetry si el paquete está instalado.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+# Etapas instrumentadas, en el orden en que se muestran en el perfil
+STAGES = ('rate-limit', 'request', 'parse', 'model-build', 'history', 'dataframe', 'export', 'render')
+
+
+@dataclass
+class Span:
+    """Un intervalo de tiempo con nombre dentro del pipeline"""
+    name: str
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    parent: Optional['Span'] = None
+    start: float = 0.0
+    end: float = 0.0
+    children_time: float = 0.0
+    error: Optional[BaseException] = None
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+    @property
+    def self_time(self) -> float:
+        """Duración sin contar los spans hijos"""
+        return self.duration - self.children_time
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+
+class SpanHook:
+    """Interfaz de los receptores de spans"""
+
+    def on_start(self, span: Span):
+        pass
+
+    def on_end(self, span: Span):
+        pass
+
+
+class Tracer:
+    """Crea spans anidados por hilo y los entrega a los hooks registrados"""
+
+    def __init__(self):
+        self.hooks: List[SpanHook] = []
+        self._local = threading.local()
+
+    def add_hook(self, hook: SpanHook):
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook: SpanHook):
+        if hook in self.hooks:
+            self.hooks.remove(hook)
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Optional[Span]]:
+        """
+        Abre un span durante el bloque `with`
+
+        Args:
+            name: Nombre de la etapa (ej. 'request', 'export')
+            **attributes: Atributos del span (ej. endpoint, formato)
+        """
+        if not self.hooks:
+            yield None
+            return
+
+        parent = getattr(self._local, 'current', None)
+        current = Span(name, attributes, parent, start=time.perf_counter())
+        self._local.current = current
+        for hook in self.hooks:
+            hook.on_start(current)
+
+        try:
+            yield current
+        except BaseException as e:
+            current.error = e
+            raise
+        finally:
+            current.end = time.perf_counter()
+            self._local.current = parent
+            if parent is not None:
+                parent.children_time += current.duration
+            for hook in self.hooks:
+                hook.on_end(current)
+
+
+class SpanProfiler(SpanHook):
+    """Acumula el tiempo propio y el número de spans por etapa"""
+
+    def __init__(self):
+        self.stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self.started_at = time.perf_counter()
+
+    def on_end(self, span: Span):
+        with self._lock:
+            stage = self.stats.setdefault(span.name, {'count': 0, 'total': 0.0, 'self': 0.0})
+            stage['count'] += 1
+            stage['total'] += span.duration
+            stage['self'] += span.self_time
+
+    def breakdown(self) -> List[Dict[str, Any]]:
+        """
+        Tiempo propio por etapa, en el orden de STAGES
+
+        El tiempo de pared no cubierto por ningún span se reporta como 'other'.
+        Con varios hilos las etapas pueden sumar más que el tiempo de pared.
+        """
+        wall = time.perf_counter() - self.started_at
+        order = {name: i for i, name in enumerate(STAGES)}
+
+        with self._lock:
+            rows = [
+                {'stage': name, 'count': int(s['count']), 'seconds': s['self'], 'total': s['total']}
+                for name, s in sorted(self.stats.items(), key=lambda item: (order.get(item[0], len(order)), item[0]))
+            ]
+
+        covered = sum(row['seconds'] for row in rows)
+        rows.append({'stage': 'other', 'count': 0, 'seconds': max(0.0, wall - covered), 'total': 0.0})
+
+        for row in rows:
+            row['percent'] = row['seconds'] / wall * 100 if wall else 0.0
+        return rows
+
+
+class OpenTelemetryHook(SpanHook):
+    """Reenvía los spans a OpenTelemetry (requiere el paquete opentelemetry-api)"""
+
+    def __init__(self, tracer_name: str = 'mercadolibre'):
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            raise ImportError("OpenTelemetryHook requiere opentelemetry-api: pip install opentelemetry-api")
+
+        self._trace = trace
+        self._tracer = trace.get_tracer(tracer_name)
+        self._spans: Dict[int, Any] = {}
+
+    def on_start(self, span: Span):
+        context = None
+        if span.parent is not None and id(span.parent) in self._spans:
+            context = self._trace.set_span_in_context(self._spans[id(span.parent)])
+        self._spans[id(span)] = self._tracer.start_span(span.name, context=context, attributes=span.attributes)
+
+    def on_end(self, span: Span):
+        otel_span = self._spans.pop(id(span), None)
+        if otel_span is None:
+            return
+        for key, value in span.attributes.items():
+            otel_span.set_attribute(key, value)
+        if span.error is not None:
+            otel_span.record_exception(span.error)
+        otel_span.end()
+
+
+# Tracer global usado por el código instrumentado
+tracer = Tracer()
+span = tracer.span
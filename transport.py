@@ -0,0 +1,655 @@
+#!/usr/bin/env python3
+"""
+Transportes HTTP intercambiables para los clientes de MercadoLibre
+
+Los clientes hacen sus peticiones a través de un transporte en lugar de usar
+requests.Session directamente. Además del transporte normal hay uno que graba
+las respuestas en un cassette (archivo SQLite comprimido e indexado) y otro que
+las reproduce sin tocar la red, a máxima velocidad o con los tiempos originales.
+
+También hay transportes sobre httpx (síncrono y asíncrono) que usan HTTP/2
+para multiplexar muchas peticiones concurrentes sobre pocas conexiones.
+
+Por defecto todos los clientes del proceso comparten el pool de conexiones de
+SessionRegistry, así que crear y cerrar clientes de corta vida no vuelve a
+pagar el handshake TCP/TLS.
+
+Uso desde variables de entorno (sin cambiar código):
+    MELI_CASSETTE=ci.cassette MELI_CASSETTE_MODE=record python cli.py search "iPhone"
+    MELI_CASSETTE=ci.cassette MELI_CASSETTE_MODE=replay python cli.py search "iPhone"
+    MELI_HTTP_TRANSPORT=httpx python cli.py search "iPhone"
+"""
+
+import atexit
+from abc import ABC, abstractmethod
+import hashlib
+import json
+import logging
+import os
+import socket
+import sqlite3
+import ssl
+import threading
+import time
+import zlib
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError
+
+from config import Config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS interactions (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL,
+    method TEXT NOT NULL,
+    url TEXT NOT NULL,
+    params TEXT,
+    status INTEGER NOT NULL,
+    headers BLOB,
+    body BLOB,
+    elapsed REAL,
+    recorded_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_interactions_key ON interactions (key, seq);
+"""
+
+# Rutas que nunca se graban (las respuestas de OAuth contienen tokens)
+UNRECORDED_PATHS = ('/oauth/',)
+
+# Encabezados de respuesta que no vale la pena guardar
+SKIPPED_HEADERS = {'set-cookie', 'date', 'connection', 'keep-alive', 'transfer-encoding', 'content-encoding'}
+
+
+class CassetteMissError(requests.exceptions.ConnectionError):
+    """La petición no está grabada en el cassette"""
+
+
+def request_key(method: str, url: str, params: Optional[Dict] = None, body: Any = None) -> str:
+    """Llave estable de una petición (método, URL, parámetros ordenados y cuerpo)"""
+    canonical = json.dumps(
+        [method.upper(), url, sorted((str(k), str(v)) for k, v in (params or {}).items()), body],
+        sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+class Transport(ABC):
+    """Interfaz de transporte: hace una petición HTTP y regresa un requests.Response"""
+
+    @abstractmethod
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Hace una petición HTTP"""
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def close(self):
+        pass
+
+
+class SessionTransport(Transport):
+    """Transporte normal sobre una requests.Session"""
+
+    def __init__(self, session: requests.Session):
+        self.session = session
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        return self.session.request(method, url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+class DnsCache:
+    """
+    Cache con TTL de resoluciones DNS para las conexiones de este paquete
+
+    No reemplaza socket.getaddrinfo: solo lo consultan las conexiones del pool
+    compartido (ver _CachedDnsConnection), así que el resto del proceso resuelve
+    como siempre. Las entradas vencidas se eliminan al guardar una nueva.
+    """
+
+    def __init__(self, ttl: float = 300, resolver: Callable[..., Any] = socket.getaddrinfo):
+        """
+        Args:
+            ttl: Segundos que se conserva una resolución
+            resolver: Función con la firma de socket.getaddrinfo
+        """
+        self.ttl = ttl
+        self.resolver = resolver
+        self._entries: Dict[Tuple, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def getaddrinfo(self, *args, **kwargs):
+        """Igual que socket.getaddrinfo, pero con cache"""
+        key = (args, tuple(sorted(kwargs.items())))
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                return entry[1]
+
+        result = self.resolver(*args, **kwargs)
+        with self._lock:
+            self._entries = {k: v for k, v in self._entries.items() if v[0] > now}
+            self._entries[key] = (now + self.ttl, result)
+        return result
+
+    def addresses(self, host: str, port: int) -> List[str]:
+        """Direcciones IP de un host en el orden del resolvedor (vacío si no se pudo resolver)"""
+        try:
+            infos = self.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        except OSError:
+            return []
+        return list(dict.fromkeys(info[4][0] for info in infos))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class _CachedDnsConnection:
+    """Mezcla para conexiones de urllib3 que resuelven el host con un DnsCache"""
+
+    dns_cache: Optional[DnsCache] = None
+
+    def _new_conn(self):
+        # El host original se conserva para Host, SNI y la verificación del certificado
+        host = self._dns_host
+        error = None
+        for address in self.dns_cache.addresses(host, self.port):
+            self._dns_host = address
+            try:
+                return super()._new_conn()
+            except NewConnectionError as e:
+                error = e
+            finally:
+                self._dns_host = host
+        if error is not None:
+            raise error
+        return super()._new_conn()
+
+
+def _cached_dns_pool_classes(dns_cache: DnsCache) -> Dict[str, type]:
+    """Clases de pool de urllib3 cuyas conexiones usan dns_cache"""
+    classes = {}
+    for scheme, pool_cls in (('http', HTTPConnectionPool), ('https', HTTPSConnectionPool)):
+        connection_cls = type(f"CachedDns{pool_cls.ConnectionCls.__name__}",
+                              (_CachedDnsConnection, pool_cls.ConnectionCls), {'dns_cache': dns_cache})
+        classes[scheme] = type(f"CachedDns{pool_cls.__name__}", (pool_cls,), {'ConnectionCls': connection_cls})
+    return classes
+
+
+class _PooledAdapter(HTTPAdapter):
+    """HTTPAdapter que usa un SSLContext compartido por todas sus conexiones y, opcionalmente, cache de DNS"""
+
+    def __init__(self, ssl_context: ssl.SSLContext, dns_cache: Optional[DnsCache] = None, **kwargs):
+        self.ssl_context = ssl_context
+        self.dns_cache = dns_cache
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['ssl_context'] = self.ssl_context
+        super().init_poolmanager(*args, **kwargs)
+        if self.dns_cache is not None:
+            self.poolmanager.pool_classes_by_scheme = _cached_dns_pool_classes(self.dns_cache)
+
+
+class _SharedAdapter(_PooledAdapter):
+    """Adaptador montado en las sesiones de varios clientes: cerrar una sesión no cierra el pool"""
+
+    def close(self):
+        pass
+
+    def shutdown(self):
+        """Cierra las conexiones del pool"""
+        super().close()
+
+
+class SessionRegistry:
+    """
+    Pools de conexiones compartidos por todos los clientes del proceso
+
+    Mantiene un HTTPAdapter de requests (y un httpx.Client si se usa httpx) con
+    pools de conexiones persistentes de tamaño configurable, un SSLContext único
+    (los certificados de CA se cargan una vez y las conexiones TLS se reutilizan
+    mientras sigan vivas en el pool) y, opcionalmente, cache de DNS para las
+    conexiones de requests. Solo se comparte el pool: cada cliente conserva su
+    requests.Session con sus cookies, auth, proxies y verify.
+    """
+
+    def __init__(self, pool_connections: Optional[int] = None, pool_maxsize: Optional[int] = None,
+                 dns_cache_ttl: Optional[float] = None):
+        """
+        Inicializa el registro (los pools se crean al primer uso)
+
+        Args:
+            pool_connections: Número de hosts con pool propio (por defecto Config.HTTP_POOL_CONNECTIONS)
+            pool_maxsize: Conexiones persistentes por host (por defecto Config.HTTP_POOL_MAXSIZE)
+            dns_cache_ttl: TTL del cache de DNS en segundos, 0 lo desactiva (por defecto Config.DNS_CACHE_TTL)
+        """
+        self.pool_connections = pool_connections or Config.HTTP_POOL_CONNECTIONS
+        self.pool_maxsize = pool_maxsize or Config.HTTP_POOL_MAXSIZE
+        self.dns_cache_ttl = Config.DNS_CACHE_TTL if dns_cache_ttl is None else dns_cache_ttl
+        self.dns_cache: Optional[DnsCache] = None
+        self._adapter: Optional[_SharedAdapter] = None
+        self._httpx_client = None
+        self._lock = threading.Lock()
+
+    def adapter(self) -> HTTPAdapter:
+        """HTTPAdapter compartido para montar en la sesión de cada cliente (se crea al primer uso)"""
+        with self._lock:
+            if self._adapter is None:
+                if self.dns_cache_ttl > 0:
+                    self.dns_cache = DnsCache(self.dns_cache_ttl)
+                self._adapter = _SharedAdapter(
+                    ssl.create_default_context(),
+                    dns_cache=self.dns_cache,
+                    pool_connections=self.pool_connections,
+                    pool_maxsize=self.pool_maxsize
+                )
+            return self._adapter
+
+    def mount(self, session: requests.Session) -> requests.Session:
+        """Monta el pool compartido en la sesión de un cliente"""
+        adapter = self.adapter()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def httpx_client(self):
+        """httpx.Client compartido con HTTP/2 (se crea al primer uso)"""
+        import httpx
+
+        with self._lock:
+            if self._httpx_client is None:
+                self._httpx_client = httpx.Client(
+                    http2=_resolve_http2(None),
+                    limits=_httpx_limits(None, None, None)
+                )
+            return self._httpx_client
+
+    def stats(self) -> Dict[str, Any]:
+        """Conexiones abiertas por host en el pool de requests"""
+        with self._lock:
+            if self._adapter is None:
+                return {}
+            pools = self._adapter.poolmanager.pools
+            return {
+                f"{key.key_scheme}://{key.key_host}:{key.key_port}": pools[key].num_connections
+                for key in list(pools.keys())
+            }
+
+    def close(self):
+        """Cierra los pools compartidos"""
+        with self._lock:
+            if self._adapter is not None:
+                self._adapter.shutdown()
+                self._adapter = None
+            if self._httpx_client is not None:
+                self._httpx_client.close()
+                self._httpx_client = None
+            self.dns_cache = None
+
+
+class SharedSessionTransport(SessionTransport):
+    """Transporte sobre la sesión del cliente con el pool de conexiones compartido del registro"""
+
+    def __init__(self, session: requests.Session, registry: Optional[SessionRegistry] = None):
+        """
+        Args:
+            session: Sesión del cliente (conserva sus encabezados, cookies, auth, proxies y verify)
+            registry: Registro de pools (por defecto el global del proceso)
+        """
+        self.registry = registry or sessions
+        super().__init__(self.registry.mount(session))
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _resolve_http2(http2: Optional[bool]) -> bool:
+    """HTTP/2 si se pidió y el paquete h2 está instalado; si no, HTTP/1.1"""
+    http2 = Config.HTTP2 if http2 is None else http2
+    if http2 and not _http2_available():
+        logging.getLogger(__name__).warning("El paquete h2 no está instalado; usando HTTP/1.1 (pip install 'httpx[http2]')")
+        return False
+    return http2
+
+
+def _httpx_limits(max_connections: Optional[int], max_keepalive: Optional[int],
+                  keepalive_expiry: Optional[float]):
+    import httpx
+
+    return httpx.Limits(
+        max_connections=max_connections if max_connections is not None else Config.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=max_keepalive if max_keepalive is not None else Config.HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=keepalive_expiry if keepalive_expiry is not None else Config.HTTP_KEEPALIVE_EXPIRY
+    )
+
+
+def _to_requests_response(response, method: str, elapsed: float) -> requests.Response:
+    """Convierte una respuesta de httpx en requests.Response para los clientes"""
+    result = requests.Response()
+    result.status_code = response.status_code
+    result.reason = response.reason_phrase
+    result.headers = CaseInsensitiveDict(response.headers.items())
+    result._content = response.content
+    result.encoding = get_encoding_from_headers(result.headers)
+    result.elapsed = timedelta(seconds=elapsed)
+    result.url = str(response.url)
+    result.request = requests.Request(method, result.url).prepare()
+    return result
+
+
+def _httpx_error(e: Exception) -> requests.exceptions.RequestException:
+    """Traduce las excepciones de httpx (httpx.HTTPError) a las de requests que esperan los clientes"""
+    import httpx
+
+    if isinstance(e, httpx.TimeoutException):
+        return requests.exceptions.Timeout(str(e))
+    if isinstance(e, httpx.TransportError):
+        return requests.exceptions.ConnectionError(str(e))
+    return requests.exceptions.RequestException(str(e))
+
+
+class HttpxTransport(Transport):
+    """Transporte síncrono sobre httpx con HTTP/2 y límites de conexiones configurables"""
+
+    def __init__(self, headers: Optional[Mapping[str, str]] = None, http2: Optional[bool] = None,
+                 max_connections: Optional[int] = None, max_keepalive: Optional[int] = None,
+                 keepalive_expiry: Optional[float] = None, client: Optional[Any] = None):
+        """
+        Inicializa el transporte
+
+        Args:
+            headers: Encabezados enviados en todas las peticiones
+            http2: Usar HTTP/2 (por defecto Config.HTTP2; requiere el paquete h2)
+            max_connections: Máximo de conexiones abiertas (por defecto Config.HTTP_MAX_CONNECTIONS)
+            max_keepalive: Máximo de conexiones inactivas a conservar (por defecto Config.HTTP_MAX_KEEPALIVE)
+            keepalive_expiry: Segundos que se conserva una conexión inactiva (por defecto Config.HTTP_KEEPALIVE_EXPIRY)
+            client: httpx.Client compartido (ej. SessionRegistry.httpx_client); no se cierra con el transporte
+        """
+        import httpx
+
+        self.headers = headers if headers is not None else {}
+        self._owns_client = client is None
+        if client is not None:
+            self.client = client
+            self.http2 = http2
+        else:
+            self.http2 = _resolve_http2(http2)
+            self.client = httpx.Client(
+                http2=self.http2,
+                limits=_httpx_limits(max_connections, max_keepalive, keepalive_expiry)
+            )
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        import httpx
+
+        kwargs['headers'] = {**self.headers, **(kwargs.get('headers') or {})}
+        start = time.perf_counter()
+        try:
+            response = self.client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            raise _httpx_error(e) from e
+        return _to_requests_response(response, method, time.perf_counter() - start)
+
+    def close(self):
+        if self._owns_client:
+            self.client.close()
+
+
+class AsyncHttpxTransport:
+    """Transporte asíncrono sobre httpx.AsyncClient (ver async_client.py)"""
+
+    def __init__(self, headers: Optional[Dict[str, str]] = None, http2: Optional[bool] = None,
+                 max_connections: Optional[int] = None, max_keepalive: Optional[int] = None,
+                 keepalive_expiry: Optional[float] = None):
+        """Mismos argumentos que HttpxTransport"""
+        import httpx
+
+        self.http2 = _resolve_http2(http2)
+        self.client = httpx.AsyncClient(
+            http2=self.http2,
+            headers=headers,
+            limits=_httpx_limits(max_connections, max_keepalive, keepalive_expiry)
+        )
+
+    async def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        import httpx
+
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            raise _httpx_error(e) from e
+        return _to_requests_response(response, method, time.perf_counter() - start)
+
+    async def get(self, url: str, **kwargs) -> requests.Response:
+        return await self.request('GET', url, **kwargs)
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class Cassette:
+    """Archivo SQLite con pares petición/respuesta grabados"""
+
+    def __init__(self, path: str):
+        """
+        Abre (o crea) un cassette
+
+        Args:
+            path: Ruta del archivo del cassette
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._cursors: Dict[str, int] = {}
+
+    def record(self, key: str, method: str, url: str, params: Optional[Dict],
+               response: requests.Response, elapsed: float):
+        """Graba una respuesta"""
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in SKIPPED_HEADERS}
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO interactions (key, method, url, params, status, headers, body, elapsed, recorded_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key, method.upper(), url,
+                    json.dumps(params, ensure_ascii=False, default=str) if params else None,
+                    response.status_code,
+                    zlib.compress(json.dumps(headers).encode('utf-8')),
+                    zlib.compress(response.content or b''),
+                    elapsed,
+                    time.time()
+                )
+            )
+
+    def lookup(self, key: str) -> Optional[Tuple[int, Dict[str, str], bytes, float]]:
+        """
+        Busca la siguiente respuesta grabada para una llave
+
+        Las peticiones repetidas reproducen las respuestas en el orden en que se
+        grabaron; al terminarse se repite la última.
+
+        Returns:
+            Tupla (status, encabezados, cuerpo, tiempo original) o None
+        """
+        with self._lock:
+            last_seq = self._cursors.get(key, 0)
+            row = self._conn.execute(
+                "SELECT seq, status, headers, body, elapsed FROM interactions "
+                "WHERE key = ? AND seq > ? ORDER BY seq LIMIT 1",
+                (key, last_seq)
+            ).fetchone()
+
+            if row is None and last_seq:
+                row = self._conn.execute(
+                    "SELECT seq, status, headers, body, elapsed FROM interactions WHERE seq = ?",
+                    (last_seq,)
+                ).fetchone()
+
+            if row is None:
+                return None
+
+            seq, status, headers, body, elapsed = row
+            self._cursors[key] = seq
+
+        return status, json.loads(zlib.decompress(headers)), zlib.decompress(body), elapsed or 0.0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM interactions").fetchone()[0]
+
+    def close(self):
+        """Cierra el cassette"""
+        self._conn.close()
+
+
+class RecordingTransport(Transport):
+    """Transporte que hace las peticiones reales y las graba en un cassette"""
+
+    def __init__(self, cassette: Cassette, inner: Transport):
+        self.cassette = cassette
+        self.inner = inner
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        start = time.perf_counter()
+        response = self.inner.request(method, url, **kwargs)
+        elapsed = time.perf_counter() - start
+
+        if any(path in url for path in UNRECORDED_PATHS):
+            return response
+
+        params = kwargs.get('params')
+        key = request_key(method, url, params, kwargs.get('json') or kwargs.get('data'))
+        self.cassette.record(key, method, url, params, response, elapsed)
+        return response
+
+    def close(self):
+        self.inner.close()
+        self.cassette.close()
+
+
+class ReplayTransport(Transport):
+    """Transporte que reproduce respuestas grabadas sin usar la red"""
+
+    def __init__(self, cassette: Cassette, timing: str = 'fast', speed: float = 1.0,
+                 fallback: Optional[Transport] = None):
+        """
+        Inicializa la reproducción
+
+        Args:
+            cassette: Cassette con las respuestas grabadas
+            timing: 'fast' (sin esperas) u 'original' (respeta el tiempo de cada respuesta)
+            speed: Factor de velocidad con timing='original' (2.0 = el doble de rápido)
+            fallback: Transporte a usar si la petición no está grabada (por defecto, error)
+        """
+        self.cassette = cassette
+        self.timing = timing
+        self.speed = speed
+        self.fallback = fallback
+        self.logger = logging.getLogger(__name__)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        params = kwargs.get('params')
+        key = request_key(method, url, params, kwargs.get('json') or kwargs.get('data'))
+        recorded = self.cassette.lookup(key)
+
+        if recorded is None:
+            if self.fallback is not None:
+                self.logger.debug(f"Petición no grabada, usando la red: {method} {url}")
+                return self.fallback.request(method, url, **kwargs)
+            raise CassetteMissError(f"Petición no grabada en {self.cassette.path}: {method} {url} {params or ''}")
+
+        status, headers, body, elapsed = recorded
+        if self.timing == 'original' and elapsed > 0:
+            time.sleep(elapsed / self.speed)
+
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = body
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.elapsed = timedelta(seconds=elapsed)
+        response.request = requests.Request(method, url, params=params).prepare()
+        response.url = response.request.url
+        return response
+
+    def close(self):
+        self.cassette.close()
+        if self.fallback is not None:
+            self.fallback.close()
+
+
+def create_transport(session: requests.Session, cassette_path: Optional[str] = None,
+                     mode: Optional[str] = None) -> Transport:
+    """
+    Crea el transporte de un cliente según la configuración
+
+    Sin cassette se usa la sesión directamente, o httpx si MELI_HTTP_TRANSPORT=httpx.
+    MELI_CASSETTE y MELI_CASSETTE_MODE (record, replay, replay-original o
+    replay-fallback) activan la grabación o reproducción sin cambiar el código
+    de los clientes.
+
+    Args:
+        session: Sesión de requests del cliente
+        cassette_path: Ruta del cassette (por defecto Config.CASSETTE_PATH, de MELI_CASSETTE)
+        mode: Modo del cassette (por defecto Config.CASSETTE_MODE, de MELI_CASSETTE_MODE)
+
+    Returns:
+        Transporte listo para usar
+    """
+    cassette_path = cassette_path or Config.CASSETTE_PATH
+    shared = Config.HTTP_SHARED_SESSION
+
+    if Config.HTTP_TRANSPORT.lower() == 'httpx':
+        base = HttpxTransport(headers=session.headers, client=sessions.httpx_client() if shared else None)
+    elif shared:
+        base = SharedSessionTransport(session)
+    else:
+        base = SessionTransport(session)
+
+    if not cassette_path:
+        return base
+
+    mode = (mode or Config.CASSETTE_MODE).lower()
+    cassette = Cassette(cassette_path)
+
+    if mode == 'record':
+        return RecordingTransport(cassette, base)
+    if mode == 'replay-original':
+        return ReplayTransport(cassette, timing='original')
+    if mode == 'replay-fallback':
+        return ReplayTransport(cassette, fallback=base)
+    return ReplayTransport(cassette)
+
+
+# Registro global de sesiones compartidas por los clientes del proceso
+sessions = SessionRegistry()
+atexit.register(sessions.close)
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Monitoreo adaptativo de precio y stock (meli watch)
+
+Revisar 100k productos a una cadencia fija gasta casi todo el presupuesto en
+publicaciones que no cambian. WatchEngine agenda cada producto por separado:
+
+- los IDs vencidos se piden con el multi-get de /items de 20 en 20, solo con
+  los campos que se comparan;
+- si un producto cambió, su intervalo se reduce a la mitad; si no, crece;
+- la velocidad de ventas (diferencia de sold_quantity entre revisiones) acota
+  el intervalo para que entre dos revisiones haya a lo más ~1 venta;
+- todos los lotes comparten el RateLimiter del cliente, así que el motor nunca
+  pasa del presupuesto global; si hay más vencidos que capacidad se atienden
+  primero los más atrasados.
+
+Los cambios se emiten como ChangeEvent en cuanto llega cada lote.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from config import Config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS watched (
+    item_id TEXT PRIMARY KEY,
+    price REAL,
+    available_quantity INTEGER,
+    sold_quantity INTEGER,
+    status TEXT,
+    interval REAL NOT NULL,
+    next_poll REAL NOT NULL,
+    last_polled REAL,
+    last_change REAL,
+    changes INTEGER NOT NULL DEFAULT 0,
+    sales_rate REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_watched_next_poll ON watched (next_poll);
+"""
+
+# Campos que se piden en el multi-get y se comparan entre revisiones
+WATCH_FIELDS = ('price', 'available_quantity', 'sold_quantity', 'status')
+
+# Máximo de IDs por petición al multi-get de /items
+BATCH_SIZE = 20
+
+# Factor de crecimiento del intervalo tras una revisión sin cambios
+BACKOFF = 1.5
+
+# Peso de la última medición en la velocidad de ventas (promedio exponencial)
+SALES_ALPHA = 0.5
+
+REMOVED = 'removed'
+
+
+@dataclass
+class ChangeEvent:
+    """Cambio detectado en un producto"""
+    item_id: str
+    field: str
+    old: Any
+    new: Any
+    at: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Representación para exportar (JSON Lines)"""
+        return {'item_id': self.item_id, 'field': self.field, 'old': self.old, 'new': self.new, 'at': self.at}
+
+
+class WatchStore:
+    """Productos vigilados, su último estado y su próxima revisión (SQLite)"""
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Abre (o crea) el almacén
+
+        Args:
+            path: Ruta del archivo SQLite (por defecto Config.WATCH_DB; ':memory:' para no persistir)
+        """
+        self.path = path or Config.WATCH_DB
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def add(self, item_ids: Iterable[str], interval: float) -> int:
+        """Agrega productos (revisión inmediata) y regresa cuántos eran nuevos"""
+        now = time.time()
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO watched (item_id, interval, next_poll) VALUES (?, ?, ?)",
+                ((item_id, interval, now) for item_id in item_ids)
+            )
+            return self._conn.total_changes - before
+
+    def remove(self, item_ids: Iterable[str]) -> int:
+        """Deja de vigilar productos y regresa cuántos se quitaron"""
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany("DELETE FROM watched WHERE item_id = ?", ((item_id,) for item_id in item_ids))
+            return self._conn.total_changes - before
+
+    def due(self, now: float, limit: int) -> List[sqlite3.Row]:
+        """Productos cuya revisión ya venció, los más atrasados primero"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT * FROM watched WHERE next_poll <= ? ORDER BY next_poll LIMIT ?", (now, limit)
+            ).fetchall()
+
+    def next_due(self) -> Optional[float]:
+        """Momento de la próxima revisión (None si no hay productos)"""
+        with self._lock:
+            return self._conn.execute("SELECT MIN(next_poll) FROM watched").fetchone()[0]
+
+    def update_many(self, rows: List[Dict[str, Any]]):
+        """Guarda el resultado de una revisión"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                """
+                UPDATE watched SET price = :price, available_quantity = :available_quantity,
+                    sold_quantity = :sold_quantity, status = :status, interval = :interval,
+                    next_poll = :next_poll, last_polled = :last_polled, last_change = :last_change,
+                    changes = :changes, sales_rate = :sales_rate
+                WHERE item_id = :item_id
+                """,
+                rows
+            )
+
+    def summary(self) -> Dict[str, Any]:
+        """Totales para mostrar el estado del monitoreo"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*), SUM(next_poll <= ?), AVG(interval), MIN(interval), MAX(interval), "
+                "SUM(status = ?), SUM(changes) FROM watched", (now, REMOVED)
+            ).fetchone()
+        count, due, avg_interval, min_interval, max_interval, removed, changes = row
+        return {
+            'items': count,
+            'due': due or 0,
+            'avg_interval': avg_interval or 0.0,
+            'min_interval': min_interval or 0.0,
+            'max_interval': max_interval or 0.0,
+            'removed': removed or 0,
+            'changes': changes or 0,
+            # Peticiones por minuto que pide la agenda actual (20 IDs por petición)
+            'requests_per_minute': self._conn.execute(
+                "SELECT COALESCE(SUM(60.0 / interval), 0) FROM watched WHERE status IS NOT ?", (REMOVED,)
+            ).fetchone()[0] / BATCH_SIZE
+        }
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM watched").fetchone()[0]
+
+    def close(self):
+        """Cierra la conexión"""
+        self._conn.close()
+
+
+class WatchEngine:
+    """Revisa los productos vigilados según su volatilidad, dentro del presupuesto del cliente"""
+
+    def __init__(self, client, store: Optional[WatchStore] = None, min_interval: Optional[float] = None,
+                 max_interval: Optional[float] = None, concurrency: int = 4,
+                 on_event: Optional[Callable[[ChangeEvent], None]] = None):
+        """
+        Inicializa el motor
+
+        Args:
+            client: MercadoLibreClient (o compatible); su rate limiter es el presupuesto global
+            store: Almacén de productos vigilados (por defecto uno en Config.WATCH_DB)
+            min_interval: Intervalo mínimo entre revisiones de un producto (por defecto Config.WATCH_MIN_INTERVAL)
+            max_interval: Intervalo máximo (por defecto Config.WATCH_MAX_INTERVAL)
+            concurrency: Lotes de 20 IDs en vuelo a la vez
+            on_event: Función llamada con cada ChangeEvent en cuanto se detecta
+        """
+        self.client = client
+        self.store = store if store is not None else WatchStore()
+        self.min_interval = min_interval if min_interval is not None else Config.WATCH_MIN_INTERVAL
+        self.max_interval = max_interval if max_interval is not None else Config.WATCH_MAX_INTERVAL
+        self.concurrency = concurrency
+        self.on_event = on_event
+        self.polled = 0
+        self.requests = 0
+        self.logger = logging.getLogger(__name__)
+
+    def add(self, item_ids: Iterable[str]) -> int:
+        """Empieza a vigilar productos (se revisan en la siguiente pasada)"""
+        return self.store.add(dict.fromkeys(str(i).strip() for i in item_ids if str(i).strip()),
+                              self.min_interval)
+
+    def next_interval(self, interval: float, changed: bool, sales_rate: float) -> float:
+        """
+        Intervalo hasta la siguiente revisión de un producto
+
+        Args:
+            interval: Intervalo actual en segundos
+            changed: Si la revisión encontró cambios
+            sales_rate: Ventas por segundo estimadas
+
+        Returns:
+            Intervalo nuevo, entre min_interval y max_interval
+        """
+        interval = interval / 2 if changed else interval * BACKOFF
+        if sales_rate > 0:
+            interval = min(interval, 1 / sales_rate)
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def poll_once(self, max_items: Optional[int] = None) -> List[ChangeEvent]:
+        """
+        Revisa los productos vencidos
+
+        Args:
+            max_items: Máximo de productos a revisar en esta pasada (por defecto 20 lotes por
+                cada lote concurrente)
+
+        Returns:
+            Eventos detectados (también se envían a on_event conforme llegan)
+        """
+        limit = max_items if max_items is not None else BATCH_SIZE * self.concurrency * 20
+        rows = self.store.due(time.time(), limit)
+        if not rows:
+            return []
+
+        previous = {row['item_id']: row for row in rows}
+        ids = list(previous)
+        batches = [ids[start:start + BATCH_SIZE] for start in range(0, len(ids), BATCH_SIZE)]
+        attributes = ['id'] + list(WATCH_FIELDS)
+        events = []
+
+        results = self.client.map(lambda batch: self.client.get_items(batch, attributes=attributes), batches,
+                                  concurrency=self.concurrency, ordered=False)
+        for result in results:
+            self.requests += 1
+            if not result.ok:
+                self.logger.warning(f"Error en multi-get de {len(result.arg)} productos: {result.error}")
+                # Se reintenta en la siguiente pasada sin perder la agenda
+                continue
+
+            updates = []
+            for item_id, response in zip(result.arg, result.value):
+                update, item_events = self._observe(previous[item_id], response)
+                updates.append(update)
+                events.extend(item_events)
+                if self.on_event is not None:
+                    for event in item_events:
+                        self.on_event(event)
+
+            self.store.update_many(updates)
+            self.polled += len(updates)
+
+        return events
+
+    def _observe(self, previous: sqlite3.Row, response: Dict[str, Any]):
+        """Compara una respuesta con el estado anterior y calcula la próxima revisión"""
+        now = time.time()
+        item_id = previous['item_id']
+        code = response.get('code')
+        body = response.get('body') if isinstance(response.get('body'), dict) else {}
+
+        if code == 200:
+            current = {name: body.get(name) for name in WATCH_FIELDS}
+            current['status'] = current['status'] or 'active'
+        elif code in (404, 410):
+            current = {name: previous[name] for name in WATCH_FIELDS}
+            current['status'] = REMOVED
+        else:
+            current = {name: previous[name] for name in WATCH_FIELDS}
+
+        events = []
+        first_poll = previous['last_polled'] is None
+        if not first_poll:
+            events = [ChangeEvent(item_id, name, previous[name], current[name], now)
+                      for name in WATCH_FIELDS
+                      if current[name] is not None and current[name] != previous[name]]
+
+        # Velocidad de ventas: promedio exponencial de la diferencia de sold_quantity
+        sales_rate = previous['sales_rate']
+        if not first_poll and current['sold_quantity'] is not None and previous['sold_quantity'] is not None:
+            elapsed = max(now - previous['last_polled'], 1e-3)
+            sold = max(current['sold_quantity'] - previous['sold_quantity'], 0)
+            sales_rate = SALES_ALPHA * (sold / elapsed) + (1 - SALES_ALPHA) * sales_rate
+
+        # Un cambio de precio o de stock acorta el intervalo; ventas sueltas solo vía sales_rate
+        changed = any(event.field != 'sold_quantity' for event in events)
+        if current['status'] == REMOVED:
+            interval = self.max_interval
+        elif first_poll:
+            interval = previous['interval']
+        else:
+            interval = self.next_interval(previous['interval'], changed, sales_rate)
+
+        update = dict(current, item_id=item_id, interval=interval, next_poll=now + interval, last_polled=now,
+                      last_change=now if events else previous['last_change'],
+                      changes=previous['changes'] + len(events), sales_rate=sales_rate)
+        return update, events
+
+    def run(self, stop: Optional[threading.Event] = None, max_idle: float = 60.0):
+        """
+        Revisa en un ciclo hasta que se active stop
+
+        Args:
+            stop: Evento para detener el ciclo (ej. desde un manejador de señales)
+            max_idle: Espera máxima entre pasadas cuando no hay nada vencido
+        """
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            if self.poll_once():
+                continue
+            next_due = self.store.next_due()
+            wait = max_idle if next_due is None else min(max(next_due - time.time(), 0.05), max_idle)
+            stop.wait(wait)